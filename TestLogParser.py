@@ -1,7 +1,17 @@
+import fnmatch
+import io
+import mmap
+import numpy
+import operator
 import os
 import pandas as pd
 import re
 import shutil # For clearing dummy directories
+import sqlite3
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from instrumentation import metrics
+from summary_cache import DEFAULT_CACHE_PATH, SummaryCache
 
 # --- GLOBAL LOGGING CONFIGURATION ---
 # Define log levels as constants for clarity
@@ -14,16 +24,32 @@ LOG_LEVEL_DEBUG = 4
 # Global variable to hold the current log level, initialized by the main function
 _SCRIPT_LOG_LEVEL = LOG_LEVEL_INFO # Default to INFO level if not explicitly set
 
-def _log_message(level, message):
+# Pools the log files can be parsed on: 'process' for CPU-bound parsing,
+# 'thread' when the time goes into waiting for the file system (NFS),
+# 'serial' to parse one file after the other in the calling thread
+PARSE_EXECUTORS = ('process', 'thread', 'serial')
+# Bytes at the end of a log searched backwards for the summary section
+# before the whole file is searched from the start
+_SUMMARY_TAIL_BYTES = 1024 * 1024
+# Log files handed to a worker process per task, at most
+_MAX_FILES_PER_TASK = 64
+# Directories listed at the same time while discovering the log files. Listing
+# mostly waits for the file system, so on network shares more is faster
+DEFAULT_DISCOVERY_THREADS = 16
+
+def _log_message(level, message, *args):
     """
     Prints a log message if the message's level is less than or equal to
     the script's current global log level.
 
     Args:
         level (int): The log level of this specific message (e.g., LOG_LEVEL_ERROR, LOG_LEVEL_INFO).
-        message (str): The log message to print.
+        message (str): The log message to print, with %-style placeholders for ``args``.
+        *args: Values formatted into ``message``, only when the message is printed.
     """
     if _SCRIPT_LOG_LEVEL >= level:
+        if args:
+            message = message % args
         # Prepend level tag for better readability in logs
         if level == LOG_LEVEL_ERROR:
             prefix = "ERROR: "
@@ -37,20 +63,40 @@ def _log_message(level, message):
             prefix = "" # No prefix for LOG_LEVEL_NONE or unexpected level
         print(f"{prefix}{message}")
 
-def _parse_summary_section(file_path, config):
+def _locate_summary(mm, marker):
     """
-    Parses the structured summary section from a test log file,
-    extracting test case numbers and their results based on provided configuration.
-
-    Args:
-        file_path (str): The absolute path to the log file.
-        config (dict): A dictionary containing configuration for parsing,
-                       e.g., 'summary_section_start', 'test_no_header', 'test_result_header'.
+    Returns the offset of the line of ``mm`` (a mapped log file) holding
+    the summary section marker, or None if there is none. The marker is
+    looked for backwards in the tail, where summaries are written, and
+    only if it is not there forwards from the start of the file.
+    """
+    tail_start = max(0, len(mm) - _SUMMARY_TAIL_BYTES)
+    position = mm.rfind(marker, tail_start)
+    if position == -1:
+        position = mm.find(marker, 0, tail_start + len(marker) - 1)
+        if position == -1:
+            return None
+    # Lines end in \n, \r\n or a bare \r
+    return max(mm.rfind(b'\n', 0, position), mm.rfind(b'\r', 0, position)) + 1
+
+def _summary_from_offset(f, offset, file_path, config):
+    """
+    Runs ``_summary_from_lines`` over the lines of the binary file ``f``
+    from byte ``offset`` on, decoded like a text-mode open() (universal
+    newlines). Returns ``(summary_data, header_line_found)``.
+    """
+    f.seek(offset)
+    lines = io.TextIOWrapper(f, encoding='utf-8', errors='ignore')
+    try:
+        return _summary_from_lines(lines, file_path, config)
+    finally:
+        # Leaves ``f`` open for another pass
+        lines.detach()
 
-    Returns:
-        list: A list of dictionaries, where each dictionary contains the test number
-              and result for a test case found in the summary section. Returns an empty list
-              if the section is not found or parsing fails.
+def _summary_from_lines(lines, file_path, config):
+    """
+    Runs the summary section parser over the text ``lines`` of a log file.
+    Returns ``(summary_data, header_line_found)``.
     """
     summary_data = []
     in_summary_section = False
@@ -67,61 +113,363 @@ def _parse_summary_section(file_path, config):
     # (\w+): Matches the test result string (e.g., PASS, FAIL, SKIP).
     test_result_pattern = re.compile(r'^\s*(\w+)\s*[-*]?\s*(\w+)')
 
-    _log_message(LOG_LEVEL_DEBUG, f"Parsing file: {file_path} with config: {config}")
+    for line in lines:
+        line_stripped = line.strip()
+
+        if not in_summary_section:
+            if summary_section_start in line_stripped:
+                in_summary_section = True
+                _log_message(LOG_LEVEL_DEBUG, "Found '%s' in %s. Entering summary section parsing.", summary_section_start, file_path)
+            continue
+
+        if not header_line_found:
+            # Check for both configured headers to identify the header line
+            if test_no_header in line_stripped and test_result_header in line_stripped:
+                header_line_found = True
+                awaiting_data_start = True
+                _log_message(LOG_LEVEL_DEBUG, "Found header line in %s: '%s'. Now awaiting data/separator.", file_path, line_stripped)
+            continue 
+
+        if awaiting_data_start:
+            # Allow for both '---' and '=====' as separator lines
+            if line_stripped.startswith('---') or line_stripped.startswith('=' * 5): 
+                _log_message(LOG_LEVEL_DEBUG, "Skipping separator line in %s: '%s'. Ready for data.", file_path, line_stripped)
+                awaiting_data_start = False
+                continue
+            else:
+                awaiting_data_start = False
+
+        # Stop parsing if we hit known footer lines or empty lines
+        if line_stripped.startswith("Script End Time:") or \
+           line_stripped.startswith("Total Run Time:") or \
+           line_stripped == "": 
+            _log_message(LOG_LEVEL_DEBUG, "Stopping parsing in %s due to footer/empty line: '%s'", file_path, line_stripped)
+            break
+
+        match = test_result_pattern.match(line_stripped)
+        if match:
+            test_no = match.group(1)
+            result = match.group(2)
+            # Use configurable headers as dictionary keys
+            summary_data.append({test_no_header: test_no, test_result_header: result})
+            _log_message(LOG_LEVEL_DEBUG, "Parsed data from %s: %s='%s', %s='%s' from line: '%s'", file_path, test_no_header, test_no, test_result_header, result, line_stripped)
+        else:
+            _log_message(LOG_LEVEL_DEBUG, "Skipped non-matching line in %s: '%s'", file_path, line_stripped)
+
+    return summary_data, header_line_found
+
+def _parse_summary_section(file_path, config):
+    """
+    Parses the structured summary section from a test log file,
+    extracting test case numbers and their results based on provided configuration.
+
+    The file is memory-mapped and the section marker searched for from the
+    end, so only the summary is decoded and parsed, however long the log.
+    When several sections are found the last one is used, unless it has no
+    header line; then, like for files that cannot be mapped, the file is
+    parsed from the start.
+
+    Args:
+        file_path (str): The absolute path to the log file.
+        config (dict): A dictionary containing configuration for parsing,
+                       e.g., 'summary_section_start', 'test_no_header', 'test_result_header'.
+
+    Returns:
+        list: A list of dictionaries, where each dictionary contains the test number
+              and result for a test case found in the summary section. Returns an empty list
+              if the section is not found, and None if the file could not be read or
+              parsed (so the failure is not cached as a file without tests).
+    """
+    summary_data = []
+    _log_message(LOG_LEVEL_DEBUG, "Parsing file: %s with config: %s", file_path, config)
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                line_stripped = line.strip()
-
-                if not in_summary_section:
-                    if summary_section_start in line_stripped:
-                        in_summary_section = True
-                        _log_message(LOG_LEVEL_DEBUG, f"Found '{summary_section_start}' in {file_path}. Entering summary section parsing.")
-                    continue
-
-                if not header_line_found:
-                    # Check for both configured headers to identify the header line
-                    if test_no_header in line_stripped and test_result_header in line_stripped:
-                        header_line_found = True
-                        awaiting_data_start = True
-                        _log_message(LOG_LEVEL_DEBUG, f"Found header line in {file_path}: '{line_stripped}'. Now awaiting data/separator.")
-                    continue 
-
-                if awaiting_data_start:
-                    # Allow for both '---' and '=====' as separator lines
-                    if line_stripped.startswith('---') or line_stripped.startswith('=' * 5): 
-                        _log_message(LOG_LEVEL_DEBUG, f"Skipping separator line in {file_path}: '{line_stripped}'. Ready for data.")
-                        awaiting_data_start = False
-                        continue
-                    else:
-                        awaiting_data_start = False
-
-                # Stop parsing if we hit known footer lines or empty lines
-                if line_stripped.startswith("Script End Time:") or \
-                   line_stripped.startswith("Total Run Time:") or \
-                   line_stripped == "": 
-                    _log_message(LOG_LEVEL_DEBUG, f"Stopping parsing in {file_path} due to footer/empty line: '{line_stripped}'")
-                    break
-
-                match = test_result_pattern.match(line_stripped)
-                if match:
-                    test_no = match.group(1)
-                    result = match.group(2)
-                    # Use configurable headers as dictionary keys
-                    summary_data.append({test_no_header: test_no, test_result_header: result})
-                    _log_message(LOG_LEVEL_DEBUG, f"Parsed data from {file_path}: {test_no_header}='{test_no}', {test_result_header}='{result}' from line: '{line_stripped}'")
-                else:
-                    _log_message(LOG_LEVEL_DEBUG, f"Skipped non-matching line in {file_path}: '{line_stripped}'")
+        with metrics.stage('summary_parse'), open(file_path, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # Empty, or not a regular file
+                mm = None
+            if mm is None:
+                summary_data, _ = _summary_from_offset(f, 0, file_path, config)
+            else:
+                with mm:
+                    start = _locate_summary(mm, config['summary_section_start'].encode('utf-8'))
+                if start is not None:
+                    summary_data, header_line_found = _summary_from_offset(f, start, file_path, config)
+                    if not header_line_found and start > 0:
+                        summary_data, _ = _summary_from_offset(f, 0, file_path, config)
                             
     except FileNotFoundError:
-        _log_message(LOG_LEVEL_WARNING, f"File not found - {file_path}")
+        _log_message(LOG_LEVEL_WARNING, "File not found - %s", file_path)
+        summary_data = None
     except Exception as e:
-        _log_message(LOG_LEVEL_ERROR, f"Error parsing summary section in {file_path}: {e}")
+        _log_message(LOG_LEVEL_ERROR, "Error parsing summary section in %s: %s", file_path, e)
+        summary_data = None
 
-    _log_message(LOG_LEVEL_DEBUG, f"Final summary_data for {file_path}: {summary_data}")
+    _log_message(LOG_LEVEL_DEBUG, "Final summary_data for %s: %s", file_path, summary_data)
+    metrics.add('summary_files_parsed')
+    metrics.add('test_results_parsed', len(summary_data or ()))
     return summary_data
 
-def compare_test_summaries(previous_dir, current_dir, output_excel_file, config):
+def _glob_form(text):
+    # Names, paths and patterns are compared with '/' separators, and without
+    # case on case-insensitive file systems
+    return os.path.normcase(text).replace(os.sep, '/')
+
+def _glob_regex(patterns):
+    # One compiled regex for a list of glob patterns, None for no patterns
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(_glob_form(pattern)) for pattern in patterns))
+
+def _glob_match(regex, name, relative_path):
+    # Patterns match the entry name (``*.log``) or its path below the root (``module_A/*``)
+    return regex.match(_glob_form(name)) is not None or regex.match(_glob_form(relative_path)) is not None
+
+def _scan_directory(directory, relative_dir, include, exclude, prune):
+    """
+    Lists one directory. Returns ``(files, subdirs)``: the wanted files as
+    ``[(relative_path, abs_path), ...]`` and the directories to descend into
+    as ``[(abs_path, relative_path), ...]``. Dotfiles are skipped; symbolic
+    links to directories are not followed, like os.walk.
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                relative_path = os.path.join(relative_dir, name) if relative_dir else name
+                try:
+                    # Usually answered from the directory listing, without a stat
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink() and (prune is None or not _glob_match(prune, name, relative_path)):
+                        subdirs.append((entry.path, relative_path))
+                elif not name.startswith('.') and \
+                        (include is None or _glob_match(include, name, relative_path)) and \
+                        (exclude is None or not _glob_match(exclude, name, relative_path)):
+                    files.append((relative_path, entry.path))
+    except OSError as e:
+        _log_message(LOG_LEVEL_WARNING, "Cannot list directory %s: %s", directory, e)
+    return files, subdirs
+
+def discover_files(roots, include=None, exclude=None, prune=None, max_workers=DEFAULT_DISCOVERY_THREADS):
+    """
+    Finds the files below each directory of ``roots``, listing directories
+    of all roots concurrently on a thread pool.
+
+    Args:
+        roots (list): Root directories.
+        include (list): Glob patterns, only files matching one are returned (default: all files).
+        exclude (list): Glob patterns of files to leave out.
+        prune (list): Glob patterns of directories not to descend into.
+        max_workers (int): Directories listed at the same time.
+
+    Patterns match an entry's name or its path relative to the root, with
+    '/' separators. Dotfiles are always left out.
+
+    Returns:
+        list: A ``{relative_path: absolute_path}`` dict per root.
+    """
+    include, exclude, prune = _glob_regex(include), _glob_regex(exclude), _glob_regex(prune)
+    found = [{} for _ in roots]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {
+            pool.submit(_scan_directory, root, '', include, exclude, prune): root_id
+            for root_id, root in enumerate(roots)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                root_id = pending.pop(future)
+                files, subdirs = future.result()
+                found[root_id].update(files)
+                for directory, relative_dir in subdirs:
+                    pending[pool.submit(_scan_directory, directory, relative_dir, include, exclude, prune)] = root_id
+    return found
+
+def _set_log_level(level):
+    # Pool initializer: worker processes log at the level of the parent
+    global _SCRIPT_LOG_LEVEL
+    _SCRIPT_LOG_LEVEL = level
+
+def _parse_files(file_paths, config, executor, max_workers):
+    """
+    Parses the summary section of every file of ``file_paths`` on the pool
+    selected by ``executor`` and returns the summary data in the order of
+    ``file_paths``, however the work was spread over the pool.
+    """
+    configs = [config] * len(file_paths)
+    if executor == 'serial' or len(file_paths) < 2:
+        return list(map(_parse_summary_section, file_paths, configs))
+    if executor == 'thread':
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(_parse_summary_section, file_paths, configs))
+    if executor != 'process':
+        raise ValueError(f"Unknown executor {executor!r}, expected one of {PARSE_EXECUTORS}")
+
+    workers = max_workers or os.cpu_count() or 1
+    # Several files per task so the pickling round trips stay small next to the parsing
+    chunksize = max(1, min(_MAX_FILES_PER_TASK, len(file_paths) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_set_log_level, initargs=(_SCRIPT_LOG_LEVEL,)) as pool:
+        results = list(pool.map(_parse_summary_section, file_paths, configs, chunksize=chunksize))
+    # Counters of the worker processes are lost with them
+    metrics.add('summary_files_parsed', len(file_paths))
+    metrics.add('test_results_parsed', sum(len(summary_data or ()) for summary_data in results))
+    return results
+
+def _parse_with_cache(file_paths, config, executor, max_workers, cache):
+    """
+    Returns ``{file_path: summary_data}`` for ``file_paths``, parsing only
+    the files ``cache`` (a SummaryCache, or None) has no up-to-date entry for.
+    Files that failed to parse are reported without tests and not cached,
+    so they are parsed again on the next run.
+    """
+    summaries = {}
+    to_parse = file_paths
+    if cache is not None:
+        to_parse = []
+        for file_path in file_paths:
+            summary_data = cache.get(file_path)
+            if summary_data is None:
+                to_parse.append(file_path)
+            else:
+                summaries[file_path] = summary_data
+    parsed = _parse_files(to_parse, config, executor, max_workers)
+    summaries.update((file_path, summary_data or []) for file_path, summary_data in zip(to_parse, parsed))
+    if cache is not None:
+        try:
+            cache.put_many(
+                (file_path, summary_data) for file_path, summary_data in zip(to_parse, parsed) if summary_data is not None
+            )
+        except sqlite3.Error as e:
+            _log_message(LOG_LEVEL_WARNING, "Could not update the parse cache: %s", e)
+        metrics.add('parse_cache_hits', cache.hits)
+        metrics.add('parse_cache_misses', cache.misses)
+        _log_message(LOG_LEVEL_INFO, "Parse cache: %s files reused, %s parsed.", cache.hits, cache.misses)
+    return summaries
+
+def _summary_columns(files, summaries, file_codes, config):
+    """
+    Flattens the summary data of ``files`` ({relative_path: abs_path}) into
+    columns: the code of the file (from ``file_codes``), test IDs and results.
+    """
+    get_test_no = operator.itemgetter(config['test_no_header'])
+    get_result = operator.itemgetter(config['test_result_header'])
+    counts, test_nos, results = [], [], []
+    for relative_path, abs_path in files.items():
+        summary_data = summaries[abs_path]
+        counts.append(len(summary_data))
+        test_nos.extend(map(get_test_no, summary_data))
+        results.extend(map(get_result, summary_data))
+    codes = numpy.repeat(numpy.fromiter((file_codes[relative_path] for relative_path in files), dtype=numpy.int64, count=len(files)), counts)
+    return codes, test_nos, results
+
+def _coded(values):
+    """
+    Returns the categories of ``values`` ("" first, then the other values
+    sorted) and the code of each value.
+    """
+    codes, uniques = pd.factorize(numpy.array(values, dtype=object))
+    order = numpy.argsort(uniques, kind='stable')
+    categories = uniques[order].tolist()
+    rank = numpy.empty(len(uniques), dtype=numpy.int64)
+    if categories and categories[0] == "":
+        rank[order] = numpy.arange(len(uniques))
+    else:
+        rank[order] = numpy.arange(1, len(uniques) + 1)
+        categories.insert(0, "")
+    return categories, rank[codes]
+
+def _diff_summaries(relative_paths, prev_files, current_files, summaries, config):
+    """
+    Builds the comparison report of the files ``relative_paths`` (sorted)
+    as one outer merge of the previous and current summaries on (file,
+    test ID), with the Diff labels worked out column-wise. Rows are sorted
+    by file, then test ID; a file without any test gets one "(No Summary
+    Data)" row. Every column is categorical.
+    """
+    file_codes = {relative_path: code for code, relative_path in enumerate(relative_paths)}
+    prev_codes, prev_tests, prev_results = _summary_columns(prev_files, summaries, file_codes, config)
+    curr_codes, curr_tests, curr_results = _summary_columns(current_files, summaries, file_codes, config)
+
+    # Test IDs and results of both sides share one set of categories so the
+    # merge runs on integer codes; code 0 stands for "" (no test, no result)
+    test_categories, test_codes = _coded(prev_tests + curr_tests)
+    result_categories, result_codes = _coded(prev_results + curr_results)
+    # (file, test ID) as one key whose order is that of the report rows
+    keys = numpy.concatenate([prev_codes, curr_codes]) * len(test_categories) + test_codes
+    split = len(prev_tests)
+    # A test listed twice in a summary keeps its last result. With unique,
+    # sorted keys the merge is a linear join that leaves the rows in order
+    prev = pd.DataFrame({'prev': result_codes[:split]}, index=keys[:split])
+    prev = prev[~prev.index.duplicated(keep='last')].sort_index()
+    curr = pd.DataFrame({'curr': result_codes[split:]}, index=keys[split:])
+    curr = curr[~curr.index.duplicated(keep='last')].sort_index()
+    merged = prev.merge(curr, left_index=True, right_index=True, how='outer')
+
+    file_count = len(relative_paths)
+    in_prev = numpy.zeros(file_count, dtype=bool)
+    in_prev[[file_codes[relative_path] for relative_path in prev_files]] = True
+    in_curr = numpy.zeros(file_count, dtype=bool)
+    in_curr[[file_codes[relative_path] for relative_path in current_files]] = True
+    # Files without any test get a row with test code 0, which sorts first
+    merged_keys = merged.index.to_numpy(dtype=numpy.int64)
+    has_tests = numpy.zeros(file_count, dtype=bool)
+    has_tests[merged_keys // len(test_categories)] = True
+    empty_keys = numpy.flatnonzero(~has_tests) * len(test_categories)
+    position = numpy.searchsorted(merged_keys, empty_keys)
+    key_col = numpy.insert(merged_keys, position, empty_keys)
+    prev_col = numpy.insert(merged['prev'].fillna(0).to_numpy(dtype=numpy.int64), position, 0)
+    curr_col = numpy.insert(merged['curr'].fillna(0).to_numpy(dtype=numpy.int64), position, 0)
+    file_col, test_col = numpy.divmod(key_col, len(test_categories))
+
+    labels = [
+        "New File (No Summary Data)", "New File / New Test", "New File (Empty Test Result)",
+        "Removed File (No Summary Data)", "Removed File / Removed Test", "Removed File (Empty Test Result)",
+        "Common File (No Summary Data in Either)", "New Test", "Removed Test", "No Change", "N/A (Both Empty)",
+    ]
+    is_test = test_col != 0
+    is_new = ~in_prev[file_col]
+    is_removed = ~in_curr[file_col]
+    has_prev = prev_col != 0
+    has_curr = curr_col != 0
+    changed = ~is_new & ~is_removed & is_test & has_prev & has_curr & (prev_col != curr_col)
+    diff_col = numpy.select(
+        [
+            is_new & ~is_test, is_new & has_curr, is_new,
+            is_removed & ~is_test, is_removed & has_prev, is_removed,
+            ~is_test, ~has_prev & has_curr, has_prev & ~has_curr, has_prev & has_curr & ~changed, ~changed,
+        ],
+        numpy.arange(len(labels)), default=-1
+    )
+    # "Changed: A -> B", one label per pair of results that occurs
+    pairs = prev_col[changed] * len(result_categories) + curr_col[changed]
+    unique_pairs, pair_ids = numpy.unique(pairs, return_inverse=True)
+    diff_col[changed] = len(labels) + pair_ids.reshape(-1)
+    labels.extend(
+        f"Changed: {result_categories[pair // len(result_categories)]} -> {result_categories[pair % len(result_categories)]}"
+        for pair in unique_pairs.tolist()
+    )
+
+    # Path and File of each file, as codes into their unique values
+    dir_codes, dir_categories = pd.factorize(numpy.array([os.path.dirname(path) for path in relative_paths], dtype=object))
+    name_codes, name_categories = pd.factorize(numpy.array([os.path.basename(path) for path in relative_paths], dtype=object))
+    return pd.DataFrame({
+        "Path": pd.Categorical.from_codes(dir_codes[file_col], dir_categories),
+        "File": pd.Categorical.from_codes(name_codes[file_col], name_categories),
+        config['test_no_header']: pd.Categorical.from_codes(test_col, test_categories),
+        "Previous Result": pd.Categorical.from_codes(prev_col, result_categories),
+        "Current Result": pd.Categorical.from_codes(curr_col, result_categories),
+        "Diff": pd.Categorical.from_codes(diff_col, labels),
+    })
+
+def compare_test_summaries(previous_dir, current_dir, output_excel_file, config, executor='process', max_workers=None,
+                           cache_path=DEFAULT_CACHE_PATH, use_content_hash=False,
+                           include=None, exclude=None, prune=None, discovery_threads=DEFAULT_DISCOVERY_THREADS):
     """
     Compares test summary sections from log files in two hierarchical directories
     and generates a single Excel report of the differences.
@@ -131,40 +479,36 @@ def compare_test_summaries(previous_dir, current_dir, output_excel_file, config)
         current_dir (str): The path to the root directory of current test results.
         output_excel_file (str): The name of the output Excel file.
         config (dict): A dictionary containing configuration for parsing.
+        executor (str): Pool the log files are parsed on, one of PARSE_EXECUTORS.
+                        The report is identical whichever is used.
+        max_workers (int): Pool size, defaults to the number of CPUs (processes)
+                           or the ThreadPoolExecutor default (threads).
+        cache_path (str): SQLite file caching the parsed summaries across runs,
+                          None to parse every file.
+        use_content_hash (bool): Also reuse cached summaries of files with
+                                 identical content (copied or moved trees).
+        include, exclude, prune (list): Glob filters for the files and directories
+                                        to compare, see discover_files.
+        discovery_threads (int): Directories listed at the same time.
     """
     
     if not os.path.isdir(previous_dir):
-        _log_message(LOG_LEVEL_ERROR, f"Previous results directory not found: {previous_dir}")
+        _log_message(LOG_LEVEL_ERROR, "Previous results directory not found: %s", previous_dir)
         return
     if not os.path.isdir(current_dir):
-        _log_message(LOG_LEVEL_ERROR, f"Current results directory not found: {current_dir}")
+        _log_message(LOG_LEVEL_ERROR, "Current results directory not found: %s", current_dir)
         return
 
-    _log_message(LOG_LEVEL_INFO, f"Comparing previous results in: '{previous_dir}'")
-    _log_message(LOG_LEVEL_INFO, f"With current results in:       '{current_dir}'")
+    _log_message(LOG_LEVEL_INFO, "Comparing previous results in: '%s'", previous_dir)
+    _log_message(LOG_LEVEL_INFO, "With current results in:       '%s'", current_dir)
 
-    prev_files = {}  # {relative_path: absolute_path}
-    current_files = {} # {relative_path: absolute_path}
-
-    for root, _, files in os.walk(previous_dir):
-        for file in files:
-            if file.startswith('.'):
-                _log_message(LOG_LEVEL_DEBUG, f"Skipping dotfile in previous: {file}")
-                continue
-            abs_path = os.path.join(root, file)
-            relative_path = os.path.relpath(abs_path, previous_dir)
-            prev_files[relative_path] = abs_path
-    _log_message(LOG_LEVEL_INFO, f"\nPrevious files discovered: {prev_files}")
-
-    for root, _, files in os.walk(current_dir):
-        for file in files:
-            if file.startswith('.'):
-                _log_message(LOG_LEVEL_DEBUG, f"Skipping dotfile in current: {file}")
-                continue
-            abs_path = os.path.join(root, file)
-            relative_path = os.path.relpath(abs_path, current_dir)
-            current_files[relative_path] = abs_path
-    _log_message(LOG_LEVEL_INFO, f"Current files discovered: {current_files}")
+    with metrics.stage('file_discovery'):
+        # {relative_path: absolute_path} of both trees
+        prev_files, current_files = discover_files(
+            [previous_dir, current_dir], include, exclude, prune, max_workers=discovery_threads
+        )
+    metrics.add('files_discovered', len(prev_files) + len(current_files))
+    _log_message(LOG_LEVEL_INFO, "\nDiscovered %s previous and %s current files.", len(prev_files), len(current_files))
 
     all_unique_relative_paths = sorted(list(set(prev_files.keys()) | set(current_files.keys())))
     
@@ -172,133 +516,40 @@ def compare_test_summaries(previous_dir, current_dir, output_excel_file, config)
         _log_message(LOG_LEVEL_WARNING, "No log files found in either directory (excluding dotfiles). No report will be generated.")
         return
 
-    all_comparison_rows = []
-
-    _log_message(LOG_LEVEL_INFO, f"\nFound {len(all_unique_relative_paths)} unique files across both results to process.")
-
-    for relative_path in all_unique_relative_paths:
-        abs_curr_path = current_files.get(relative_path)
-        abs_prev_path = prev_files.get(relative_path)
-
-        _log_message(LOG_LEVEL_INFO, f"Processing file: {relative_path}")
-
-        curr_summary_data = []
-        if abs_curr_path:
-            curr_summary_data = _parse_summary_section(abs_curr_path, config)
-        else:
-            _log_message(LOG_LEVEL_INFO, f"File '{relative_path}' not found in current results. Will treat as removed.")
-
-        prev_summary_data = []
-        if abs_prev_path:
-            prev_summary_data = _parse_summary_section(abs_prev_path, config)
-        else:
-            _log_message(LOG_LEVEL_INFO, f"File '{relative_path}' not found in previous results. Will treat as new.")
-
-        # Dynamically use configured headers as dictionary keys for mapping
-        prev_map = {item[config['test_no_header']]: item[config['test_result_header']] for item in prev_summary_data}
-        curr_map = {item[config['test_no_header']]: item[config['test_result_header']] for item in curr_summary_data}
-
-        # Get all unique test numbers from both previous and current summaries for this file
-        # The 'keys()' here will now be the values from config['test_no_header']
-        all_test_nos = sorted(list(set(prev_map.keys()) | set(curr_map.keys())))
-
-        dir_path = os.path.dirname(relative_path)
-        filename = os.path.basename(relative_path)
-
-        if not abs_prev_path and not abs_curr_path:
-            _log_message(LOG_LEVEL_ERROR, f"ERROR: {relative_path} found in neither, this indicates a logic error in path collection.")
-            continue
-        elif not abs_prev_path: # File is new in current directory
-            if not all_test_nos: # New file with no summary data
-                all_comparison_rows.append({
-                    "Path": dir_path,
-                    "File": filename,
-                    config['test_no_header']: "", 
-                    "Previous Result": "",
-                    "Current Result": "",
-                    "Diff": "New File (No Summary Data)"
-                })
-            else: # New file with summary data
-                for test_no in all_test_nos:
-                    curr_result = curr_map.get(test_no, "")
-                    all_comparison_rows.append({
-                        "Path": dir_path,
-                        "File": filename,
-                        config['test_no_header']: test_no, 
-                        "Previous Result": "",
-                        "Current Result": curr_result,
-                        "Diff": "New File / New Test" if curr_result else "New File (Empty Test Result)"
-                    })
-        elif not abs_curr_path: # File is removed from current (only in previous directory)
-            if not all_test_nos: # Removed file with no summary data
-                all_comparison_rows.append({
-                    "Path": dir_path,
-                    "File": filename,
-                    config['test_no_header']: "", 
-                    "Previous Result": "",
-                    "Current Result": "",
-                    "Diff": "Removed File (No Summary Data)"
-                })
-            else: # Removed file with summary data
-                for test_no in all_test_nos:
-                    prev_result = prev_map.get(test_no, "")
-                    all_comparison_rows.append({
-                        "Path": dir_path,
-                        "File": filename,
-                        config['test_no_header']: test_no, 
-                        "Previous Result": prev_result,
-                        "Current Result": "",
-                        "Diff": "Removed File / Removed Test" if prev_result else "Removed File (Empty Test Result)"
-                    })
-        else: # File exists in both previous and current (standard comparison)
-            if not all_test_nos and abs_prev_path and abs_curr_path:
-                 # Case where a common file exists but has no summary data in either,
-                 # or both have no summary data. This indicates an issue with logs.
-                all_comparison_rows.append({
-                    "Path": dir_path,
-                    "File": filename,
-                    config['test_no_header']: "", 
-                    "Previous Result": "",
-                    "Current Result": "",
-                    "Diff": "Common File (No Summary Data in Either)"
-                })
-
-            for test_no in all_test_nos:
-                prev_result = prev_map.get(test_no, "")
-                curr_result = curr_map.get(test_no, "")
-
-                diff_status = ""
-                if prev_result == "" and curr_result != "":
-                    diff_status = "New Test"
-                elif prev_result != "" and curr_result == "":
-                    diff_status = "Removed Test"
-                elif prev_result != "" and curr_result != "":
-                    if prev_result == curr_result:
-                        diff_status = "No Change"
-                    else:
-                        diff_status = f"Changed: {prev_result} -> {curr_result}"
-                else:
-                    diff_status = "N/A (Both Empty)"
-
-                all_comparison_rows.append({
-                    "Path": dir_path,
-                    "File": filename,
-                    config['test_no_header']: test_no, 
-                    "Previous Result": prev_result,
-                    "Current Result": curr_result,
-                    "Diff": diff_status
-                })
-
-    # The column name for Test ID in the final Excel output needs to be dynamic based on config
-    df = pd.DataFrame(all_comparison_rows, columns=[
-        "Path", "File", config['test_no_header'], "Previous Result", "Current Result", "Diff"
-    ])
+    _log_message(LOG_LEVEL_INFO, "\nFound %s unique files across both results to process.", len(all_unique_relative_paths))
+
+    # All files are parsed up front, in parallel, unless an earlier run
+    # parsed them already; results are looked up in sorted relative path
+    # order below so the report does not depend on the pool or the cache
+    cache = None
+    if cache_path:
+        try:
+            cache = SummaryCache(config, cache_path, use_content_hash)
+        except (OSError, sqlite3.Error) as e:
+            _log_message(LOG_LEVEL_WARNING, "Parse cache '%s' unavailable, parsing every file: %s", cache_path, e)
+    try:
+        with metrics.stage('summary_parse_all'):
+            summaries = _parse_with_cache(
+                sorted(set(prev_files.values()) | set(current_files.values())), config, executor, max_workers, cache
+            )
+    finally:
+        if cache is not None:
+            cache.close()
+
+    new_files = sum(1 for relative_path in current_files if relative_path not in prev_files)
+    removed_files = sum(1 for relative_path in prev_files if relative_path not in current_files)
+    _log_message(LOG_LEVEL_INFO, "Diffing %s common, %s new and %s removed files.",
+                 len(all_unique_relative_paths) - new_files - removed_files, new_files, removed_files)
+    with metrics.stage('summary_diff'):
+        df = _diff_summaries(all_unique_relative_paths, prev_files, current_files, summaries, config)
 
     try:
-        df.to_excel(output_excel_file, index=False)
-        _log_message(LOG_LEVEL_INFO, f"\nComparison report generated successfully: '{output_excel_file}'")
+        with metrics.stage('excel_write'):
+            df.to_excel(output_excel_file, index=False)
+        metrics.add('report_rows', len(df))
+        _log_message(LOG_LEVEL_INFO, "\nComparison report generated successfully: '%s'", output_excel_file)
     except Exception as e:
-        _log_message(LOG_LEVEL_ERROR, f"Error writing Excel file '{output_excel_file}': {e}")
+        _log_message(LOG_LEVEL_ERROR, "Error writing Excel file '%s': %s", output_excel_file, e)
 
 # --- Configuration and Dummy Data Generation ---
 if __name__ == "__main__":
@@ -333,12 +584,32 @@ if __name__ == "__main__":
     _SCRIPT_LOG_LEVEL = LOG_LEVEL_INFO 
     # -------------------------------
 
+    # --- PARALLEL PARSING ---
+    # 'process' spreads the parsing over all CPU cores, 'thread' suits result
+    # trees on network file systems, 'serial' parses one file at a time.
+    PARSE_EXECUTOR = 'process'
+    PARSE_WORKERS = None # None: one per CPU core
+    # Parsed summaries are cached across runs in this SQLite file (None: no
+    # cache), so yesterday's tree and unchanged files are not parsed again.
+    # With content hashing, copied or moved files are recognised as well.
+    PARSE_CACHE_PATH = DEFAULT_CACHE_PATH
+    PARSE_CACHE_CONTENT_HASH = False
+    # ------------------------
+
+    # --- FILE DISCOVERY FILTERS ---
+    # Glob patterns matched against file/directory names or paths relative to
+    # the result roots, e.g. INCLUDE_FILES = ['*.log'], PRUNE_DIRS = ['tmp', 'core_dumps'].
+    INCLUDE_FILES = None # None: every file except dotfiles
+    EXCLUDE_FILES = None
+    PRUNE_DIRS = None
+    # ------------------------------
+
     if GENERATE_DUMMY_DATA:
         if os.path.exists(PREVIOUS_RESULTS_DIR):
-            _log_message(LOG_LEVEL_INFO, f"\nRemoving existing dummy directory: {PREVIOUS_RESULTS_DIR}")
+            _log_message(LOG_LEVEL_INFO, "\nRemoving existing dummy directory: %s", PREVIOUS_RESULTS_DIR)
             shutil.rmtree(PREVIOUS_RESULTS_DIR)
         if os.path.exists(CURRENT_RESULTS_DIR):
-            _log_message(LOG_LEVEL_INFO, f"Removing existing dummy directory: {CURRENT_RESULTS_DIR}")
+            _log_message(LOG_LEVEL_INFO, "Removing existing dummy directory: %s", CURRENT_RESULTS_DIR)
             shutil.rmtree(CURRENT_RESULTS_DIR)
 
         os.makedirs(os.path.join(PREVIOUS_RESULTS_DIR, "module_A", "sub_module_1"), exist_ok=True)
@@ -463,4 +734,7 @@ if __name__ == "__main__":
         _log_message(LOG_LEVEL_INFO, "Dummy log files created. Running comparison...\n")
 
     # Run the comparison
-    compare_test_summaries(PREVIOUS_RESULTS_DIR, CURRENT_RESULTS_DIR, OUTPUT_EXCEL_FILENAME, PARSING_CONFIG)
+    compare_test_summaries(PREVIOUS_RESULTS_DIR, CURRENT_RESULTS_DIR, OUTPUT_EXCEL_FILENAME, PARSING_CONFIG,
+                           executor=PARSE_EXECUTOR, max_workers=PARSE_WORKERS,
+                           cache_path=PARSE_CACHE_PATH, use_content_hash=PARSE_CACHE_CONTENT_HASH,
+                           include=INCLUDE_FILES, exclude=EXCLUDE_FILES, prune=PRUNE_DIRS)
@@ -0,0 +1,2 @@
+# Performance benchmarks: synthetic data generators (benchmarks.generate) and
+# a runner timing the hot paths headlessly (benchmarks.run).
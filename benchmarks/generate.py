@@ -0,0 +1,211 @@
+import argparse
+import os
+import random
+import string
+import sys
+from datetime import datetime, timedelta
+
+# Lines written per timestamp; lines of a batch share their timestamp
+_BATCH_LINES = 1000
+# Distinct filler lines generated up front, the log is assembled from them
+_POOL_SIZE = 4096
+_WORDS = [
+    'request', 'handled', 'connection', 'worker', 'cache', 'session', 'queue', 'thread',
+    'started', 'finished', 'user', 'config', 'reload', 'timeout', 'retry', 'socket',
+    'database', 'commit', 'payload', 'bytes', 'latency', 'status', 'client', 'upstream',
+]
+_LEVELS = ['INFO', 'INFO', 'INFO', 'DEBUG', 'DEBUG', 'WARN']
+_RESULTS = ['PASS', 'PASS', 'PASS', 'PASS', 'FAIL', 'SKIP']
+
+LINE_LENGTH_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+
+def benchmark_patterns(count):
+    """
+    Returns ``count`` distinct literal search patterns. Matching lines in a
+    generated log contain one of the first ``count`` patterns of the same
+    generator, so searching for them finds every injected match.
+    """
+    return [f"E{idx:04d}_FAULT" for idx in range(count)]
+
+
+def _line_length(rng, mean, distribution):
+    if distribution == 'fixed':
+        return mean
+    if distribution == 'uniform':
+        return rng.randint(1, 2 * mean)
+    # Log lines are mostly short with a long tail of stack traces and dumps
+    return max(1, int(rng.lognormvariate(0, 0.8) * mean / 1.377))
+
+
+def _filler(rng, length):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(_WORDS) if rng.random() < 0.8 else \
+            ''.join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(3, 12)))
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)[:length]
+
+
+def generate_log(file_path, size_mb, line_length=120, distribution='lognormal',
+                 match_density=0.001, pattern_count=10, seed=0):
+    """
+    Writes a deterministic synthetic log of about ``size_mb`` megabytes.
+
+    Every line is ``<timestamp> <LEVEL> <text>``. A fraction ``match_density``
+    of the lines is an ERROR line carrying one of
+    ``benchmark_patterns(pattern_count)``, the rest are filler that matches
+    none of them.
+
+    Args:
+        file_path (str): Output file.
+        size_mb (float): Target size in MB (1024 * 1024 bytes).
+        line_length (int): Mean length of the text part of a line.
+        distribution (str): One of LINE_LENGTH_DISTRIBUTIONS.
+        match_density (float): Fraction of lines matching a pattern.
+        pattern_count (int): Number of distinct patterns matches are spread over.
+        seed (int): Seed of the random generator, same seed gives the same file.
+
+    Returns:
+        dict: ``{'bytes': ..., 'lines': ..., 'matches': ...}`` actually written.
+    """
+    if distribution not in LINE_LENGTH_DISTRIBUTIONS:
+        raise ValueError(f"Unknown line length distribution '{distribution}'")
+    rng = random.Random(seed)
+    texts = [f"{_filler(rng, _line_length(rng, line_length, distribution))}\n" for _ in range(_POOL_SIZE)]
+    pool = [f"{rng.choice(_LEVELS)} {text}" for text in texts]
+    patterns = benchmark_patterns(pattern_count)
+    target = int(size_mb * 1024 * 1024)
+    timestamp = datetime(2024, 1, 1)
+    written = lines = matches = 0
+
+    with open(file_path, 'w', encoding='utf-8', newline='\n') as f:
+        while written < target:
+            prefix = timestamp.strftime('%Y-%m-%d %H:%M:%S.000 ')
+            batch = [prefix + line for line in rng.choices(pool, k=_BATCH_LINES)]
+            if match_density > 0:
+                hits = min(_BATCH_LINES, int(match_density * _BATCH_LINES + rng.random()))
+                for position in rng.sample(range(_BATCH_LINES), hits):
+                    batch[position] = f"{prefix}ERROR {rng.choice(patterns)} {rng.choice(texts)}"
+                matches += hits
+            data = ''.join(batch)
+            f.write(data)
+            written += len(data)  # ASCII only, characters are bytes
+            lines += _BATCH_LINES
+            timestamp += timedelta(seconds=1)
+    return {'bytes': written, 'lines': lines, 'matches': matches}
+
+
+def _write_summary_log(file_path, rng, tests, pool, filler_lines, config):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(''.join(rng.choices(pool, k=filler_lines)))
+        f.write(f"{config['summary_section_start']}\n")
+        f.write("Script End Time: 08:00:00 AM\n")
+        f.write("Total Run Time: 0:01:00\n")
+        f.write(f"{config['test_no_header']} {config['test_result_header']} Description\n")
+        f.write("-----------------------------------------\n")
+        for test_no, result in tests:
+            separator = '* ' if result == 'FAIL' else ''
+            f.write(f"{test_no} {separator}{result}\n")
+        f.write("\nLogs after summary...\n")
+
+
+def generate_summary_trees(root, files=100, tests_per_file=50, filler_lines=1000, depth=2,
+                           change_rate=0.05, file_churn=0.02, seed=0, config=None):
+    """
+    Creates ``root/previous`` and ``root/current`` result trees of log files
+    ending in a "Test Result Summary" section, as compared by
+    ``TestLogParser.compare_test_summaries``.
+
+    Between the two trees a fraction ``change_rate`` of the test results
+    change, tests are added and removed at the same rate, and a fraction
+    ``file_churn`` of the files only exists in one of the trees.
+
+    Returns:
+        tuple: (previous_dir, current_dir)
+    """
+    config = config or {
+        'summary_section_start': "Test Result Summary",
+        'test_no_header': "Test_ID",
+        'test_result_header': "Test_Result",
+    }
+    rng = random.Random(seed)
+    pool = [f"{rng.choice(_LEVELS)} {_filler(rng, _line_length(rng, 80, 'lognormal'))}\n"
+            for _ in range(_POOL_SIZE)]
+    previous_dir = os.path.join(root, 'previous')
+    current_dir = os.path.join(root, 'current')
+
+    for file_no in range(files):
+        parts = [f"module_{rng.randint(0, 9)}" for _ in range(rng.randint(0, depth))]
+        relative_path = os.path.join(*parts, f"test_suite_{file_no:06d}.log")
+        tests = [(f"TC_{file_no:06d}_{idx:04d}", rng.choice(_RESULTS)) for idx in range(tests_per_file)]
+        current_tests = []
+        for test_no, result in tests:
+            roll = rng.random()
+            if roll < change_rate:
+                current_tests.append((test_no, rng.choice(_RESULTS)))
+            elif roll < 2 * change_rate:
+                continue  # Removed test
+            else:
+                current_tests.append((test_no, result))
+            if rng.random() < change_rate:
+                current_tests.append((f"{test_no}_NEW", rng.choice(_RESULTS)))
+
+        roll = rng.random()
+        for directory, file_tests, skip in ((previous_dir, tests, roll < file_churn / 2),
+                                            (current_dir, current_tests, file_churn / 2 <= roll < file_churn)):
+            if skip:
+                continue
+            file_path = os.path.join(directory, relative_path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            _write_summary_log(file_path, rng, file_tests, pool, filler_lines, config)
+    return previous_dir, current_dir
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.generate',
+        description="Generate deterministic synthetic logs and test result trees."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    log = commands.add_parser('log', help="Write a synthetic log file.")
+    log.add_argument('output')
+    log.add_argument('--size-mb', type=float, default=100)
+    log.add_argument('--line-length', type=int, default=120, help="Mean line length.")
+    log.add_argument('--distribution', choices=LINE_LENGTH_DISTRIBUTIONS, default='lognormal')
+    log.add_argument('--match-density', type=float, default=0.001)
+    log.add_argument('--patterns', type=int, default=10, help="Number of distinct matching patterns.")
+    log.add_argument('--seed', type=int, default=0)
+
+    summaries = commands.add_parser('summaries', help="Write previous/current test result trees.")
+    summaries.add_argument('output')
+    summaries.add_argument('--files', type=int, default=100)
+    summaries.add_argument('--tests-per-file', type=int, default=50)
+    summaries.add_argument('--filler-lines', type=int, default=1000,
+                           help="Log lines before the summary section.")
+    summaries.add_argument('--change-rate', type=float, default=0.05)
+    summaries.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'log':
+        stats = generate_log(args.output, args.size_mb, args.line_length, args.distribution,
+                             args.match_density, args.patterns, args.seed)
+        print(f"Wrote {args.output}: {stats['bytes']} bytes, {stats['lines']} lines, "
+              f"{stats['matches']} matching lines")
+    else:
+        previous_dir, current_dir = generate_summary_trees(
+            args.output, args.files, args.tests_per_file, args.filler_lines,
+            change_rate=args.change_rate, seed=args.seed
+        )
+        print(f"Wrote {previous_dir} and {current_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
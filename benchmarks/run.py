@@ -0,0 +1,264 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.generate import benchmark_patterns, generate_log, generate_summary_trees
+
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), 'log-file-search-bench')
+SEARCH_PATTERN_COUNTS = (1, 10, 100)
+PARSING_CONFIG = {
+    'summary_section_start': "Test Result Summary",
+    'test_no_header': "Test_ID",
+    'test_result_header': "Test_Result",
+}
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def bench_load(log_path):
+    """What display_file_content does: index the file and decode the first page."""
+    from log_document import LogDocument
+
+    start = time.perf_counter()
+    document = LogDocument(log_path)
+    document.get_lines(1, 200)
+    seconds = time.perf_counter() - start
+    document.close()
+    return {'seconds': seconds}
+
+
+def bench_search(log_path, pattern_count):
+    """What a SearchJob does for ``pattern_count`` literal patterns, on an already opened file."""
+    from log_document import LogDocument
+    from search_engine import PatternMatcher, candidate_ranges, iter_match_batches
+
+    document = LogDocument(log_path)
+    start = time.perf_counter()
+    matcher = PatternMatcher(benchmark_patterns(pattern_count))
+    matches = 0
+    for _, batch in iter_match_batches(document, matcher, candidate_ranges(document, matcher)):
+        matches += len(batch)
+    seconds = time.perf_counter() - start
+    document.close()
+    return {'seconds': seconds, 'matches': matches}
+
+
+def bench_parse_summaries(file_paths):
+    """_parse_summary_section over every file of a result tree."""
+    import TestLogParser
+
+    TestLogParser._SCRIPT_LOG_LEVEL = TestLogParser.LOG_LEVEL_ERROR
+    start = time.perf_counter()
+    tests = sum(len(TestLogParser._parse_summary_section(path, PARSING_CONFIG) or []) for path in file_paths)
+    return {'seconds': time.perf_counter() - start, 'tests': tests}
+
+
+def bench_compare(previous_dir, current_dir, output_excel_file):
+    """compare_test_summaries end to end, Excel report included."""
+    import TestLogParser
+
+    TestLogParser._SCRIPT_LOG_LEVEL = TestLogParser.LOG_LEVEL_ERROR
+    start = time.perf_counter()
+    # Without the parse cache, repeated runs would only measure cache lookups
+    TestLogParser.compare_test_summaries(previous_dir, current_dir, output_excel_file, PARSING_CONFIG, cache_path=None)
+    return {'seconds': time.perf_counter() - start}
+
+
+def _run_case(function, args):
+    # Runs in a fresh worker process, so peak RSS belongs to this case alone
+    result = function(*args)
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def run_case(function, args, repeat):
+    """Runs a benchmark ``repeat`` times in fresh processes, keeping the fastest run."""
+    best = None
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            result = executor.submit(_run_case, function, args).result()
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def _tree_stats(directory):
+    paths = []
+    size = lines = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            paths.append(path)
+            with open(path, 'rb') as f:
+                data = f.read()
+            size += len(data)
+            lines += data.count(b'\n')
+    return sorted(paths), size, lines
+
+
+def _count_lines(file_path):
+    lines = 0
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(16 * 1024 * 1024), b''):
+            lines += block.count(b'\n')
+    return lines
+
+
+def prepare_data(args):
+    """Generates (or reuses) the inputs for ``args``, returns their paths and sizes."""
+    os.makedirs(args.workdir, exist_ok=True)
+    log_path = os.path.join(
+        args.workdir,
+        f"bench-{args.size_mb:g}mb-{args.line_length}-{args.distribution}-"
+        f"{args.match_density:g}-{max(SEARCH_PATTERN_COUNTS)}-{args.seed}.log"
+    )
+    if not os.path.exists(log_path):
+        print(f"Generating {log_path} ...", file=sys.stderr)
+        tmp_path = f"{log_path}.tmp"
+        generate_log(tmp_path, args.size_mb, args.line_length, args.distribution,
+                     args.match_density, max(SEARCH_PATTERN_COUNTS), args.seed)
+        os.replace(tmp_path, log_path)
+
+    tree_root = os.path.join(args.workdir, f"summaries-{args.files}-{args.tests_per_file}-{args.seed}")
+    if not os.path.isdir(tree_root):
+        print(f"Generating {tree_root} ...", file=sys.stderr)
+        tmp_root = f"{tree_root}.tmp"
+        generate_summary_trees(tmp_root, args.files, args.tests_per_file, seed=args.seed)
+        os.replace(tmp_root, tree_root)
+
+    return {
+        'log_path': log_path,
+        'log_bytes': os.path.getsize(log_path),
+        'log_lines': _count_lines(log_path),
+        'previous_dir': os.path.join(tree_root, 'previous'),
+        'current_dir': os.path.join(tree_root, 'current'),
+    }
+
+
+def run_benchmarks(args):
+    data = prepare_data(args)
+    previous_files, previous_bytes, previous_lines = _tree_stats(data['previous_dir'])
+    _, current_bytes, current_lines = _tree_stats(data['current_dir'])
+
+    cases = [('load', bench_load, (data['log_path'],), data['log_bytes'], data['log_lines'])]
+    for count in SEARCH_PATTERN_COUNTS:
+        cases.append((f"search_{count}", bench_search, (data['log_path'], count),
+                      data['log_bytes'], data['log_lines']))
+    cases.append(('parse_summary', bench_parse_summaries, (previous_files,), previous_bytes, previous_lines))
+    cases.append(('compare_summaries', bench_compare,
+                  (data['previous_dir'], data['current_dir'], os.path.join(args.workdir, 'report.xlsx')),
+                  previous_bytes + current_bytes, previous_lines + current_lines))
+
+    results = {}
+    for name, function, case_args, size, lines in cases:
+        if args.only and name not in args.only:
+            continue
+        try:
+            result = run_case(function, case_args, args.repeat)
+        except ImportError as e:
+            # E.g. pandas/openpyxl missing for the TestLogParser cases
+            print(f"{name}: skipped ({e})", file=sys.stderr)
+            results[name] = {'skipped': str(e)}
+            continue
+        seconds = result['seconds']
+        result.update(
+            bytes=size,
+            lines=lines,
+            mb_per_s=round(size / (1024 * 1024) / seconds, 1) if seconds else None,
+            lines_per_s=round(lines / seconds) if seconds else None,
+        )
+        results[name] = result
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_report(results, baseline=None, out=sys.stdout):
+    out.write(f"{'case':<20}{'seconds':>10}{'MB/s':>10}{'lines/s':>14}{'peak RSS MB':>13}")
+    out.write(f"{'vs baseline':>13}\n" if baseline else "\n")
+    for name, result in results.items():
+        if 'skipped' in result:
+            out.write(f"{name:<20}{'skipped':>10}\n")
+            continue
+        out.write(f"{name:<20}{result['seconds']:>10.3f}{result['mb_per_s'] or 0:>10.1f}"
+                  f"{result['lines_per_s'] or 0:>14,}{result['peak_rss_mb'] or 0:>13.1f}")
+        previous = (baseline or {}).get(name, {})
+        if baseline and previous.get('seconds'):
+            # > 1.00x means faster than the baseline
+            out.write(f"{previous['seconds'] / result['seconds']:>12.2f}x")
+        out.write("\n")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.run',
+        description="Time loading, searching and test summary comparison on synthetic data."
+    )
+    parser.add_argument('--size-mb', type=float, default=100, help="Size of the generated log.")
+    parser.add_argument('--line-length', type=int, default=120, help="Mean line length.")
+    parser.add_argument('--distribution', choices=('fixed', 'uniform', 'lognormal'), default='lognormal')
+    parser.add_argument('--match-density', type=float, default=0.001, help="Fraction of matching lines.")
+    parser.add_argument('--files', type=int, default=200, help="Log files per result tree.")
+    parser.add_argument('--tests-per-file', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per case, the fastest is kept.")
+    parser.add_argument('--only', nargs='+', metavar='CASE', help="Run only these cases.")
+    parser.add_argument('--workdir', default=DEFAULT_WORKDIR, help="Where generated data is kept.")
+    parser.add_argument('-o', '--output', help="Write the results to this JSON file.")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+
+    results = run_benchmarks(args)
+    print_report(results, baseline)
+    if args.output:
+        report = {
+            'meta': {
+                'date': datetime.now().isoformat(timespec='seconds'),
+                'commit': _git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'args': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
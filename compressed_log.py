@@ -0,0 +1,321 @@
+import bz2
+import hashlib
+import json
+import lzma
+import os
+import sys
+import threading
+import weakref
+import zlib
+from array import array
+from bisect import bisect_right
+
+from instrumentation import metrics
+from line_index import LineIndex, DEFAULT_ENCODING, DEFAULT_ERRORS
+
+# Bump whenever the on-disk layout changes
+INDEX_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'log-file-search', 'compressed')
+# Compressed bytes fed to the decompressor at a time
+_READ_BYTES = 256 * 1024
+# Minimum uncompressed distance between two access points. Reaching any byte
+# costs at most this much decompression once the access points exist.
+CHECKPOINT_SPAN = 16 * 1024 * 1024
+
+
+def _gzip_decompressor():
+    return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+# What reading a corrupt or unsupported compressed file may raise
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error, lzma.LZMAError)
+
+_DECOMPRESSORS = {
+    '.gz': _gzip_decompressor,
+    '.bz2': bz2.BZ2Decompressor,
+    '.xz': lzma.LZMADecompressor,
+}
+
+
+def compression_of(file_path):
+    """Returns the compressed suffix ('.gz', '.bz2', '.xz') of ``file_path``, or None."""
+    suffix = os.path.splitext(file_path)[1].lower()
+    return suffix if suffix in _DECOMPRESSORS else None
+
+
+def is_compressed(file_path):
+    return compression_of(file_path) is not None
+
+
+class _Stream:
+    """
+    Decompresses a file front to back from a known position.
+
+    Files made of several concatenated members/streams (``cat a.gz b.gz``,
+    bgzip, pbzip2) are decompressed as one. The start of every member after
+    the first is recorded in ``member_starts`` as ``(uncompressed_offset,
+    compressed_offset)``: a fresh decompressor can resume there, so these
+    are access points that survive being saved to disk.
+    """
+
+    def __init__(self, file_path, kind, in_pos=0, out_pos=0, decompressor=None):
+        self.kind = kind
+        self._file = open(file_path, 'rb')
+        self._file.seek(in_pos)
+        self.in_pos = in_pos  # Next compressed byte to read
+        self.out_pos = out_pos  # Uncompressed offset after the last block returned
+        self.decompressor = decompressor or _DECOMPRESSORS[kind]()
+        self.member_starts = []
+        self._member_ended = False  # A member ended exactly at the end of the last read
+
+    def read(self):
+        """Returns the next block of uncompressed bytes, b'' at the end of the file."""
+        while True:
+            if self._file.closed:
+                return b''
+            data = self._file.read(_READ_BYTES)
+            if not data:
+                # A truncated last member (e.g. still being written) simply ends
+                self._file.close()
+                return b''
+            if self._member_ended:
+                self.member_starts.append((self.out_pos, self.in_pos))
+                self._member_ended = False
+            self.in_pos += len(data)
+            parts = []
+            produced = 0
+            while True:
+                part = self.decompressor.decompress(data)
+                parts.append(part)
+                produced += len(part)
+                if not self.decompressor.eof:
+                    break
+                data = self.decompressor.unused_data
+                if not data:
+                    # The next member, if any, starts with the next read
+                    self.decompressor = _DECOMPRESSORS[self.kind]()
+                    self._member_ended = True
+                    break
+                self.decompressor = _DECOMPRESSORS[self.kind]()
+                self.member_starts.append((self.out_pos + produced, self.in_pos - len(data)))
+            if produced:
+                self.out_pos += produced
+                return b''.join(parts)
+
+    def close(self):
+        self._file.close()
+
+
+def iter_decompressed(file_path):
+    """Yields the uncompressed content of ``file_path`` block by block, in one pass."""
+    stream = _Stream(file_path, compression_of(file_path))
+    try:
+        while True:
+            block = stream.read()
+            if not block:
+                return
+            yield block
+    finally:
+        stream.close()
+
+
+def index_path_for(file_path, cache_dir=None):
+    key = hashlib.sha1(os.path.realpath(file_path).encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"{key}.idx")
+
+
+class CompressedLineIndex(LineIndex):
+    """
+    A LineIndex over the uncompressed content of a .gz, .bz2 or .xz log.
+
+    Offsets are positions in the uncompressed data. The file is decompressed
+    once to find the line starts, without writing the uncompressed data
+    anywhere. Lines are read back by decompressing forward from the nearest
+    access point:
+
+    - gzip: a snapshot of the decompressor every ``CHECKPOINT_SPAN`` bytes.
+      These are taken during the indexing pass and during later reads.
+    - All formats: the start of every concatenated member.
+
+    Snapshots only live for the session, because zlib's state cannot be
+    serialised. The line offsets and the member access points are saved
+    under ``cache_dir``, so reopening an unchanged file needs no indexing
+    pass. Every thread keeps its own read position, so a search scanning
+    forward and the viewer jumping around do not reset each other.
+    """
+
+    def __init__(self, file_path, encoding=DEFAULT_ENCODING, errors=DEFAULT_ERRORS, cache_dir=None):
+        self.file_path = file_path
+        self.encoding = encoding
+        self.errors = errors
+        self.kind = compression_of(file_path)
+        self._file = open(file_path, 'rb')
+        st = os.fstat(self._file.fileno())
+        self._stat = {'inode': st.st_ino, 'file_size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Streams of the reading threads, closed with the index. Weak, so
+        # the stream of a thread that ended goes away with it
+        self._streams = weakref.WeakSet()
+        self._closed = False
+        self._checkpoint_outs = array('q', (0,))
+        self._checkpoints = [(0, 0, None)]  # [(uncompressed, compressed, decompressor or None)]
+
+        self._index_path = index_path_for(file_path, cache_dir)
+        if not self._load():
+            with metrics.stage('index_build'):
+                self._build()
+            try:
+                self._save()
+            except OSError:
+                # A read-only cache dir only costs the next session a pass
+                pass
+
+    def _build(self):
+        offsets = array('q')
+        append = offsets.append
+        stream = _Stream(self.file_path, self.kind)
+        last = b''
+        while True:
+            block = stream.read()
+            if not block:
+                break
+            base = stream.out_pos - len(block)
+            if base == 0:
+                append(0)
+            find = block.find
+            pos = find(b'\n')
+            while pos != -1:
+                append(base + pos + 1)
+                pos = find(b'\n', pos + 1)
+            last = block[-1:]
+            self._add_checkpoints(stream)
+        self.size = stream.out_pos
+        # A trailing newline terminates the last line, it does not start a new one
+        if offsets and offsets[-1] == self.size:
+            offsets.pop()
+        self.offsets = offsets
+        self._newline_at_end = last in (b'', b'\n')
+
+    def _add_checkpoints(self, stream):
+        with self._lock:
+            for out_pos, in_pos in stream.member_starts:
+                self._insert_checkpoint(out_pos, in_pos, None)
+            stream.member_starts.clear()
+            if hasattr(stream.decompressor, 'copy'):
+                self._insert_checkpoint(stream.out_pos, stream.in_pos, stream.decompressor)
+
+    def _insert_checkpoint(self, out_pos, in_pos, decompressor):
+        outs = self._checkpoint_outs
+        position = bisect_right(outs, out_pos)
+        if out_pos - outs[position - 1] < CHECKPOINT_SPAN or \
+                (position < len(outs) and outs[position] - out_pos < CHECKPOINT_SPAN):
+            return
+        outs.insert(position, out_pos)
+        self._checkpoints.insert(position, (out_pos, in_pos, decompressor and decompressor.copy()))
+
+    def _save(self):
+        members = array('q')
+        for out_pos, in_pos, decompressor in self._checkpoints[1:]:
+            if decompressor is None:
+                members.extend((out_pos, in_pos))
+        header = dict(self._stat, version=INDEX_VERSION, size=self.size, lines=len(self.offsets),
+                      members=len(members) // 2, newline_at_end=self._newline_at_end,
+                      byteorder=sys.byteorder)
+        os.makedirs(os.path.dirname(self._index_path), exist_ok=True)
+        # Written to a temporary file first so readers never see half an index
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            self.offsets.tofile(f)
+            members.tofile(f)
+        os.replace(tmp_path, self._index_path)
+
+    def _load(self):
+        try:
+            with open(self._index_path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header.get('version') != INDEX_VERSION or \
+                        any(header.get(key) != value for key, value in self._stat.items()):
+                    return False
+                offsets = array('q')
+                members = array('q')
+                offsets.fromfile(f, header['lines'])
+                members.fromfile(f, 2 * header['members'])
+        except (OSError, ValueError, EOFError, KeyError):
+            return False
+        if header['byteorder'] != sys.byteorder:
+            offsets.byteswap()
+            members.byteswap()
+        self.offsets = offsets
+        self.size = header['size']
+        self._newline_at_end = header['newline_at_end']
+        for i in range(0, len(members), 2):
+            self._checkpoint_outs.append(members[i])
+            self._checkpoints.append((members[i], members[i + 1], None))
+        return True
+
+    def extend(self):
+        # Compressed logs are rewritten as a whole, never appended to in place
+        return 0
+
+    def ends_with_newline(self, size=None):
+        if size is None or size == self.size:
+            return self._newline_at_end
+        return size == 0 or self.read_bytes(size - 1, size) == b'\n'
+
+    def read_bytes(self, start, end):
+        end = min(end, self.size)
+        if start >= end or self._closed:
+            return b''
+        local = self._local
+        with self._lock:
+            out_pos, in_pos, decompressor = self._checkpoints[bisect_right(self._checkpoint_outs, start) - 1]
+        stream = getattr(local, 'stream', None)
+        if stream is None or local.buffer_start > start or stream.out_pos < out_pos:
+            # Behind the requested range, or an access point is closer
+            if stream is not None:
+                stream.close()
+            stream = local.stream = _Stream(self.file_path, self.kind, in_pos, out_pos,
+                                            decompressor and decompressor.copy())
+            with self._lock:
+                self._streams.add(stream)
+                if self._closed:
+                    # Closed while the stream was being opened
+                    stream.close()
+            local.buffer = b''
+            local.buffer_start = out_pos
+
+        buffer = local.buffer
+        buffer_start = local.buffer_start
+        while buffer_start + len(buffer) < end:
+            block = stream.read()
+            if not block:
+                break
+            self._add_checkpoints(stream)
+            if buffer_start + len(buffer) <= start:
+                # Nothing buffered so far is wanted
+                buffer = block
+                buffer_start = stream.out_pos - len(block)
+            else:
+                buffer += block
+        data = buffer[start - buffer_start:end - buffer_start]
+        # Keep the requested range buffered, the next read usually starts
+        # inside it or right after it
+        local.buffer = buffer[start - buffer_start:]
+        local.buffer_start = start
+        return data
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            streams = list(self._streams)
+            self._streams.clear()
+        for stream in streams:
+            stream.close()
+        self._file.close()
+        self._checkpoints = self._checkpoints[:1]
+        self._checkpoint_outs = self._checkpoint_outs[:1]
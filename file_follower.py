@@ -0,0 +1,142 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+
+# inotify event masks, see inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_MOVE_SELF = 0x00000800
+_IN_DELETE_SELF = 0x00000400
+_IN_WATCH_MASK = _IN_MODIFY | _IN_ATTRIB | _IN_MOVE_SELF | _IN_DELETE_SELF
+_IN_NONBLOCK = os.O_NONBLOCK if hasattr(os, 'O_NONBLOCK') else 0
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+class FileWatcher:
+    """
+    Tells whether a file may have changed since the last call to ``pending``.
+
+    Uses inotify on Linux, so an idle log costs no system calls beyond one
+    non-blocking read per poll. Everywhere else (or if inotify cannot be set
+    up) it degrades to polling and ``pending`` always answers True, leaving
+    the caller to stat the file.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._fd = None
+        self._lost_file = False  # The watched inode was moved or deleted
+        if _libc is not None:
+            fd = _libc.inotify_init1(_IN_NONBLOCK)
+            if fd >= 0:
+                self._fd = fd
+                self._watch()
+
+    @property
+    def uses_inotify(self):
+        return self._fd is not None
+
+    def _watch(self):
+        if _libc.inotify_add_watch(self._fd, os.fsencode(self.file_path), _IN_WATCH_MASK) < 0:
+            # Nothing to watch (e.g. rotated away and not recreated yet), poll
+            self._lost_file = True
+        else:
+            self._lost_file = False
+
+    def pending(self):
+        if self._fd is None:
+            return True
+        if self._lost_file:
+            # Keep trying until the log reappears at its path
+            self._watch()
+            return True
+        changed = False
+        try:
+            while True:
+                data = os.read(self._fd, 4096)
+                if not data:
+                    break
+                changed = True
+                position = 0
+                while position < len(data):
+                    _, mask, _, name_length = _EVENT_HEADER.unpack_from(data, position)
+                    if mask & (_IN_MOVE_SELF | _IN_DELETE_SELF):
+                        self._lost_file = True
+                    position += _EVENT_HEADER.size + name_length
+        except BlockingIOError:
+            pass
+        return changed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class LogFollower:
+    """
+    Follows a LogDocument as its file is appended to.
+
+    ``poll`` reads only the bytes added since the previous call and reports
+    which complete lines are new. A line still being written (no trailing
+    newline yet) is reported once it is finished. Rotation (a new file at
+    the same path) and truncation cannot be followed incrementally and are
+    reported so the caller can reload.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.watcher = FileWatcher(document.file_path)
+        self.last_line = document.complete_line_count  # Last line already reported
+
+    def poll(self):
+        """
+        Returns None when nothing changed, ``('append', first_line, last_line)``
+        for newly completed lines, or ``('rotated', None, None)`` /
+        ``('truncated', None, None)`` when the document must be reloaded.
+        """
+        if not self.watcher.pending():
+            return None
+        try:
+            st = os.stat(self.document.file_path)
+        except OSError:
+            # Rotated away and not recreated yet
+            return None
+        if st.st_ino != self.document.fingerprint[0]:
+            return ('rotated', None, None)
+        if self.document.compressed:
+            # Compressed logs are rewritten rather than appended to, any
+            # change means the whole file has to be read again
+            if (st.st_size, st.st_mtime_ns) != self.document.fingerprint[1:]:
+                return ('rotated', None, None)
+            return None
+        if st.st_size < self.document.size:
+            return ('truncated', None, None)
+        if st.st_size > self.document.size:
+            self.document.extend()
+        complete = self.document.complete_line_count
+        if complete <= self.last_line:
+            return None
+        first = self.last_line + 1
+        self.last_line = complete
+        return ('append', first, complete)
+
+    def close(self):
+        self.watcher.close()
@@ -0,0 +1,180 @@
+# Per-stage timers and counters shared by the GUI, the CLI and the test
+# summary comparison. Nothing in here may import tkinter.
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process in MB, None where unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class _NullStage:
+    # Shared by every stage while metrics are disabled
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Wall time per stage (file open, index build, scan, tag application,
+    widget insert, Excel write ...) plus counters such as bytes and lines
+    processed and matches found.
+
+    Disabled by default. While disabled, ``stage()`` returns a shared no-op
+    context manager and ``add()`` returns at once, so call sites cost one
+    method call. Hot loops never report per line: they count locally and
+    report once per chunk or per job.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.timings = {}  # {stage: [calls, seconds, max_seconds]}
+        self.counters = {}  # {name: value}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        """Context manager timing one run of stage ``name``."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                self.timings[name] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                timing[2] = max(timing[2], seconds)
+
+    def add(self, name, amount=1):
+        """Adds ``amount`` to counter ``name``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+            self.counters.clear()
+
+    def snapshot(self):
+        """Returns the collected data as a JSON-serialisable dict."""
+        with self._lock:
+            timings = {
+                name: {'calls': calls, 'seconds': round(seconds, 6), 'max_seconds': round(max_seconds, 6)}
+                for name, (calls, seconds, max_seconds) in sorted(self.timings.items())
+            }
+            counters = dict(sorted(self.counters.items()))
+        return {'timings': timings, 'counters': counters, 'peak_rss_mb': peak_rss_mb()}
+
+    def format(self):
+        """Returns the snapshot as aligned plain text, e.g. for a status panel."""
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<24}{'calls':>8}{'total s':>12}{'max s':>12}"]
+        for name, timing in snapshot['timings'].items():
+            lines.append(f"{name:<24}{timing['calls']:>8}{timing['seconds']:>12.3f}{timing['max_seconds']:>12.3f}")
+        lines.append("")
+        for name, value in snapshot['counters'].items():
+            lines.append(f"{name:<24}{value:>20,}")
+        if snapshot['peak_rss_mb'] is not None:
+            lines.append(f"{'peak_rss_mb':<24}{snapshot['peak_rss_mb']:>20}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, file_path):
+        """Writes the snapshot as JSON to ``file_path`` ('-' for stderr)."""
+        data = json.dumps(self.snapshot(), indent=2) + '\n'
+        if file_path == '-':
+            sys.stderr.write(data)
+        else:
+            with open(file_path, 'w') as out:
+                out.write(data)
+
+
+# The application-wide instance every module reports to
+metrics = Metrics()
+
+
+class ProfileCapture:
+    """
+    cProfile and tracemalloc over one run of some code, e.g. one search::
+
+        with ProfileCapture('search.prof') as capture:
+            ...
+        print(capture.summary)
+
+    cProfile only sees the thread the capture is entered in, so a search is
+    captured inside its worker thread. ``output_path`` (optional) receives
+    the raw profile for pstats or snakeviz; ``summary`` holds the top functions
+    by cumulative time and the peak of traced allocations.
+    """
+
+    def __init__(self, output_path=None, top=25):
+        self.output_path = output_path
+        self.top = top
+        self.summary = None
+        self.peak_traced_mb = None
+        self._profile = cProfile.Profile()
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profile.disable()
+        self.peak_traced_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        if self.output_path:
+            self._profile.dump_stats(self.output_path)
+        out = io.StringIO()
+        pstats.Stats(self._profile, stream=out).sort_stats('cumulative').print_stats(self.top)
+        self.summary = f"peak traced allocations: {self.peak_traced_mb} MB\n{out.getvalue()}"
+        return False
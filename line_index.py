@@ -0,0 +1,133 @@
+import mmap
+import os
+from array import array
+from bisect import bisect_right
+
+from instrumentation import metrics
+
+# Encoding used to turn raw log bytes into displayable text. Logs routinely
+# contain binary junk, so undecodable bytes are replaced rather than raising.
+DEFAULT_ENCODING = 'utf-8'
+DEFAULT_ERRORS = 'replace'
+
+
+class LineIndex:
+    """
+    Memory-maps a log file and records the byte offset at which every line
+    starts, so any line (or window of lines) can be fetched without reading
+    the rest of the file.
+
+    Line numbers are 1-based to match what the viewer and result list show.
+    """
+
+    def __init__(self, file_path, encoding=DEFAULT_ENCODING, errors=DEFAULT_ERRORS):
+        self.file_path = file_path
+        self.encoding = encoding
+        self.errors = errors
+        self._file = open(file_path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap refuses zero-length files, an empty log simply has no lines
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.offsets = self._build_offsets()
+
+    def _build_offsets(self):
+        offsets = array('q')
+        with metrics.stage('index_build'):
+            self._index_lines(offsets, 0)
+        return offsets
+
+    def _index_lines(self, offsets, start):
+        # Appends the start of every line beginning at or after byte ``start``,
+        # which must itself be the start of a line
+        if self._mm is None or start >= self.size:
+            return
+        find = self._mm.find
+        append = offsets.append
+        append(start)
+        pos = find(b'\n', start)
+        while pos != -1:
+            append(pos + 1)
+            pos = find(b'\n', pos + 1)
+        # A trailing newline terminates the last line, it does not start a new one
+        if offsets[-1] == self.size:
+            offsets.pop()
+
+    def extend(self):
+        """
+        Picks up bytes appended to the file since it was indexed, returning
+        the number of bytes added. Only the new bytes are scanned. A last line
+        that had no newline yet simply grows.
+
+        The previous map is dropped rather than closed, readers in other
+        threads that still hold it finish with the old (still valid) view.
+        """
+        new_size = os.fstat(self._file.fileno()).st_size
+        old_size = self.size
+        if new_size <= old_size:
+            return 0
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = new_size
+        if self.ends_with_newline(old_size):
+            self._index_lines(self.offsets, old_size)
+        else:
+            pos = self._mm.find(b'\n', old_size)
+            if pos != -1:
+                self._index_lines(self.offsets, pos + 1)
+        return new_size - old_size
+
+    def ends_with_newline(self, size=None):
+        """True when the first ``size`` bytes (default: all) end on a complete line."""
+        size = self.size if size is None else size
+        return size == 0 or self._mm[size - 1] == 0x0a
+
+    @property
+    def line_count(self):
+        return len(self.offsets)
+
+    def line_span(self, line_no):
+        """Returns the (start, end) byte offsets of a line, newline included."""
+        start = self.offsets[line_no - 1]
+        end = self.offsets[line_no] if line_no < len(self.offsets) else self.size
+        return start, end
+
+    def read_bytes(self, start, end):
+        return self._mm[start:end] if self._mm is not None else b''
+
+    def get_line_bytes(self, line_no):
+        return self.read_bytes(*self.line_span(line_no))
+
+    def get_line(self, line_no):
+        return self.get_lines(line_no, line_no)[0]
+
+    def get_lines(self, first, last):
+        """
+        Returns the decoded lines ``first``..``last`` (inclusive, 1-based) as a
+        list. The whole range is sliced out of the map in one go and split
+        afterwards, which is much cheaper than one slice per line.
+        """
+        if first > last or not self.offsets:
+            return []
+        start = self.offsets[first - 1]
+        end = self.line_span(last)[1]
+        # str.splitlines() also breaks on \r, \x0c, \u2028 ... which would
+        # desynchronise the result from the offset index, so split on \n only
+        parts = self.read_bytes(start, end).decode(self.encoding, self.errors).split('\n')
+        tail = parts.pop()
+        # Like text-mode open(), present \r\n line endings as plain \n
+        lines = [(part[:-1] if part.endswith('\r') else part) + '\n' for part in parts]
+        if tail:
+            lines.append(tail)
+        return lines
+
+    def line_at_offset(self, offset):
+        """Returns the 1-based number of the line containing byte ``offset``."""
+        return bisect_right(self.offsets, offset)
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
@@ -0,0 +1,199 @@
+import os
+import threading
+from collections import OrderedDict
+
+from compressed_log import CompressedLineIndex, is_compressed
+from instrumentation import metrics
+from line_index import LineIndex, DEFAULT_ENCODING, DEFAULT_ERRORS
+
+# Lines are decoded and cached in fixed-size chunks
+CHUNK_LINES = 4096
+# Budget for decoded lines kept per document, in (approximate) bytes
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+# Per-line overhead of a str object on top of its characters
+_STR_OVERHEAD = 50
+# Number of documents kept open by get_document()
+MAX_OPEN_DOCUMENTS = 4
+
+
+def file_fingerprint(file_path):
+    """Returns the (inode, size, mtime) triple used to detect changed files."""
+    st = os.stat(file_path)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class LogDocument:
+    """
+    A log file as the rest of the application sees it.
+
+    Owns the file handle (through its LineIndex), the line-offset index and
+    an LRU cache of decoded lines. Searches, highlighting and the viewer all
+    read lines through the document, so an unchanged file is indexed once and
+    its decoded lines are reused across searches as long as they fit in the
+    cache budget.
+    """
+
+    def __init__(self, file_path, encoding=DEFAULT_ENCODING, errors=DEFAULT_ERRORS,
+                 cache_bytes=DEFAULT_CACHE_BYTES):
+        self.file_path = file_path
+        self.fingerprint = file_fingerprint(file_path)
+        # .gz/.bz2/.xz logs are indexed over their uncompressed content
+        self.compressed = is_compressed(file_path)
+        index_class = CompressedLineIndex if self.compressed else LineIndex
+        self.index = index_class(file_path, encoding, errors)
+        self.cache_bytes = cache_bytes
+        self._chunks = OrderedDict()  # {chunk_number: [line, ...]}
+        self._chunk_sizes = {}
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.trigram_index = None  # Attached on demand by trigram_index.get_trigram_index()
+        # Attached on demand by time_index.get_time_index(), False for logs
+        # without timestamps. Extended in place when the file grows.
+        self.time_index = None
+        # RecordIndex per record start pattern, see record_index.get_record_index()
+        self.record_indexes = {}
+
+    @property
+    def line_count(self):
+        return self.index.line_count
+
+    @property
+    def size(self):
+        return self.index.size
+
+    @property
+    def complete_line_count(self):
+        """Number of lines terminated by a newline, i.e. excluding a line still being written."""
+        return self.line_count if self.index.ends_with_newline() else self.line_count - 1
+
+    def is_stale(self):
+        """True when the file on disk was replaced, truncated, grew or was touched."""
+        try:
+            return file_fingerprint(self.file_path) != self.fingerprint
+        except OSError:
+            return True
+
+    def extend(self):
+        """
+        Picks up bytes appended to the file in place (tail -f style) without
+        re-indexing what was already read. Returns True if the file grew.
+        """
+        old_count = self.line_count
+        if not self.index.extend():
+            return False
+        if old_count:
+            # The previous last line may have grown, its chunk is outdated
+            with self._lock:
+                chunk_number = (old_count - 1) // CHUNK_LINES
+                if self._chunks.pop(chunk_number, None) is not None:
+                    self._cached_bytes -= self._chunk_sizes.pop(chunk_number)
+        # Record the size actually indexed, anything appended since then
+        # still makes the document stale
+        st = os.fstat(self.index.fileno())
+        self.fingerprint = (st.st_ino, self.index.size, st.st_mtime_ns)
+        # The persisted index is extended incrementally on its next use
+        self.trigram_index = None
+        return True
+
+    def get_line(self, line_no):
+        return self.get_lines(line_no, line_no)[0]
+
+    def get_lines(self, first, last):
+        """Returns the decoded lines ``first``..``last`` (inclusive, 1-based)."""
+        last = min(last, self.line_count)
+        lines = []
+        while first <= last:
+            chunk_number = (first - 1) // CHUNK_LINES
+            chunk_first = chunk_number * CHUNK_LINES + 1
+            chunk = self._chunk(chunk_number)
+            if not chunk:
+                # Only a closed index has no lines to give
+                raise ValueError(f"{self.file_path} is closed")
+            lines.extend(chunk[first - chunk_first:last - chunk_first + 1])
+            first = chunk_first + len(chunk)
+        return lines
+
+    def iter_chunk_bounds(self, first=1, last=None):
+        """Yields ``(first_line_number, last_line_number)`` of consecutive chunks of the file."""
+        last = self.line_count if last is None else min(last, self.line_count)
+        while first <= last:
+            chunk_end = min(last, ((first - 1) // CHUNK_LINES + 1) * CHUNK_LINES)
+            yield first, chunk_end
+            first = chunk_end + 1
+
+    def iter_chunks(self, first=1, last=None):
+        """Yields ``(first_line_number, lines)`` for consecutive chunks of the file."""
+        for chunk_first, chunk_last in self.iter_chunk_bounds(first, last):
+            yield chunk_first, self.get_lines(chunk_first, chunk_last)
+
+    def line_span(self, line_no):
+        return self.index.line_span(line_no)
+
+    def read_bytes(self, start, end):
+        return self.index.read_bytes(start, end)
+
+    def line_at_offset(self, offset):
+        return self.index.line_at_offset(offset)
+
+    def _chunk(self, chunk_number):
+        with self._lock:
+            chunk = self._chunks.get(chunk_number)
+            if chunk is not None:
+                self._chunks.move_to_end(chunk_number)
+                return chunk
+
+        first = chunk_number * CHUNK_LINES + 1
+        last = min(first + CHUNK_LINES - 1, self.line_count)
+        chunk = self.index.get_lines(first, last)
+        size = self.index.line_span(last)[1] - self.index.offsets[first - 1] + _STR_OVERHEAD * len(chunk)
+        if size > self.cache_bytes:
+            return chunk
+
+        with self._lock:
+            if chunk_number not in self._chunks:
+                self._chunks[chunk_number] = chunk
+                self._chunk_sizes[chunk_number] = size
+                self._cached_bytes += size
+                while self._cached_bytes > self.cache_bytes:
+                    evicted, _ = self._chunks.popitem(last=False)
+                    self._cached_bytes -= self._chunk_sizes.pop(evicted)
+        return chunk
+
+    def close(self):
+        with self._lock:
+            self._chunks.clear()
+            self._chunk_sizes.clear()
+            self._cached_bytes = 0
+        self.index.close()
+
+
+_documents = OrderedDict()  # {real_path: LogDocument}
+_documents_lock = threading.Lock()
+
+
+def get_document(file_path):
+    """
+    Returns the shared LogDocument for ``file_path``, re-indexing it only if
+    the file changed (inode, size or mtime) since it was last loaded.
+
+    Documents that are replaced or fall out of the cache are not closed,
+    callers may still be reading them; their file is released once the last
+    reference goes away.
+    """
+    key = os.path.realpath(file_path)
+    with _documents_lock:
+        document = _documents.get(key)
+        if document is not None and not document.is_stale():
+            _documents.move_to_end(key)
+            return document
+        if document is not None:
+            del _documents[key]
+
+        with metrics.stage('file_open'):
+            document = LogDocument(file_path)
+        metrics.add('bytes_indexed', document.size)
+        metrics.add('lines_indexed', document.line_count)
+        _documents[key] = document
+        while len(_documents) > MAX_OPEN_DOCUMENTS:
+            _documents.popitem(last=False)
+        return document
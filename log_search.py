@@ -1,15 +1,38 @@
 import re
 import json
 import os
+import queue
+import multiprocessing
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog, colorchooser
 
-# Debug macro
-DEBUG = True
-
-def debug_print(message):
+from instrumentation import ProfileCapture, metrics
+from log_document import get_document
+from log_viewer import VirtualTextView, HighlightLayer, MatchMinimap, ResultRows, ListRows
+from match_density import hits_by_pattern
+from search_engine import (
+    WHOLE_FILE, MultiFileMatchSet, PatternMatcher, SearchCache, clip_ranges, iter_match_batches,
+    iter_record_match_batches, lines_by_pattern
+)
+from search_worker import SearchJob, MultiSearchJob, ExportJob
+from pattern_pack import load_pattern_pack
+from result_export import export_format
+from file_follower import LogFollower
+from record_index import DEFAULT_RECORD_START, compile_record_start, get_record_index
+from time_index import time_window
+
+# Debug output, enabled with LOG_SEARCH_DEBUG=1 in the environment
+DEBUG = bool(os.environ.get('LOG_SEARCH_DEBUG'))
+
+# How often follow mode checks the open file for appended lines
+FOLLOW_INTERVAL_MS = 250
+# Pause after the last keystroke before the typed query is searched
+LIVE_SEARCH_DELAY_MS = 300
+
+def debug_print(message, *args):
+    # Arguments are only formatted into the message when it is printed
     if DEBUG:
-        print(message)
+        print(message % args if args else message)
 
 class LogFileSearchApp:
     def __init__(self, root):
@@ -28,7 +51,7 @@ class LogFileSearchApp:
             else:
                 self.root.iconphoto(True, tk.PhotoImage(file=icon_path))
         else:
-            debug_print(f"Icon file not found: {icon_path}")
+            debug_print("Icon file not found: %s", icon_path)
 
         # Create menu bar
         self.menu_bar = tk.Menu(root)
@@ -38,6 +61,12 @@ class LogFileSearchApp:
         self.file_menu = tk.Menu(self.menu_bar, tearoff=0)
         self.menu_bar.add_cascade(label="File", menu=self.file_menu)
         self.file_menu.add_command(label="Open", command=self.open_file)
+        self.file_menu.add_command(label="Search directory...", command=self.search_directory)
+        self.file_menu.add_command(label="Search files (glob)...", command=self.search_glob)
+        # Persistent trigram index, worth it for archived logs searched repeatedly
+        self.use_index = tk.BooleanVar(value=False)
+        self.file_menu.add_checkbutton(label="Use trigram index", variable=self.use_index, command=self.update_search_patterns)
+        self.file_menu.add_command(label="Record start pattern...", command=self.set_record_start)
 
         # Edit menu
         self.edit_menu = tk.Menu(self.menu_bar, tearoff=0)
@@ -50,6 +79,7 @@ class LogFileSearchApp:
         self.report_menu = tk.Menu(self.menu_bar, tearoff=0)
         self.menu_bar.add_cascade(label="Report", menu=self.report_menu)
         self.report_menu.add_command(label="Add the selected line to report", command=self.add_line_to_report)
+        self.report_menu.add_command(label="Export all results...", command=self.export_results)
 
         # Pattern menu
         self.pattern_menu = tk.Menu(self.menu_bar, tearoff=0)
@@ -57,6 +87,16 @@ class LogFileSearchApp:
         self.pattern_menu.add_command(label="Import patterns json", command=self.import_json_filters)
         self.pattern_menu.add_command(label="New Pattern", command=self.add_new_pattern)
         self.pattern_menu.add_command(label="Export Patterns", command=self.export_patterns)
+
+        # Diagnostics menu
+        self.diagnostics_menu = tk.Menu(self.menu_bar, tearoff=0)
+        self.menu_bar.add_cascade(label="Diagnostics", menu=self.diagnostics_menu)
+        self.collect_metrics = tk.BooleanVar(value=metrics.enabled)
+        self.diagnostics_menu.add_checkbutton(label="Collect metrics", variable=self.collect_metrics, command=self.toggle_metrics)
+        self.diagnostics_menu.add_command(label="Show metrics", command=self.show_metrics)
+        self.diagnostics_menu.add_command(label="Export metrics JSON", command=self.export_metrics)
+        self.diagnostics_menu.add_command(label="Reset metrics", command=metrics.reset)
+        self.diagnostics_menu.add_command(label="Profile next search...", command=self.profile_next_search)
         
         # Adjust layout to prevent overlapping
         self.paned_window = tk.PanedWindow(root, orient=tk.HORIZONTAL)
@@ -75,9 +115,20 @@ class LogFileSearchApp:
         self.file_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=1)
         self.file_text.config(state=tk.DISABLED)  # Disable editing
         
-        self.scrollbar = tk.Scrollbar(self.top_frame, command=self.file_text.yview)
+        self.scrollbar = tk.Scrollbar(self.top_frame)
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.file_text.config(yscrollcommand=self.scrollbar.set)
+        self.minimap_canvas = tk.Canvas(self.top_frame, width=14, highlightthickness=0, bg='white')
+        self.minimap_canvas.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Only the visible window of the file is ever inserted into file_text
+        self.file_view = VirtualTextView(self.file_text, self.scrollbar)
+        # One tag per pattern, applied to the rendered lines only
+        self.file_highlights = HighlightLayer(self.file_view)
+        self.file_view.render_callbacks.append(self.apply_selected_line)
+        # Where the matches of the current search are, over the whole file
+        self.minimap = MatchMinimap(self.minimap_canvas, self.file_view)
+        self.document = None  # Shared LogDocument of the open file
+        self.selected_line = None
         
         # Create a frame for the search bar and search button
         self.search_frame = tk.Frame(self.bottom_frame)
@@ -89,6 +140,18 @@ class LogFileSearchApp:
 
         # Start search when Enter key is pressed
         self.pattern_entry.bind("<Return>", lambda event: self.update_search_patterns())
+        # ... or shortly after typing stops
+        self.pattern_entry.bind("<KeyRelease>", self.schedule_live_search)
+
+        # Optional time window, searches and the viewer only cover its lines
+        tk.Label(self.search_frame, text="From").pack(side=tk.LEFT)
+        self.time_from_entry = tk.Entry(self.search_frame, width=20)
+        self.time_from_entry.pack(side=tk.LEFT)
+        self.time_from_entry.bind("<Return>", lambda event: self.update_search_patterns())
+        tk.Label(self.search_frame, text="To").pack(side=tk.LEFT)
+        self.time_to_entry = tk.Entry(self.search_frame, width=20)
+        self.time_to_entry.pack(side=tk.LEFT)
+        self.time_to_entry.bind("<Return>", lambda event: self.update_search_patterns())
 
         # Search button moved to the right of the search entry
         self.search_button = tk.Button(self.search_frame, text="Search", command=self.update_search_patterns)
@@ -99,40 +162,84 @@ class LogFileSearchApp:
         self.case_sensitive_button = tk.Checkbutton(self.search_frame, text="Aa", variable=self.case_sensitive, command=self.update_search_patterns)
         self.case_sensitive_button.pack(side=tk.LEFT)
 
+        # Follow mode keeps reading lines appended to the open file
+        self.follow = tk.BooleanVar(value=False)
+        self.follow_button = tk.Checkbutton(self.search_frame, text="Follow", variable=self.follow, command=self.toggle_follow)
+        self.follow_button.pack(side=tk.LEFT)
+
+        # Record mode matches whole multi-line entries (stack traces, JSON)
+        self.record_mode = tk.BooleanVar(value=False)
+        self.record_mode_button = tk.Checkbutton(self.search_frame, text="Records", variable=self.record_mode, command=self.update_search_patterns)
+        self.record_mode_button.pack(side=tk.LEFT)
+
         self.result_text = tk.Text(self.bottom_frame, wrap='word')
         self.result_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=1)
-        self.result_scrollbar = tk.Scrollbar(self.bottom_frame, command=self.result_text.yview)
+        self.result_scrollbar = tk.Scrollbar(self.bottom_frame)
         self.result_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.result_text.config(yscrollcommand=self.result_scrollbar.set)
+        # Like the file, only the visible results are rendered, read back from
+        # the match store; the view stays where it is while results stream in
+        self.result_view = VirtualTextView(
+            self.result_text, self.result_scrollbar, margin=100, numbered=False, follow_end=False
+        )
+        self.result_view.render_callbacks.append(self.apply_result_tags)
+        self.result_text.tag_config("highlight_result", background="lightblue")
+        self.results = None  # MatchSet shown in result_text
+        self.selected_row = None  # Clicked row of result_text, 1-based
         # Bind click event to result_text
         self.result_text.bind("<Button-1>", self.on_result_click)
         
         self.file_path = None
         self.report_file_path = None  # Initialize report file path
+        self.report_file = None  # Kept open while lines are added to the report
+        self.export_job = None  # Background export of the results
+        self.search_job = None  # Background scan currently feeding the results
+        self.search_tags = []  # Tag name per entry of search_patterns_list
+        self.pattern_tags = []  # Tags highlighting the imported patterns in file_text
+        self.pattern_matcher = None  # Matcher behind pattern_tags
+        self.active_matcher = None  # Matcher of the current search, reused for appended lines
+        self.search_tail_from = 1  # First line the current search has not covered yet
+        self.active_window = WHOLE_FILE  # Line window of the From/To times of the current search
+        self.search_cache = SearchCache()  # Results of recent queries on the open file
+        self.active_match_set = None  # MatchSet of the current search, grows in follow mode
+        self.record_start = DEFAULT_RECORD_START  # Regex of the lines that start a record
+        self.active_record_start = None  # Record start of the current search, None when searching by line
+        self.last_query = None  # Entry text of the last search started
+        self.live_search_after = None  # Pending after() id of a debounced live search
+        self.follower = None
+        self.multi_targets = None  # Directories/globs searched instead of the open file
+        self.next_profile = None  # ProfileCapture for the next single-file search
+        self.metrics_window = None
+        self.profile_summary = None  # Report of the last profiled search
 
         # Create a status bar at the bottom to display the file path
         self.status_bar = tk.Label(root, text="", bd=1, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
-        # Frame for pattern buttons with scrollbar
-        self.pattern_buttons_frame = tk.Frame(self.paned_window, width=100)
+        # Frame for the pattern list with a filter entry and scrollbar
         self.pattern_buttons_frame = tk.Frame(self.paned_window)
         self.paned_window.add(self.pattern_buttons_frame)
 
-        self.pattern_buttons_canvas = tk.Canvas(self.pattern_buttons_frame)
-        self.pattern_buttons_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=1)
-
-        self.pattern_buttons_scrollbar = tk.Scrollbar(self.pattern_buttons_frame, orient=tk.VERTICAL, command=self.pattern_buttons_canvas.yview)
-        self.pattern_buttons_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.pattern_buttons_canvas.configure(yscrollcommand=self.pattern_buttons_scrollbar.set)
-        self.pattern_buttons_canvas.bind('<Configure>', lambda e: self.pattern_buttons_canvas.configure(scrollregion=self.pattern_buttons_canvas.bbox("all")))
-
-        self.pattern_buttons_inner_frame = tk.Frame(self.pattern_buttons_canvas)
-        self.pattern_buttons_canvas.create_window((0, 0), window=self.pattern_buttons_inner_frame, anchor="nw")
+        self.pattern_filter_entry = tk.Entry(self.pattern_buttons_frame)
+        self.pattern_filter_entry.pack(side=tk.TOP, fill=tk.X)
+        self.pattern_filter_entry.bind("<KeyRelease>", lambda event: self.refresh_pattern_list())
+
+        self.pattern_list_text = tk.Text(self.pattern_buttons_frame, wrap='none', width=30, cursor='hand2')
+        self.pattern_list_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=1)
+        self.pattern_list_scrollbar = tk.Scrollbar(self.pattern_buttons_frame, orient=tk.VERTICAL)
+        self.pattern_list_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # One row per pattern, only the visible rows are rendered, so a
+        # library of thousands of patterns costs no more than a few
+        self.pattern_list_view = VirtualTextView(
+            self.pattern_list_text, self.pattern_list_scrollbar, margin=50, numbered=False, follow_end=False
+        )
+        self.pattern_list_view.render_callbacks.append(self.apply_pattern_list_tags)
+        self.pattern_list_text.bind("<Button-1>", self.on_pattern_list_click)
 
         self.patterns = {}  # Initialize patterns dictionary
-        self.pattern_buttons = {}  # Dictionary to store pattern buttons
+        self.pattern_pack = None  # PatternPack the patterns were imported from
+        self.pattern_list = []  # Entries of imported_patterns shown in the pattern list, filtered
+        self.pattern_names = {}  # Name of each imported pattern
+        self.pattern_hits = {}  # Hit count of each pattern in the current search
         self.search_patterns_list = []  # Initialize search patterns list
         self.imported_patterns = {}  # Store imported patterns
 
@@ -145,10 +252,11 @@ class LogFileSearchApp:
 
     def open_file(self):
         self.file_path = filedialog.askopenfilename(
-            filetypes=[("Log files", "*.log"), ("All files", "*.*")]
+            filetypes=[("Log files", "*.log"), ("Compressed logs", "*.gz *.bz2 *.xz"), ("All files", "*.*")]
         )
         if self.file_path:
-            debug_print(f"File selected: {self.file_path}")
+            debug_print("File selected: %s", self.file_path)
+            self.multi_targets = None
             self.display_file_content()
         else:
             # Show error if no file was selected
@@ -156,27 +264,51 @@ class LogFileSearchApp:
     
     def display_file_content(self):
         try:
-            with open(self.file_path, 'r') as file:
-                lines = file.readlines()
-
-            # Enable the text widget to insert content
-            self.file_text.config(state=tk.NORMAL)
-            self.file_text.delete(1.0, tk.END)
-            for idx, line in enumerate(lines, start=1):
-                self.file_text.insert(tk.END, f"{idx}: {line}")
-            # Disable editing again
-            self.file_text.config(state=tk.DISABLED)
+            # The search of the previous file is dropped, its worker keeps
+            # its own reference to that document until it stops.
+            # Multi-file searches keep running.
+            if not (self.search_job and self.search_job.multi_file):
+                self.cancel_search()
+            if self.results is not None and not isinstance(self.results, MultiFileMatchSet):
+                # Rows of the previous file, read from its document
+                self.show_results(None)
+            self.document = get_document(self.file_path)
+            self.file_highlights.clear()
+            self.minimap.set_matches(None, [])
+            self.pattern_tags = []
+            self.pattern_matcher = None
+            self.active_matcher = None
+            self.selected_line = None
+            # The viewer renders only the lines around the viewport
+            self.file_view.set_index(self.document)
+            # Follow the newly loaded file instead of the previous one
+            self.toggle_follow()
 
             # Update status bar with the file path
             self.status_bar.config(text=self.file_path)
-            debug_print(f"File content displayed for: {self.file_path}")
+            debug_print("File content displayed for: %s", self.file_path)
         except Exception as e:
             messagebox.showerror(
                 "Error Opening File", f"An error occurred while opening the file:\n{e}"
             )
-            debug_print(f"Error opening file: {e}")
+            debug_print("Error opening file: %s", e)
 
-    def update_search_patterns(self):
+    def schedule_live_search(self, event=None):
+        # Restarts the delay on every keystroke that changed the query.
+        # Multi-file searches spin up worker processes and wait for Enter.
+        if self.pattern_entry.get() == self.last_query or self.multi_targets is not None:
+            return
+        if self.live_search_after:
+            self.root.after_cancel(self.live_search_after)
+        self.live_search_after = self.root.after(
+            LIVE_SEARCH_DELAY_MS, lambda: self.update_search_patterns(live=True)
+        )
+
+    def update_search_patterns(self, live=False):
+        if self.live_search_after:
+            self.root.after_cancel(self.live_search_after)
+            self.live_search_after = None
+        self.last_query = self.pattern_entry.get()
         patterns = self.pattern_entry.get().split('|')
         self.search_patterns_list = []
 
@@ -186,31 +318,373 @@ class LogFileSearchApp:
                 color = self.imported_patterns.get(pattern, {}).get('highlight_color', 'black')
                 self.search_patterns_list.append((pattern, color))
 
-        debug_print(f"Search patterns: {self.search_patterns_list}")
-        self.perform_search()
+        debug_print("Search patterns: %s", self.search_patterns_list)
+        # Patterns in the search bar are shown in their color
+        self.pattern_list_view.refresh()
+        self.perform_search(live)
+
+    def refresh_document(self):
+        # Files that did not change on disk are served from the document
+        # cache, anything else is re-indexed and redisplayed
+        if self.document.is_stale():
+            debug_print("File changed on disk, reloading: %s", self.file_path)
+            had_pattern_highlights = bool(self.pattern_tags)
+            self.display_file_content()
+            if had_pattern_highlights:
+                self.update_main_window_with_patterns()
+
+    def search_directory(self):
+        directory = filedialog.askdirectory(title="Search Directory")
+        if directory:
+            self.start_multi_search([directory])
+
+    def search_glob(self):
+        pattern = simpledialog.askstring("Search Files", "Glob pattern (e.g. /var/log/app.log* or logs/**/*.log):")
+        if pattern:
+            self.start_multi_search([pattern])
+
+    def start_multi_search(self, targets):
+        # Stays in multi-file mode (Enter, Aa and pattern buttons re-run it)
+        # until a single file is opened again
+        self.multi_targets = targets
+        debug_print("Searching files: %s", targets)
+        self.update_search_patterns()
 
-    def perform_search(self):
-        compiled_patterns = [
-            (re.compile(pattern) if self.case_sensitive.get() else re.compile(pattern, re.IGNORECASE), color)
-            for pattern, color in self.search_patterns_list
-        ]
-        
-        with open(self.file_path, 'r') as file:
-            lines = file.readlines()
-        
+    def search_description(self):
+        return ', '.join(self.multi_targets) if self.multi_targets else self.file_path
+
+    def resolve_time_window(self, live=False):
+        # Returns the lines between the From and To times, None if they
+        # cannot be read. The time index is built on first use.
+        start_text = self.time_from_entry.get()
+        end_text = self.time_to_entry.get()
+        if not (start_text.strip() or end_text.strip()):
+            return WHOLE_FILE
+        try:
+            return time_window(self.document, start_text, end_text)
+        except ValueError as e:
+            if live:
+                self.status_bar.config(text=f"{self.search_description()} - invalid time range: {e}")
+            else:
+                messagebox.showerror("Invalid Time Range", f"Failed to read the time range:\n{e}")
+            return None
+
+    def perform_search(self, live=False):
+        window = WHOLE_FILE
+        if self.multi_targets is None:
+            if not self.document:
+                return
+            self.refresh_document()
+            window = self.resolve_time_window(live)
+            if window is None:
+                return
+        try:
+            # All patterns are evaluated together in one pass per line
+            matcher = PatternMatcher(
+                [pattern for pattern, _ in self.search_patterns_list], self.case_sensitive.get()
+            )
+        except re.error as e:
+            if live:
+                # Most likely a half-typed pattern, no need for a dialog
+                self.status_bar.config(text=f"{self.search_description()} - invalid pattern: {e}")
+            else:
+                messagebox.showerror("Invalid Pattern", f"Failed to compile search pattern:\n{e}")
+            return
+
+        # A new query supersedes whatever is still running
+        self.cancel_search()
         self.clear_highlights()
-        
-        for idx, line in enumerate(lines, start=1):
-            for pattern, color in compiled_patterns:
-                if pattern.search(line):
-                    tag_name = f"highlight_{pattern.pattern}_{idx}"
-                    self.result_text.insert(tk.END, f"{idx}: {line}", (tag_name,))
-                    self.result_text.tag_config(tag_name, foreground=color)
-                    self.file_text.tag_add(tag_name, f"{idx}.0", f"{idx}.0 lineend")
-                    self.file_text.tag_config(tag_name, foreground=color)
-        
-        self.file_text.config(state=tk.DISABLED)
-        debug_print("Search completed and results updated.")
+        if self.multi_targets is None:
+            self.active_window = window
+            if (self.file_view.first_line, self.file_view.range_last) != window:
+                self.file_view.set_range(*window)
+        if not len(matcher):
+            return
+
+        self.search_tags = [f"search_{pid}" for pid in range(len(matcher))]
+        for tag_name, (_, color) in zip(self.search_tags, self.search_patterns_list):
+            self.result_text.tag_config(tag_name, foreground=color)
+            self.file_highlights.configure(tag_name, foreground=color)
+
+        if self.multi_targets is not None:
+            # Worker processes are spawned, forking a process that runs Tk and
+            # search threads is not safe
+            self.search_job = MultiSearchJob(
+                self.multi_targets, matcher, mp_context=multiprocessing.get_context('spawn')
+            ).start()
+        else:
+            self.active_matcher = matcher
+            self.active_record_start = self.record_start if self.record_mode.get() else None
+            # Lines appended later are searched incrementally in follow mode
+            self.search_tail_from = self.document.line_count + 1
+            # A repeated query is replayed from its cached results, a narrower
+            # one (more characters typed, a pattern removed) only re-checks
+            # the lines an earlier search matched
+            previous = None
+            if self.active_record_start is None:
+                previous = self.search_cache.get(self.document, matcher.patterns, matcher.case_sensitive, window) or \
+                    self.search_cache.narrowest_cover(self.document, matcher.patterns, matcher.case_sensitive, window)
+            if previous is not None:
+                debug_print("Refining %s earlier matches of %s", len(previous), previous.patterns)
+            self.search_job = SearchJob(
+                self.document, matcher, use_index=self.use_index.get(), previous=previous, window=window,
+                profile=self.next_profile, record_start=self.active_record_start
+            ).start()
+            self.next_profile = None
+        self.show_results(self.search_job.results)
+        self.root.after(0, self.poll_search, self.search_job)
+
+    def cancel_search(self):
+        if self.search_job:
+            # The worker stops at its next chunk boundary
+            self.search_job.cancel()
+            self.search_job = None
+
+    def poll_search(self, job):
+        # Drains the worker queue on the Tk thread; stale jobs stop polling
+        if job is not self.search_job:
+            return
+        finished = False
+        matched = False
+        try:
+            # Bounded per tick so the UI stays responsive while results stream in
+            for _ in range(50):
+                kind, *payload = job.queue.get_nowait()
+                if kind == 'matches':
+                    matched = True
+                    if not job.multi_file:
+                        self.show_matches(payload[0])
+                elif kind == 'status':
+                    self.status_bar.config(text=f"{self.search_description()} - {payload[0]}")
+                elif kind == 'progress':
+                    scanned, total = payload
+                    self.status_bar.config(
+                        text=f"{self.search_description()} - searching {scanned * 100 // max(total, 1)}%"
+                    )
+                elif kind == 'done':
+                    self.status_bar.config(text=f"{self.search_description()} - {payload[0]} matching lines")
+                    if job.match_set is not None:
+                        self.active_match_set = job.match_set
+                        if job.record_start is None:
+                            # Results by record do not answer queries by line
+                            self.search_cache.put(self.document, job.match_set)
+                        self.minimap.set_matches(job.match_set, [color for _, color in self.search_patterns_list])
+                        self.update_pattern_hits(job.match_set)
+                    if job.profile is not None:
+                        # The capture is written once the worker thread ends
+                        job.join()
+                        self.profile_summary = job.profile.summary
+                        self.show_metrics()
+                    finished = True
+                elif kind == 'error':
+                    messagebox.showerror("Search Error", f"Search failed:\n{payload[0]}")
+                    finished = True
+        except queue.Empty:
+            pass
+        if matched:
+            # The worker already stored the rows, only the scrollbar and a
+            # view still showing the end need updating
+            self.result_view.lines_appended()
+
+        if finished:
+            self.search_job = None
+            # Catch up with lines followed while the scan was running
+            self.search_appended_lines()
+            debug_print("Search completed and results updated.")
+        else:
+            self.root.after(30, self.poll_search, job)
+
+    def toggle_follow(self):
+        if self.follower:
+            self.follower.close()
+            self.follower = None
+        if self.follow.get() and self.document:
+            self.follower = LogFollower(self.document)
+            self.root.after(FOLLOW_INTERVAL_MS, self.poll_follow, self.follower)
+            debug_print("Following: %s", self.file_path)
+
+    def poll_follow(self, follower):
+        if follower is not self.follower:
+            return
+        event, first, last = follower.poll() or (None, None, None)
+        if event == 'append':
+            self.file_view.lines_appended()
+            self.highlight_appended_lines(first, last)
+            self.search_appended_lines()
+            # Buckets cover the grown file now
+            self.minimap.redraw()
+            debug_print("Followed lines %s-%s", first, last)
+        elif event in ('rotated', 'truncated'):
+            # Nothing to append to, reload the file and repeat the search
+            debug_print("File %s, reloading: %s", event, self.file_path)
+            self.refresh_document()
+            if self.search_patterns_list:
+                self.perform_search()
+            return
+        self.root.after(FOLLOW_INTERVAL_MS, self.poll_follow, follower)
+
+    def search_appended_lines(self):
+        # Runs the active search over complete lines it has not seen yet;
+        # cost is proportional to what was appended, not to the file size
+        if self.active_matcher is None or self.search_job is not None:
+            return
+        last = self.document.complete_line_count
+        if last < self.search_tail_from:
+            return
+        if self.active_record_start is not None:
+            self.search_appended_records(last)
+            return
+        # Lines past the end of a closed time window are not searched
+        ranges = clip_ranges([(self.search_tail_from, last)], self.active_window)
+        for _, batch in iter_match_batches(self.document, self.active_matcher, ranges):
+            if batch:
+                self.show_matches(batch)
+                if self.active_match_set is not None:
+                    self.active_match_set.add_batch(batch)
+        self.search_tail_from = last + 1
+        if self.active_match_set is not None:
+            # The cached results stay valid for the grown file
+            self.active_match_set.last_line = last
+            self.update_pattern_hits(self.active_match_set)
+            # The store behind result_text
+            self.result_view.lines_appended()
+
+    def search_appended_records(self, last):
+        # Appended lines either continue the last record or start new ones,
+        # the record around the first new line is searched again
+        try:
+            records = get_record_index(self.document, self.active_record_start)
+        except re.error:
+            return
+        match_set = self.active_match_set
+        ranges = clip_ranges([(records.start_of(self.search_tail_from), last)], self.active_window)
+        for _, batch in iter_record_match_batches(self.document, self.active_matcher, records, ranges):
+            if not batch:
+                continue
+            self.show_matches(batch)
+            if match_set is not None:
+                if len(match_set) and batch[0][0] == match_set.line_numbers[-1]:
+                    # A listed record that grew, only its new lines were missing
+                    batch = batch[1:]
+                match_set.add_batch(batch)
+        self.search_tail_from = last + 1
+        if match_set is not None:
+            match_set.last_line = last
+            self.update_pattern_hits(match_set)
+            self.result_view.lines_appended()
+
+    def set_record_start(self):
+        record_start = simpledialog.askstring(
+            "Record Start", "Regex matching the start of the lines that begin a record\n"
+            "(e.g. a leading timestamp), used when \"Records\" is checked:",
+            initialvalue=self.record_start
+        )
+        if not record_start:
+            return
+        try:
+            # Compiled as the record index compiles it, over bytes
+            compile_record_start(record_start)
+        except re.error as e:
+            messagebox.showerror("Invalid Pattern", f"Failed to compile record start pattern:\n{e}")
+            return
+        self.record_start = record_start
+        if self.record_mode.get():
+            self.update_search_patterns()
+
+    def highlight_appended_lines(self, first_line, last_line):
+        if self.pattern_matcher is None:
+            return
+        lines_per_pattern = lines_by_pattern(self.document, self.pattern_matcher, first_line, last_line)
+        for tag_name, line_numbers in zip(self.pattern_tags, lines_per_pattern):
+            self.file_highlights.add_lines(tag_name, line_numbers)
+
+    def show_matches(self, batch):
+        # Highlights a batch of matches in the file; the result list reads
+        # them from the match store
+        lines_per_tag = {}
+        for idx, text, pattern_ids in batch:
+            # Every line of a record (in record mode) is highlighted
+            last = idx + text.count('\n', 0, len(text) - 1)
+            for pid in pattern_ids:
+                lines_per_tag.setdefault(self.search_tags[pid], []).extend(range(idx, last + 1))
+        for tag_name, line_numbers in lines_per_tag.items():
+            self.file_highlights.add_lines(tag_name, line_numbers)
+
+    def show_results(self, match_set):
+        # Lists match_set (None empties the list), rows are rendered on demand
+        self.results = match_set
+        self.selected_row = None
+        self.result_view.set_index(ResultRows(match_set, self.document) if match_set is not None else None)
+
+    def apply_result_tags(self, first_row, last_row):
+        # Called by the result view after each render: a row is shown in the
+        # color of the first pattern it matched
+        if self.results is None:
+            return
+        rows_per_tag = {}
+        for row in range(first_row, last_row + 1):
+            index = self.result_view.text_index(row)
+            rows_per_tag.setdefault(self.search_tags[self.results.first_pattern(row - 1)], []).extend(
+                (index, f"{index} lineend")
+            )
+        with metrics.stage('tag_apply'):
+            for tag_name, ranges in rows_per_tag.items():
+                self.result_text.tag_add(tag_name, *ranges)
+        self.mark_selected_row()
+
+    def mark_selected_row(self):
+        self.result_text.tag_remove("highlight_result", "1.0", "end")
+        index = self.result_view.text_index(self.selected_row) if self.selected_row else None
+        if index:
+            self.result_text.tag_add("highlight_result", index, f"{index} lineend")
+
+    def toggle_metrics(self):
+        metrics.enabled = self.collect_metrics.get()
+
+    def show_metrics(self):
+        # A panel refreshed every second while it is open
+        if self.metrics_window is None or not self.metrics_window.winfo_exists():
+            self.metrics_window = tk.Toplevel(self.root)
+            self.metrics_window.title("Metrics")
+            self.metrics_text = tk.Text(self.metrics_window, wrap='none', width=100, height=30, font="TkFixedFont")
+            self.metrics_text.pack(fill=tk.BOTH, expand=1)
+            self.root.after(1000, self.refresh_metrics)
+        self.refresh_metrics(schedule=False)
+
+    def refresh_metrics(self, schedule=True):
+        if self.metrics_window is None or not self.metrics_window.winfo_exists():
+            return
+        text = metrics.format() if metrics.enabled else "Metrics are off, enable Diagnostics > Collect metrics.\n"
+        if self.profile_summary:
+            text += f"\nLast profiled search\n{self.profile_summary}"
+        self.metrics_text.delete(1.0, tk.END)
+        self.metrics_text.insert(tk.END, text)
+        if schedule:
+            self.root.after(1000, self.refresh_metrics)
+
+    def export_metrics(self):
+        export_file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+            title="Export Metrics As"
+        )
+        if not export_file_path:
+            return
+        try:
+            metrics.dump(export_file_path)
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Failed to export metrics:\n{e}")
+
+    def profile_next_search(self):
+        # cProfile and tracemalloc over the next search of the open file,
+        # the raw profile is optionally saved for pstats or snakeviz
+        profile_path = filedialog.asksaveasfilename(
+            defaultextension=".prof",
+            filetypes=[("Profile data", "*.prof"), ("All files", "*.*")],
+            title="Save Profile As (cancel to only show the summary)"
+        )
+        self.next_profile = ProfileCapture(profile_path or None)
+        self.status_bar.config(text=f"{self.search_description()} - the next search will be profiled")
 
     def add_line_to_report(self):
         try:
@@ -233,49 +707,92 @@ class LogFileSearchApp:
                 return
 
         try:
-            with open(self.report_file_path, 'a') as report_file:
-                report_file.write(selected_text + '\n')
-            debug_print(f"Added line to report: {selected_text}")
+            if self.report_file is None:
+                # Opened once; line buffered, so each added line is on disk at once
+                self.report_file = open(self.report_file_path, 'a', buffering=1)
+            self.report_file.write(selected_text + '\n')
+            debug_print("Added line to report: %s", selected_text)
         except Exception as e:
             messagebox.showerror(
                 "Write Error", f"Failed to write to report file:\n{e}"
             )
-            debug_print(f"Error writing to report file: {e}")
+            debug_print("Error writing to report file: %s", e)
 
-    def on_result_click(self, event):
-        # Remove any existing highlight in result_text
-        self.result_text.tag_remove("highlight_result", "1.0", "end")
+    def export_results(self):
+        # Every match of the current search with optional context lines,
+        # streamed from the match store and the source, not from result_text
+        if self.results is None or not len(self.results):
+            messagebox.showinfo("No Results", "There are no search results to export.")
+            return
+        if self.search_job is not None or self.export_job is not None:
+            messagebox.showwarning("Busy", "Wait for the running search or export to finish.")
+            return
+        export_file_path = filedialog.asksaveasfilename(
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt"), ("CSV files", "*.csv"), ("JSON Lines", "*.jsonl"), ("All files", "*.*")],
+            title="Export Results As"
+        )
+        if not export_file_path:
+            return
+        context = simpledialog.askinteger(
+            "Context Lines", "Lines of context around each match:", initialvalue=0, minvalue=0, maxvalue=1000
+        )
+        if context is None:
+            return
+        # Imported patterns are exported under their names
+        names_by_pattern = {info['pattern']: name for name, info in self.patterns.items()}
+        self.export_job = ExportJob(
+            self.results, export_file_path, export_format(export_file_path),
+            document=self.result_view.index.document, context=context,
+            pattern_names=[names_by_pattern.get(pattern, pattern) for pattern in self.results.patterns]
+        ).start()
+        self.root.after(100, self.poll_export, self.export_job)
+
+    def poll_export(self, job):
+        finished = False
+        try:
+            while True:
+                kind, *payload = job.queue.get_nowait()
+                if kind == 'progress':
+                    written, total = payload
+                    self.status_bar.config(text=f"Exporting results - {written * 100 // max(total, 1)}%")
+                elif kind == 'done':
+                    self.status_bar.config(text=f"Exported {payload[0]} matches to {job.out_path}")
+                    finished = True
+                elif kind == 'error':
+                    messagebox.showerror("Export Error", f"Failed to export results:\n{payload[0]}")
+                    finished = True
+        except queue.Empty:
+            pass
+        if finished:
+            self.export_job = None
+        else:
+            self.root.after(100, self.poll_export, job)
 
-        # Get the index of the clicked line in result_text
-        index = self.result_text.index("@%s,%s linestart" % (event.x, event.y))
-        # Highlight the selected line in result_text
-        self.result_text.tag_add("highlight_result", index, "%s lineend" % index)
-        self.result_text.tag_config("highlight_result", background="lightblue")
+    def on_result_click(self, event):
+        if self.results is None:
+            return
+        # The clicked widget line gives the row, and the row its file and line
+        # in the match store: nothing is parsed out of the shown text
+        text_line = int(self.result_text.index("@%s,%s" % (event.x, event.y)).split('.')[0])
+        row = self.result_view.window_start + text_line - 1
+        if not self.result_view.window_start <= row <= self.result_view.window_end:
+            return
+        self.selected_row = row
+        self.mark_selected_row()
 
-        # Get the full text of the clicked line
-        line_content = self.result_text.get(index, "%s lineend" % index)
-
-        # Extract line number from the line content
-        match = re.match(r"(\d+):", line_content)
-        if match and self.file_path:
-            line_number = int(match.group(1))
-
-            # Scroll file_text to the corresponding line
-            self.file_text.see(f"{line_number}.0")
-
-            # Enable the text widget to update tags
-            self.file_text.config(state=tk.NORMAL)
-            # Remove previous highlights
-            self.file_text.tag_remove("highlight_file", "1.0", "end")
-            # Highlight the line in file_text
-            self.file_text.tag_add("highlight_file", f"{line_number}.0", f"{line_number}.0 lineend")
-            self.file_text.tag_config("highlight_file", background="yellow")
-            # Disable editing again
-            self.file_text.config(state=tk.DISABLED)
-            debug_print(f"Highlighted line {line_number} in main window.")
-        else:
-            # Do nothing if line number cannot be determined or file is not opened
-            pass
+        file_path, line_number = self.results.location(row - 1)
+        if file_path is not None and file_path != self.file_path:
+            # A result of a multi-file search, open its file
+            self.file_path = file_path
+            self.display_file_content()
+        if self.document:
+            # Scroll file_text to the corresponding line, the viewer renders
+            # the window around it and re-applies highlights
+            self.selected_line = line_number
+            self.file_view.see(line_number)
+            self.apply_selected_line(*self.file_view.visible_range())
+            debug_print("Highlighted line %s in main window.", line_number)
 
     def import_json_filters(self):
         json_file_path = filedialog.askopenfilename(
@@ -285,73 +802,119 @@ class LogFileSearchApp:
             return
 
         try:
-            with open(json_file_path, 'r') as json_file:
-                self.patterns = json.load(json_file)
-                self.imported_patterns = {v['pattern']: v for v in self.patterns.values()}  # Store imported patterns
-            self.create_pattern_buttons()
+            # Validated, deduplicated and analysed once, then cached next to
+            # the file: importing an unchanged library again is instant
+            self.pattern_pack = load_pattern_pack(json_file_path)
+            self.patterns = self.pattern_pack.as_dict()
+            self.imported_patterns = {v['pattern']: v for v in self.patterns.values()}  # Store imported patterns
+            self.pattern_names = {v['pattern']: name for name, v in self.patterns.items()}
+            self.refresh_pattern_list()
             self.update_main_window_with_patterns()
             self.pattern_entry.delete(0, tk.END)  # Clear the search bar pattern
-            debug_print(f"Imported JSON filters from: {json_file_path}")
+            debug_print("Imported JSON filters from: %s", json_file_path)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load JSON file:\n{e}")
-            debug_print(f"Error loading JSON file: {e}")
+            debug_print("Error loading JSON file: %s", e)
+            return
+        if self.pattern_pack.skipped:
+            messagebox.showwarning(
+                "Invalid Patterns",
+                f"{len(self.pattern_pack.skipped)} pattern(s) could not be compiled and were skipped:\n" +
+                "\n".join(f"{name}: {error}" for name, error in self.pattern_pack.skipped[:10])
+            )
 
-    def create_pattern_buttons(self):
-        for widget in self.pattern_buttons_inner_frame.winfo_children():
-            widget.destroy()
+    def refresh_pattern_list(self):
+        # Lists the imported patterns whose name or pattern contains the filter text
+        query = self.pattern_filter_entry.get().lower()
+        self.pattern_list = [
+            pattern_info for pattern, pattern_info in self.imported_patterns.items()
+            if query in pattern.lower() or query in self.pattern_names.get(pattern, '').lower()
+        ]
+        self.pattern_list_view.set_index(ListRows(self.pattern_list, self.pattern_label))
+        debug_print("Pattern list shows %s of %s patterns.", len(self.pattern_list), len(self.imported_patterns))
 
-        for pattern_name, pattern_info in self.patterns.items():
-            button = tk.Button(
-                self.pattern_buttons_inner_frame, 
-                text=pattern_info['pattern'], 
-                command=lambda p=pattern_info: self.toggle_pattern(p)
-            )
-            button.pack(fill=tk.X)
-            self.pattern_buttons[pattern_info['pattern']] = button
-        debug_print("Pattern buttons created.")
-        #self.pattern_buttons_frame.pack(side=tk.RIGHT, fill=tk.Y)
+    def pattern_label(self, pattern_info):
+        pattern = pattern_info['pattern']
+        return f"{pattern} ({self.pattern_hits[pattern]})" if pattern in self.pattern_hits else pattern
+
+    def apply_pattern_list_tags(self, first_row, last_row):
+        # Called by the pattern list after each render: patterns in the search
+        # bar are shown in their highlight color
+        active = set(self.pattern_entry.get().split('|'))
+        for row in range(first_row, last_row + 1):
+            pattern_info = self.pattern_list[row - 1]
+            if pattern_info['pattern'] in active:
+                tag_name = f"pattern_color_{pattern_info['highlight_color']}"
+                self.pattern_list_text.tag_config(tag_name, foreground=pattern_info['highlight_color'])
+                index = self.pattern_list_view.text_index(row)
+                self.pattern_list_text.tag_add(tag_name, index, f"{index} lineend")
+
+    def on_pattern_list_click(self, event):
+        text_line = int(self.pattern_list_text.index("@%s,%s" % (event.x, event.y)).split('.')[0])
+        row = self.pattern_list_view.window_start + text_line - 1
+        if self.pattern_list_view.window_start <= row <= self.pattern_list_view.window_end:
+            self.toggle_pattern(self.pattern_list[row - 1])
+        return "break"
+
+    def update_pattern_hits(self, match_set=None):
+        # Shows the hit counts of the current search in the pattern list
+        self.pattern_hits = dict(zip(match_set.patterns, hits_by_pattern(match_set))) if match_set is not None else {}
+        self.pattern_list_view.refresh()
 
     def toggle_pattern(self, pattern_info):
         pattern = pattern_info['pattern']
-        color = pattern_info['highlight_color']
         current_patterns = self.pattern_entry.get().split('|')
         
         if (pattern in current_patterns):
             current_patterns.remove(pattern)
-            self.pattern_buttons[pattern].config(bg='SystemButtonFace', fg='black')
         else:
             current_patterns.append(pattern)
-            self.pattern_buttons[pattern].config(bg='SystemButtonFace', fg=color)
         
         new_patterns = '|'.join(filter(None, current_patterns))  # Remove empty strings
         self.pattern_entry.delete(0, tk.END)
         self.pattern_entry.insert(0, new_patterns)
         self.update_search_patterns()
-        debug_print(f"Toggled pattern: {pattern}, current patterns: {current_patterns}")
+        debug_print("Toggled pattern: %s, current patterns: %s", pattern, current_patterns)
 
     def update_main_window_with_patterns(self):
-        compiled_patterns = [
-            (re.compile(pattern_info['pattern']), pattern_info['highlight_color'])
-            for pattern_info in self.patterns.values()
-        ]
-        
-        with open(self.file_path, 'r') as file:
-            lines = file.readlines()
+        if not self.document:
+            return
+        if self.document.is_stale():
+            self.display_file_content()
+        if self.pattern_pack is None:
+            return
+        matcher = self.pattern_pack.matcher(case_sensitive=True)
+        colors = self.pattern_pack.colors
+        self.file_highlights.clear(self.pattern_tags)
+        self.pattern_matcher = matcher
+        self.pattern_tags = [f"highlight_{pattern}" for pattern in matcher.patterns]
+        for tag_name, color in zip(self.pattern_tags, colors):
+            self.file_highlights.configure(tag_name, foreground=color)
         
-        self.file_text.config(state=tk.NORMAL)
-        for idx, line in enumerate(lines, start=1):
-            for pattern, color in compiled_patterns:
-                if pattern.search(line):
-                    self.file_text.tag_add(f"highlight_{pattern.pattern}", f"{idx}.0", f"{idx}.0 lineend")
-                    self.file_text.tag_config(f"highlight_{pattern.pattern}", foreground=color)
-        self.file_text.config(state=tk.DISABLED)
+        lines_per_pattern = lines_by_pattern(self.document, matcher)
+        for tag_name, line_numbers in zip(self.pattern_tags, lines_per_pattern):
+            self.file_highlights.add_lines(tag_name, line_numbers)
         debug_print("Main window updated with patterns.")
 
+    def apply_selected_line(self, first_line, last_line):
+        # Called by the viewer after each render to restore the clicked line
+        self.file_text.tag_remove("highlight_file", "1.0", "end")
+        start = self.file_view.text_index(self.selected_line) if self.selected_line else None
+        if start:
+            self.file_text.tag_add("highlight_file", start, f"{start} lineend")
+        self.file_text.tag_config("highlight_file", background="yellow")
+
     def clear_highlights(self):
-        self.file_text.config(state=tk.NORMAL)
+        self.selected_line = None
         self.file_text.tag_remove("highlight_file", "1.0", "end")
-        self.result_text.delete(1.0, tk.END)  # Clear the search results window
-        self.file_text.config(state=tk.DISABLED)
+        # Whole tags are dropped, independent of how many lines they covered
+        self.file_highlights.clear(self.search_tags)
+        self.search_tags = []
+        self.active_matcher = None
+        self.active_match_set = None
+        self.minimap.set_matches(None, [])
+        self.update_pattern_hits()
+        self.show_results(None)  # Clear the search results window
         debug_print("Cleared all highlights.")
 
     def add_new_pattern(self):
@@ -363,20 +926,8 @@ class LogFileSearchApp:
             return
 
         self.imported_patterns[pattern] = {'pattern': pattern, 'highlight_color': color}
-        self.create_pattern_buttons()
-        self.add_pattern_button(pattern, color)
-        debug_print(f"Added new pattern: {pattern} with color: {color}")
-
-    def add_pattern_button(self, pattern, color):
-        button = tk.Button(
-            self.pattern_buttons_inner_frame, 
-            text=pattern, 
-            command=lambda p=pattern: self.toggle_pattern({'pattern': p, 'highlight_color': color})
-        )
-        button.pack(fill=tk.X)
-        self.pattern_buttons[pattern] = button
-        debug_print(f"Added button for pattern: {pattern}")
-        # self.pattern_buttons_frame.pack(side=tk.RIGHT, fill=tk.Y)
+        self.refresh_pattern_list()
+        debug_print("Added new pattern: %s with color: %s", pattern, color)
 
     def export_patterns(self):
         export_file_path = filedialog.asksaveasfilename(
@@ -390,10 +941,10 @@ class LogFileSearchApp:
         try:
             with open(export_file_path, 'w') as export_file:
                 json.dump(self.imported_patterns, export_file, indent=4)
-            debug_print(f"Exported patterns to: {export_file_path}")
+            debug_print("Exported patterns to: %s", export_file_path)
         except Exception as e:
             messagebox.showerror("Export Error", f"Failed to export patterns:\n{e}")
-            debug_print(f"Error exporting patterns: {e}")
+            debug_print("Error exporting patterns: %s", e)
 
 # Remove the on_file_drop method since drag and drop is disabled
 # def on_file_drop(self, event):
@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import re
+import sys
+from contextlib import nullcontext
+
+# Only the headless modules are imported here, the CLI must start (and run
+# in cron/CI) without tkinter or a display
+from compressed_log import DECOMPRESSION_ERRORS, is_compressed, iter_decompressed
+from instrumentation import ProfileCapture, metrics
+from log_document import get_document
+from multi_search import search_paths
+from search_engine import (
+    WHOLE_FILE, PatternMatcher, candidate_ranges, iter_match_batches, iter_stream_match_batches, load_patterns
+)
+from time_index import time_window
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='log-search',
+        description="Search log files for one or more regex patterns."
+    )
+    parser.add_argument('files', nargs='+', metavar='FILE',
+                        help="Log files, directories (searched recursively) or glob patterns.")
+    parser.add_argument('-p', '--pattern', action='append', default=[],
+                        help="Pattern to search for. May be given several times; "
+                             "'|'-separated lists are split like in the search bar.")
+    parser.add_argument('-P', '--patterns-file', metavar='JSON',
+                        help="Pattern file in the example_pattern.json format.")
+    parser.add_argument('-s', '--case-sensitive', action='store_true', help="Match case.")
+    parser.add_argument('--index', action='store_true',
+                        help="Use (and build if needed) the persistent trigram index.")
+    parser.add_argument('-j', '--jobs', type=int, metavar='N',
+                        help="Search in parallel on N worker processes (default: one per CPU "
+                             "when directories or globs are given, otherwise in-process).")
+    parser.add_argument('--from', dest='time_from', default='', metavar='TIME',
+                        help="Only search lines stamped at or after TIME (e.g. '2024-03-01 10:00', "
+                             "'10:00:05' or epoch seconds).")
+    parser.add_argument('--to', dest='time_to', default='', metavar='TIME',
+                        help="Only search lines stamped at or before TIME.")
+    parser.add_argument('-f', '--format', choices=('text', 'jsonl'), default='text',
+                        help="Output plain text lines or JSON Lines records (default: text).")
+    parser.add_argument('--metrics', metavar='JSON',
+                        help="Write per-stage timings and counters as JSON to this file ('-' for stderr).")
+    parser.add_argument('--profile', metavar='PROF',
+                        help="Profile the search with cProfile (and tracemalloc), save the profile to "
+                             "this file and print a summary to stderr.")
+    return parser
+
+
+def collect_patterns(args):
+    """Returns (pattern_names, patterns) from the command line and pattern file."""
+    names = []
+    patterns = []
+    if args.patterns_file:
+        for name, pattern_info in load_patterns(args.patterns_file).items():
+            names.append(name)
+            patterns.append(pattern_info['pattern'])
+    for entry in args.pattern:
+        for pattern in entry.split('|'):
+            if pattern:
+                names.append(pattern)
+                patterns.append(pattern)
+    return names, patterns
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        names, patterns = collect_patterns(args)
+    except (OSError, ValueError) as e:
+        print(f"log-search: cannot load patterns: {e}", file=sys.stderr)
+        return 2
+    if not patterns:
+        print("log-search: no patterns given (use -p or -P)", file=sys.stderr)
+        return 2
+    try:
+        matcher = PatternMatcher(patterns, args.case_sensitive)
+    except re.error as e:
+        print(f"log-search: invalid pattern: {e}", file=sys.stderr)
+        return 2
+
+    parallel = args.jobs is not None or any(
+        os.path.isdir(target) or any(char in target for char in '*?[') for target in args.files
+    )
+    if parallel and (args.time_from or args.time_to):
+        print("log-search: --from/--to only work on single files", file=sys.stderr)
+        return 2
+    metrics.enabled = bool(args.metrics)
+    profile = ProfileCapture(args.profile) if args.profile else None
+    try:
+        with profile or nullcontext(), metrics.stage('search'):
+            if parallel:
+                found, status = run_parallel_search(args, names, matcher, sys.stdout)
+            else:
+                found, status = run_search(args, names, matcher, sys.stdout)
+    except BrokenPipeError:
+        # Output piped into head & co. which stopped reading
+        sys.stdout = None
+        return 0
+    if profile is not None:
+        sys.stderr.write(profile.summary)
+    if args.metrics:
+        try:
+            metrics.dump(args.metrics)
+        except OSError as e:
+            print(f"log-search: cannot write metrics: {e}", file=sys.stderr)
+            return 2
+    # grep convention: 0 when something matched, 1 when nothing did, 2 on errors
+    return status or (0 if found else 1)
+
+
+def write_match(args, names, out, show_file, file_path, line_number, offset, line, pattern_ids):
+    text = line.rstrip('\n')
+    if args.format == 'jsonl':
+        out.write(json.dumps({
+            'file': file_path,
+            'line': line_number,
+            'offset': offset,
+            'patterns': [names[pid] for pid in pattern_ids],
+            'text': text,
+        }) + '\n')
+    elif show_file:
+        out.write(f"{file_path}:{line_number}: {text}\n")
+    else:
+        out.write(f"{line_number}: {text}\n")
+
+
+def run_search(args, names, matcher, out):
+    """Writes the matches of every file in ``args.files`` to ``out``, returns (found, status)."""
+    show_file = len(args.files) > 1
+    found = False
+    status = 0
+    # Time windows need the line index of the file, compressed logs included
+    timed = bool(args.time_from or args.time_to)
+    for file_path in args.files:
+        if is_compressed(file_path) and not (args.index or timed):
+            # Searched while decompressing, one pass and no line index needed
+            try:
+                for _, batch in iter_stream_match_batches(iter_decompressed(file_path), matcher):
+                    for line_number, offset, line, pattern_ids in batch:
+                        found = True
+                        write_match(args, names, out, show_file, file_path,
+                                    line_number, offset, line, pattern_ids)
+            except DECOMPRESSION_ERRORS as e:
+                print(f"log-search: {file_path}: {e}", file=sys.stderr)
+                status = 2
+            continue
+        try:
+            document = get_document(file_path)
+        except DECOMPRESSION_ERRORS as e:
+            print(f"log-search: {file_path}: {e.strerror or e}", file=sys.stderr)
+            status = 2
+            continue
+        window = WHOLE_FILE
+        if timed:
+            try:
+                window = time_window(document, args.time_from, args.time_to)
+            except ValueError as e:
+                print(f"log-search: {file_path}: {e}", file=sys.stderr)
+                status = 2
+                continue
+        offsets = document.index.offsets
+        ranges = candidate_ranges(document, matcher, args.index, window=window)
+        scanned = matches = 0
+        with metrics.stage('scan'):
+            for lines_scanned, batch in iter_match_batches(document, matcher, ranges):
+                scanned += lines_scanned
+                matches += len(batch)
+                for line_number, line, pattern_ids in batch:
+                    found = True
+                    write_match(args, names, out, show_file, file_path,
+                                line_number, offsets[line_number - 1], line, pattern_ids)
+        metrics.add('lines_scanned', scanned)
+        metrics.add('matches', matches)
+    return found, status
+
+
+def run_parallel_search(args, names, matcher, out):
+    """Like run_search, but fans files and byte ranges out over a process pool."""
+    found = False
+    status = 0
+    for target in args.files:
+        if not os.path.exists(target) and not any(char in target for char in '*?['):
+            print(f"log-search: {target}: No such file or directory", file=sys.stderr)
+            status = 2
+    results = search_paths(args.files, matcher.patterns, matcher.case_sensitive, max_workers=args.jobs)
+    matches = 0
+    for file_path, line_number, offset, line, pattern_ids in results:
+        found = True
+        matches += 1
+        write_match(args, names, out, True, file_path, line_number, offset, line, pattern_ids)
+    # Timings and counters of the worker processes stay in the workers
+    metrics.add('matches', matches)
+    return found, status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,359 @@
+import tkinter as tk
+from array import array
+from bisect import bisect_left, bisect_right
+
+from instrumentation import metrics
+from match_density import density_by_pattern
+
+
+class VirtualTextView:
+    """
+    Shows a LineIndex in a tk.Text widget without inserting the whole file.
+
+    Only the lines around the viewport (plus ``margin`` lines on either side)
+    are materialized in the widget. The scrollbar, mouse wheel and ``see()``
+    jumps all work in file line numbers and re-render the window whenever the
+    viewport would leave it. Line number prefixes are rendered together with
+    the window, so they cost nothing for lines that are never shown.
+
+    ``set_range`` limits the view (and its scrollbar) to a range of lines,
+    e.g. the lines of a time window.
+
+    The index only needs ``line_count`` and ``get_lines(first, last)``, so
+    the view also serves lists that are not files, e.g. search results: with
+    ``numbered`` False lines are shown as the index returns them, and with
+    ``follow_end`` False a view at the end does not chase appended lines.
+    """
+
+    def __init__(self, text, scrollbar, margin=200, numbered=True, follow_end=True):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.margin = margin
+        self.numbered = numbered
+        self.follow_end = follow_end
+        self.index = None
+        self.known_line_count = 0  # Line count of the index when last rendered
+        self.top_line = 1
+        self.window_start = 1  # First file line materialized in the widget
+        self.window_end = 0  # Last file line materialized in the widget
+        self.first_line = 1  # First file line the view may show
+        self.range_last = None  # Last file line the view may show, None for the end of the file
+        self.render_callbacks = []  # Called with (window_start, window_end) after each render
+
+        self.scrollbar.config(command=self.yview)
+        self.text.config(yscrollcommand=self._on_text_scroll)
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", self._on_mousewheel)
+        self.text.bind("<Button-5>", self._on_mousewheel)
+        self.text.bind("<Configure>", lambda event: self.refresh())
+
+    def set_index(self, index):
+        self.index = index
+        self.set_range()
+
+    def set_range(self, first_line=1, last_line=None):
+        """Shows only lines ``first_line``..``last_line`` (None: up to the end, growing with the file)."""
+        self.first_line, self.range_last = first_line, last_line
+        self.known_line_count = self.line_count
+        self.top_line = self.first_line
+        self.window_start, self.window_end = self.first_line, self.first_line - 1
+        self._render(self.first_line)
+        self.scroll_to(self.first_line)
+
+    @property
+    def line_count(self):
+        return self.index.line_count if self.index else 0
+
+    @property
+    def last_line(self):
+        """Last line the view shows, less than ``first_line`` for an empty range."""
+        if self.range_last is None:
+            return self.line_count
+        return min(self.range_last, self.line_count)
+
+    def page_size(self):
+        """Number of widget lines that currently fit in the viewport."""
+        height = self.text.winfo_height()
+        first = int(self.text.index("@0,0").split('.')[0])
+        last = int(self.text.index("@0,%d" % max(height - 1, 0)).split('.')[0])
+        return max(last - first + 1, int(self.text.cget('height')))
+
+    def text_index(self, line_no, column=0):
+        """
+        Maps a file line number to a Text index, or returns None when the line
+        is not materialized in the widget.
+        """
+        if self.window_start <= line_no <= self.window_end:
+            return f"{line_no - self.window_start + 1}.{column}"
+        return None
+
+    def visible_range(self):
+        """Returns the (first, last) file lines currently materialized."""
+        return self.window_start, self.window_end
+
+    def scroll_to(self, top):
+        if self.last_line < self.first_line:
+            self._update_scrollbar()
+            return
+        page = self.page_size()
+        top = max(self.first_line, min(top, self.last_line - page + 1))
+        if not (self.window_start <= top and (top + page - 1 <= self.window_end or self.window_end == self.last_line)):
+            self._render(top)
+        self.top_line = top
+        self.text.yview(self.text_index(top))
+        self._update_scrollbar()
+
+    def scroll_by(self, lines):
+        self.scroll_to(self.top_line + lines)
+
+    def see(self, line_no):
+        """Brings ``line_no`` into view, centering it when it is off screen."""
+        if self.last_line < self.first_line:
+            return
+        page = self.page_size()
+        if not (self.top_line <= line_no < self.top_line + page):
+            self.scroll_to(line_no - page // 2)
+
+    def lines_appended(self):
+        """
+        Updates the view after the index grew at its end. A view showing the
+        last lines keeps following the end of the file, like ``tail -f``.
+        """
+        previous_count = self.known_line_count
+        self.known_line_count = self.line_count
+        if self.range_last is not None and self.range_last < previous_count:
+            # The range ends before the lines that changed
+            return
+        following = self.follow_end and self.top_line + self.page_size() > previous_count
+        top = self.last_line if following else self.top_line
+        if following or self.window_end >= previous_count:
+            # The last rendered line may have been incomplete, render again
+            self._render(max(self.first_line, min(top, self.last_line - self.page_size() + 1)))
+        self.scroll_to(top)
+
+    def refresh(self):
+        """Re-renders the current window, e.g. after the viewport was resized."""
+        if self.index:
+            self._render(self.top_line)
+            self.scroll_to(self.top_line)
+
+    def yview(self, *args):
+        if not self.index:
+            return self.text.yview(*args)
+        if args[0] == 'moveto':
+            span = self.last_line - self.first_line + 1
+            self.scroll_to(int(float(args[1]) * span) + self.first_line)
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.page_size()
+            self.scroll_by(amount)
+
+    def _on_mousewheel(self, event):
+        if event.num == 4:
+            step = -3
+        elif event.num == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self.scroll_by(step)
+        return "break"
+
+    def _on_text_scroll(self, first, last):
+        # The widget can still scroll itself (selection drags, keyboard), keep
+        # top_line and the scrollbar in sync with whatever it shows now
+        if not self.index:
+            self.scrollbar.set(first, last)
+            return
+        widget_top = int(self.text.index("@0,0").split('.')[0])
+        self.top_line = self.window_start + widget_top - 1
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = self.last_line - self.first_line + 1
+        if total <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        first = (self.top_line - self.first_line) / total
+        last = min(1.0, (self.top_line - self.first_line + self.page_size()) / total)
+        self.scrollbar.set(first, last)
+
+    def _render(self, top):
+        start = max(self.first_line, top - self.margin)
+        end = min(self.last_line, top + self.page_size() + self.margin)
+        lines = self.index.get_lines(start, end) if self.index else []
+
+        with metrics.stage('widget_insert'):
+            self.text.config(state=tk.NORMAL)
+            self.text.delete(1.0, tk.END)
+            if self.numbered:
+                lines = [f"{idx}: {line}" for idx, line in enumerate(lines, start=start)]
+            self.text.insert(tk.END, ''.join(lines))
+            self.text.config(state=tk.DISABLED)
+
+        self.window_start, self.window_end = start, start + len(lines) - 1
+        for callback in self.render_callbacks:
+            callback(self.window_start, self.window_end)
+
+
+class ResultRows:
+    """
+    Index of a VirtualTextView over the matches of a MatchSet, one row per
+    match as ``line: text`` (``file:line: text`` for a multi-file search).
+    The lines of a matched record are joined with ``⏎`` into one row.
+
+    Rows are 1-based like view lines; row ``n`` is match ``n - 1`` of the
+    store. The text of a row is read from ``document`` when it is rendered.
+    """
+
+    def __init__(self, match_set, document=None):
+        self.match_set = match_set
+        self.document = document
+
+    @property
+    def line_count(self):
+        return len(self.match_set)
+
+    def get_lines(self, first, last):
+        last = min(last, len(self.match_set))
+        texts = self.match_set.read_lines(self.document, first - 1, last - 1)
+        rows = []
+        for row, text in zip(range(first - 1, last), texts):
+            file_path, line_number = self.match_set.location(row)
+            prefix = f"{file_path}:{line_number}" if file_path is not None else line_number
+            # One widget line per row, also for a last line without newline
+            # and for the lines of a record
+            text = text.rstrip('\n')
+            if '\n' in text:
+                text = text.replace('\n', ' \u23ce ')
+            rows.append(f"{prefix}: {text}\n")
+        return rows
+
+
+class ListRows:
+    """
+    Index of a VirtualTextView over a list: row ``n`` shows
+    ``label(items[n - 1])``, worked out only when the row is rendered.
+    """
+
+    def __init__(self, items, label=str):
+        self.items = items
+        self.label = label
+
+    @property
+    def line_count(self):
+        return len(self.items)
+
+    def get_lines(self, first, last):
+        return [f"{self.label(item)}\n" for item in self.items[first - 1:last]]
+
+
+class HighlightLayer:
+    """
+    Line highlighting for a VirtualTextView with one Tk tag per pattern/color.
+
+    The lines each tag covers are kept in sorted arrays outside the widget.
+    Only lines the view has materialized are tagged, with a single bulk
+    ``tag_add`` per tag, and the layer re-applies itself whenever the view
+    renders a new window. Clearing removes whole tags, so its cost depends on
+    the number of patterns rather than the number of matches.
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.text = view.text
+        self.lines = {}  # {tag_name: array of ascending line numbers}
+        view.render_callbacks.append(self.apply)
+
+    def configure(self, tag_name, **options):
+        self.text.tag_config(tag_name, **options)
+        self.lines.setdefault(tag_name, array('q'))
+
+    def add_lines(self, tag_name, line_numbers):
+        """Adds ``line_numbers`` (ascending) to ``tag_name`` and tags the visible ones."""
+        if not line_numbers:
+            return
+        lines = self.lines.setdefault(tag_name, array('q'))
+        in_order = not lines or lines[-1] < line_numbers[0]
+        lines.extend(line_numbers)
+        if not in_order:
+            self.lines[tag_name] = array('q', sorted(set(lines)))
+        self._tag_range(tag_name, line_numbers, *self.view.visible_range())
+
+    def apply(self, first_line, last_line):
+        for tag_name, lines in self.lines.items():
+            self._tag_range(tag_name, lines, first_line, last_line)
+
+    def clear(self, tag_names=None):
+        for tag_name in list(self.lines if tag_names is None else tag_names):
+            self.text.tag_remove(tag_name, "1.0", "end")
+            self.lines.pop(tag_name, None)
+
+    def _tag_range(self, tag_name, lines, first_line, last_line):
+        ranges = []
+        for line_number in lines[bisect_left(lines, first_line):bisect_right(lines, last_line)]:
+            start = self.view.text_index(line_number)
+            ranges.extend((start, f"{start} lineend"))
+        if ranges:
+            with metrics.stage('tag_apply'):
+                self.text.tag_add(tag_name, *ranges)
+
+
+class MatchMinimap:
+    """
+    Overview strip for a VirtualTextView showing where the matches of a
+    search are, over all the lines the view can show.
+
+    Each pixel row of the canvas is one bucket of lines. A row with matches
+    is drawn in the color of the pattern with the most hits in its bucket,
+    with a length that grows with the number of hits. Clicking (or dragging
+    over) the strip jumps the view to that bucket.
+    """
+
+    def __init__(self, canvas, view):
+        self.canvas = canvas
+        self.view = view
+        self.match_set = None
+        self.colors = []  # Color per pattern of match_set
+        canvas.bind("<Configure>", lambda event: self.redraw())
+        canvas.bind("<Button-1>", self._on_click)
+        canvas.bind("<B1-Motion>", self._on_click)
+
+    def set_matches(self, match_set, colors):
+        """Shows ``match_set`` (None clears the strip), pattern ``i`` drawn in ``colors[i]``."""
+        self.match_set = match_set
+        self.colors = list(colors)
+        self.redraw()
+
+    def redraw(self):
+        self.canvas.delete("density")
+        first_line, last_line = self.view.first_line, self.view.last_line
+        height = self.canvas.winfo_height()
+        width = self.canvas.winfo_width()
+        if self.match_set is None or not len(self.match_set) or last_line < first_line or height <= 1:
+            return
+        buckets = min(height, last_line - first_line + 1)
+        density = density_by_pattern(self.match_set, buckets, first_line, last_line)
+        totals = [sum(counts) for counts in zip(*density)]
+        peak = max(totals)
+        if not peak:
+            return
+        for bucket, total in enumerate(totals):
+            if not total:
+                continue
+            dominant = max(range(len(density)), key=lambda pid: density[pid][bucket])
+            top = bucket * height // buckets
+            bottom = max((bucket + 1) * height // buckets, top + 1)
+            # Square root so a few isolated hits stay visible next to a burst
+            length = max(3, int(width * (total / peak) ** 0.5))
+            self.canvas.create_rectangle(
+                0, top, length, bottom, width=0, fill=self.colors[dominant], tags=("density",)
+            )
+
+    def _on_click(self, event):
+        first_line, last_line = self.view.first_line, self.view.last_line
+        height = self.canvas.winfo_height()
+        if last_line < first_line or height <= 0:
+            return
+        fraction = min(max(event.y / height, 0.0), 1.0)
+        self.view.see(first_line + int(fraction * (last_line - first_line)))
@@ -0,0 +1,60 @@
+from collections import Counter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _pattern_set_members(match_set):
+    # 0/1 (pattern, pattern set) matrix: which pattern sets contain each pattern
+    members = numpy.zeros((len(match_set.patterns), max(len(match_set.pattern_sets), 1)), dtype=numpy.int64)
+    for set_id, pattern_ids in enumerate(match_set.pattern_sets):
+        members[list(pattern_ids), set_id] = 1
+    return members
+
+
+def hits_by_pattern(match_set):
+    """Returns, for each pattern of ``match_set``, the number of lines it matched."""
+    if numpy is not None:
+        set_ids = numpy.frombuffer(match_set.pattern_set_ids, dtype=numpy.intc)
+        by_set = numpy.bincount(set_ids, minlength=max(len(match_set.pattern_sets), 1))
+        return (_pattern_set_members(match_set) @ by_set).tolist()
+    hits = [0] * len(match_set.patterns)
+    for set_id, count in Counter(match_set.pattern_set_ids).items():
+        for pid in match_set.pattern_sets[set_id]:
+            hits[pid] += count
+    return hits
+
+
+def density_by_pattern(match_set, buckets, first_line, last_line):
+    """
+    Splits lines ``first_line``..``last_line`` into ``buckets`` equal parts
+    and returns, for each pattern of ``match_set``, the number of its
+    matching lines in every part (a list of ``buckets`` counts).
+
+    With NumPy the matches are bucketed with a single ``bincount`` over
+    (pattern set, bucket) pairs, so millions of matches take milliseconds.
+    """
+    span = last_line - first_line + 1
+    if buckets <= 0 or span <= 0:
+        return [[0] * max(buckets, 0) for _ in match_set.patterns]
+    if numpy is not None:
+        lines = numpy.frombuffer(match_set.line_numbers, dtype=numpy.int64)
+        set_ids = numpy.frombuffer(match_set.pattern_set_ids, dtype=numpy.intc)
+        inside = (lines >= first_line) & (lines <= last_line)
+        bucket = (lines[inside] - first_line) * buckets // span
+        set_count = max(len(match_set.pattern_sets), 1)
+        by_set = numpy.bincount(
+            set_ids[inside].astype(numpy.int64) * buckets + bucket, minlength=set_count * buckets
+        ).reshape(set_count, buckets)
+        return (_pattern_set_members(match_set) @ by_set).tolist()
+
+    density = [[0] * buckets for _ in match_set.patterns]
+    pattern_sets = match_set.pattern_sets
+    for line_number, set_id in zip(match_set.line_numbers, match_set.pattern_set_ids):
+        if first_line <= line_number <= last_line:
+            bucket = (line_number - first_line) * buckets // span
+            for pid in pattern_sets[set_id]:
+                density[pid][bucket] += 1
+    return density
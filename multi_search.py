@@ -0,0 +1,158 @@
+import glob
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from compressed_log import DECOMPRESSION_ERRORS, is_compressed, iter_decompressed
+from search_engine import PatternMatcher, iter_stream_match_batches
+
+# Files larger than this are split into several byte ranges so that a single
+# huge log is still spread over every worker
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+# Characters that turn a search target into a glob pattern
+_GLOB_CHARACTERS = set('*?[')
+
+
+def expand_targets(targets):
+    """
+    Expands files, directories (searched recursively, dotfiles skipped) and
+    glob patterns (``**`` allowed) into a sorted list of unique file paths.
+    """
+    files = set()
+    for target in targets:
+        if os.path.isdir(target):
+            for root, dirs, names in os.walk(target):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                files.update(os.path.join(root, name) for name in names if not name.startswith('.'))
+        elif any(char in _GLOB_CHARACTERS for char in target):
+            files.update(path for path in glob.glob(target, recursive=True) if os.path.isfile(path))
+        else:
+            files.add(target)
+    return sorted(files)
+
+
+def split_ranges(file_path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    Splits a file into ``(start, end)`` byte ranges of roughly ``chunk_bytes``
+    whose boundaries fall just after a newline, so no line is cut in two.
+    """
+    size = os.path.getsize(file_path)
+    if size <= chunk_bytes or is_compressed(file_path):
+        return [(0, size)]
+    ranges = []
+    with open(file_path, 'rb') as f:
+        start = 0
+        while start < size:
+            end = start + chunk_bytes
+            if end >= size:
+                ranges.append((start, size))
+                break
+            f.seek(end)
+            # Extend the range to the end of the line it cuts into
+            while True:
+                block = f.read(64 * 1024)
+                if not block:
+                    end = size
+                    break
+                newline = block.find(b'\n')
+                if newline != -1:
+                    end += newline + 1
+                    break
+                end += len(block)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+_matchers = {}  # Per worker process: {(patterns, case_sensitive): PatternMatcher}
+
+
+def _search_range(file_path, start, end, patterns, case_sensitive):
+    """
+    Worker: searches bytes ``start``..``end`` of ``file_path``. Returns the
+    number of lines in the range and ``[(line_in_range, byte_offset, line,
+    pattern_ids), ...]`` with 1-based line numbers relative to the range.
+    Compressed files are never split and are decompressed as they are searched.
+    """
+    key = (patterns, case_sensitive)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = _matchers[key] = PatternMatcher(patterns, case_sensitive)
+
+    if end <= start:
+        return 0, []
+    line_count = 0
+    matches = []
+    if is_compressed(file_path):
+        for scanned, batch in iter_stream_match_batches(iter_decompressed(file_path), matcher):
+            line_count += scanned
+            matches.extend(batch)
+        return line_count, matches
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    for scanned, batch in iter_stream_match_batches((data,), matcher, start):
+        line_count += scanned
+        matches.extend(batch)
+    return line_count, matches
+
+
+def search_paths(targets, patterns, case_sensitive=False, max_workers=None,
+                 chunk_bytes=DEFAULT_CHUNK_BYTES, mp_context=None, cancelled=None, progress=None):
+    """
+    Searches many files in parallel on a process pool.
+
+    Every file is cut into newline-aligned byte ranges which are all searched
+    concurrently. Results are yielded grouped by file (in sorted path order)
+    and in line order within a file, as ``(file_path, line_number,
+    byte_offset, line, pattern_ids)``. Unreadable files are skipped.
+
+    Args:
+        targets (list): Files, directories and/or glob patterns.
+        patterns (list): Regex pattern strings.
+        case_sensitive (bool): Whether matching is case sensitive.
+        max_workers (int): Pool size, defaults to the number of CPUs.
+        chunk_bytes (int): Target size of the byte range handed to one task.
+        mp_context: multiprocessing context for the pool (e.g. 'spawn' when
+                    called from a process that runs other threads).
+        cancelled (callable): Polled between results, stops the search when true.
+        progress (callable): Called with (ranges_done, ranges_total).
+    """
+    patterns = tuple(patterns)
+    files = expand_targets(targets)
+    work = []
+    for file_path in files:
+        try:
+            work.append((file_path, split_ranges(file_path, chunk_bytes)))
+        except OSError:
+            continue
+    total = sum(len(ranges) for _, ranges in work)
+
+    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+    try:
+        futures = [
+            (file_path, [executor.submit(_search_range, file_path, start, end, patterns, case_sensitive)
+                         for start, end in ranges])
+            for file_path, ranges in work
+        ]
+        done = 0
+        for file_path, file_futures in futures:
+            line_base = 0
+            for future in file_futures:
+                if cancelled and cancelled():
+                    return
+                try:
+                    line_count, matches = future.result()
+                except DECOMPRESSION_ERRORS:
+                    # Vanished, unreadable or corrupt
+                    break
+                for line_number, offset, line, pattern_ids in matches:
+                    yield file_path, line_base + line_number, offset, line, pattern_ids
+                line_base += line_count
+                done += 1
+                if progress:
+                    progress(done, total)
+    finally:
+        # Queued ranges are dropped when the caller stops early; waiting for
+        # the running ones keeps the pool from being torn down under them
+        executor.shutdown(wait=True, cancel_futures=True)
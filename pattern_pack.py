@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import re
+
+from search_engine import PatternMatcher, check_patterns, required_literal
+
+PACK_VERSION = 1
+# Where packs go when the directory of the pattern file is not writable
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'log-file-search', 'packs')
+
+
+class PatternPack:
+    """
+    A pattern library ready for searching: entries whose pattern does not
+    compile are left out (and listed in ``skipped``), repeated patterns are
+    kept once, and the required literal of every pattern (see
+    ``search_engine.required_literal``) is worked out ahead of time.
+
+    Built by ``load_pattern_pack``, which caches packs on disk so that an
+    unchanged pattern file loads without being validated again.
+    """
+
+    def __init__(self, source_hash, names, patterns, colors, required, skipped=(), duplicates=0):
+        self.source_hash = source_hash
+        self.names = names
+        self.patterns = patterns
+        self.colors = colors
+        self.required = required
+        self.skipped = list(skipped)  # (name, error message) per invalid entry
+        self.duplicates = duplicates
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def as_dict(self):
+        """Returns the entries in the pattern file format, ``{name: {"pattern": ..., "highlight_color": ...}}``."""
+        return {
+            name: {'pattern': pattern, 'highlight_color': color}
+            for name, pattern, color in zip(self.names, self.patterns, self.colors)
+        }
+
+    def matcher(self, case_sensitive=False):
+        return PatternMatcher(self.patterns, case_sensitive, required=self.required)
+
+    def to_json(self):
+        return json.dumps({
+            'version': PACK_VERSION,
+            'source_hash': self.source_hash,
+            'names': self.names,
+            'patterns': self.patterns,
+            'colors': self.colors,
+            'required': self.required,
+            'skipped': self.skipped,
+            'duplicates': self.duplicates,
+        })
+
+    @classmethod
+    def from_json(cls, data):
+        pack = json.loads(data)
+        if pack.get('version') != PACK_VERSION:
+            raise ValueError("outdated pattern pack")
+        return cls(
+            pack['source_hash'], pack['names'], pack['patterns'], pack['colors'], pack['required'],
+            [tuple(entry) for entry in pack['skipped']], pack['duplicates']
+        )
+
+
+def build_pack(entries, source_hash=None):
+    """Validates and deduplicates the ``{name: {"pattern": ..., ...}}`` entries of a pattern file."""
+    check_patterns(entries)
+    names, patterns, colors, required, skipped = [], [], [], [], []
+    seen = set()
+    duplicates = 0
+    for name, pattern_info in entries.items():
+        pattern = pattern_info['pattern']
+        if pattern in seen:
+            duplicates += 1
+            continue
+        try:
+            if not isinstance(pattern, str):
+                raise TypeError(f"not a string: {pattern!r}")
+            re.compile(pattern)
+        except (re.error, TypeError) as e:
+            skipped.append((name, str(e)))
+            continue
+        seen.add(pattern)
+        names.append(name)
+        patterns.append(pattern)
+        colors.append(pattern_info.get('highlight_color', 'black'))
+        required.append(required_literal(pattern))
+    return PatternPack(source_hash, names, patterns, colors, required, skipped, duplicates)
+
+
+def pack_paths_for(json_path, source_hash, cache_dir=None):
+    """The pack is kept next to the pattern file, or in ``cache_dir`` when that is read-only."""
+    directory, file_name = os.path.split(os.path.abspath(json_path))
+    return [
+        os.path.join(directory, f".{file_name}.pack"),
+        os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"{source_hash}.pack"),
+    ]
+
+
+def load_pattern_pack(json_path, cache_dir=None):
+    """
+    Returns the PatternPack of the pattern file ``json_path``.
+
+    Packs are keyed by the SHA-256 of the file's content: a cached pack is
+    used as long as it was built from identical bytes, otherwise the file
+    is parsed, validated and the new pack saved for next time.
+
+    Raises:
+        ValueError: If the file is not valid JSON or an entry has no "pattern".
+    """
+    with open(json_path, 'rb') as json_file:
+        data = json_file.read()
+    source_hash = hashlib.sha256(data).hexdigest()
+    pack_paths = pack_paths_for(json_path, source_hash, cache_dir)
+    for pack_path in pack_paths:
+        try:
+            with open(pack_path, 'r', encoding='utf-8') as pack_file:
+                pack = PatternPack.from_json(pack_file.read())
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+        if pack.source_hash == source_hash:
+            return pack
+
+    pack = build_pack(json.loads(data), source_hash)
+    for pack_path in pack_paths:
+        try:
+            os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+            # Written to a temporary file first so readers never see half a pack
+            tmp_path = f"{pack_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as pack_file:
+                pack_file.write(pack.to_json())
+            os.replace(tmp_path, pack_path)
+            break
+        except OSError:
+            continue
+    return pack
@@ -0,0 +1,126 @@
+import re
+import threading
+from array import array
+from bisect import bisect_right
+
+from instrumentation import metrics
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# A line starting with an ISO-8601 timestamp starts a new record
+DEFAULT_RECORD_START = r'\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d'
+# Lines read per step while the index is built
+_SCAN_LINES = 64 * 1024
+
+_index_lock = threading.Lock()
+
+
+def compile_record_start(start_pattern):
+    """
+    Compiles ``start_pattern`` as RecordIndex scans with it: over the raw
+    UTF-8 bytes of the file, anchored at line starts.
+
+    Raises:
+        re.error: If the pattern is not valid as a bytes pattern (e.g. it
+                  uses ``\\u`` escapes).
+    """
+    return re.compile(b'^(?:' + start_pattern.encode('utf-8') + b')', re.MULTILINE)
+
+
+class RecordIndex:
+    """
+    The lines at which the records of a LogDocument start.
+
+    A record is a line matching the ``start_pattern`` regex (anchored at
+    the start of the line, e.g. a leading timestamp) together with the
+    continuation lines up to the next such line: the frames of a stack
+    trace, the body of a pretty-printed JSON entry ... Lines before the
+    first start form a record of their own.
+
+    Built with one bytes regex scan over the file, 8 bytes per record, and
+    extended in place when the file grows.
+    """
+
+    def __init__(self, start_pattern):
+        self.start_pattern = start_pattern
+        self._regex = compile_record_start(start_pattern)
+        self.starts = array('q', [1])
+        # Lines known to be scanned for good; a last line without newline
+        # is scanned again once it is complete
+        self.scanned_lines = 0
+
+    def __len__(self):
+        return len(self.starts)
+
+    def update(self, document, cancelled=None):
+        """
+        Adds the record starts of the part of ``document`` not scanned yet.
+        Returns False if ``cancelled()`` became true.
+        """
+        line_count = document.line_count
+        first = self.scanned_lines + 1
+        # Starts found on a line that was still being written
+        while len(self.starts) > 1 and self.starts[-1] >= first:
+            self.starts.pop()
+        search = self._regex.finditer
+        offsets = document.index.offsets
+        starts = self.starts
+        while first <= line_count:
+            if cancelled and cancelled():
+                return False
+            last = min(first + _SCAN_LINES - 1, line_count)
+            base = document.line_span(first)[0]
+            positions = array('q', [
+                base + match.start() for match in search(document.read_bytes(base, document.line_span(last)[1]))
+            ])
+            if numpy is not None:
+                # Matches are at line starts, one lookup for the whole block
+                line_numbers = numpy.searchsorted(
+                    numpy.frombuffer(offsets[first - 1:last], dtype=numpy.int64),
+                    numpy.frombuffer(positions, dtype=numpy.int64), side='right'
+                ) + (first - 1)
+                starts.extend(line_numbers[line_numbers > starts[-1]].tolist())
+            else:
+                for position in positions:
+                    line_number = bisect_right(offsets, position)
+                    if line_number > starts[-1]:
+                        starts.append(line_number)
+            first = last + 1
+        self.scanned_lines = document.complete_line_count
+        return True
+
+    def record_of(self, line_number):
+        """Returns the index of the record containing ``line_number``."""
+        return bisect_right(self.starts, line_number) - 1
+
+    def start_of(self, line_number):
+        """Returns the first line of the record containing ``line_number``."""
+        return self.starts[self.record_of(line_number)]
+
+    def span(self, record, line_count):
+        """Returns ``(first_line, last_line)`` of ``record`` in a document of ``line_count`` lines."""
+        end = self.starts[record + 1] - 1 if record + 1 < len(self.starts) else line_count
+        return self.starts[record], end
+
+
+def get_record_index(document, start_pattern, cancelled=None):
+    """
+    Returns the RecordIndex of ``document`` for ``start_pattern``, building
+    it on first use and extending it when the file grew. Kept on the
+    document, so it lives as long as the document's line index. Returns
+    None if ``cancelled()`` became true during the build.
+
+    Raises:
+        re.error: If ``start_pattern`` does not compile.
+    """
+    with _index_lock:
+        index = document.record_indexes.get(start_pattern)
+        if index is None:
+            index = document.record_indexes[start_pattern] = RecordIndex(start_pattern)
+        with metrics.stage('record_index_build'):
+            if not index.update(document, cancelled):
+                return None
+        return index
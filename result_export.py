@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+
+from log_document import get_document
+
+# Export format per file extension, anything else is exported as text
+EXPORT_FORMATS = {'.txt': 'text', '.log': 'text', '.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+# Matches exported per step; progress and cancellation are checked in between
+_ROWS_PER_BLOCK = 4096
+# Matches at most this many lines apart (context excluded) are read in one slice
+_MAX_GAP = 64
+# ... as long as the slice stays below this many lines, which bounds memory
+_MAX_SLICE_LINES = 8192
+# Size of the output buffer
+_WRITE_BUFFER = 1024 * 1024
+
+
+def export_format(file_path):
+    """Returns the export format ('text', 'csv' or 'jsonl') for the extension of ``file_path``."""
+    return EXPORT_FORMATS.get(os.path.splitext(file_path)[1].lower(), 'text')
+
+
+def _file_runs(match_set, count):
+    # (file_path, first_row, last_row) runs of matches in the same file,
+    # file_path None for the single document of a MatchSet
+    file_ids = getattr(match_set, 'file_ids', None)
+    if file_ids is None:
+        if count:
+            yield None, 0, count - 1
+        return
+    start = 0
+    for row in range(1, count + 1):
+        if row == count or file_ids[row] != file_ids[start]:
+            yield match_set.files[file_ids[start]], start, row - 1
+            start = row
+
+
+def _lines_with_context(document, line_numbers, context):
+    # Yields (before, line, after) for each of the sorted ``line_numbers``.
+    # Runs of nearby matches share one get_lines slice instead of one read each
+    count = len(line_numbers)
+    i = 0
+    while i < count:
+        first = max(1, line_numbers[i] - context)
+        j = i
+        while j + 1 < count and line_numbers[j + 1] - line_numbers[j] <= 2 * context + _MAX_GAP \
+                and line_numbers[j + 1] + context - first < _MAX_SLICE_LINES:
+            j += 1
+        lines = document.get_lines(first, line_numbers[j] + context)
+        for k in range(i, j + 1):
+            at = line_numbers[k] - first
+            yield lines[max(at - context, 0):at], lines[at], lines[at + 1:at + 1 + context]
+        i = j + 1
+
+
+def iter_export_records(match_set, document=None, context=0, count=None):
+    """
+    Yields ``(file_path, line_number, offset, pattern_ids, before, line, after)``
+    for the first ``count`` matches of ``match_set`` (default: all of them),
+    ``before``/``after`` holding up to ``context`` lines around the match.
+
+    Lines are read from the source files, block by block, so memory does
+    not grow with the number of matches. ``document`` is the LogDocument of
+    a single-file MatchSet, whose matches are reported with its path; lines
+    of a MultiFileMatchSet are read at their byte offset, or through the
+    file's LogDocument when context is wanted.
+    Matches of a search by record (``match_set.records`` set) are whole
+    records, exported without context.
+    """
+    if count is None:
+        count = len(match_set)
+    records = getattr(match_set, 'records', None) is not None
+    offsets_of_matches = getattr(match_set, 'offsets', None)
+    for file_path, first_row, last_row in _file_runs(match_set, count):
+        if file_path is None:
+            file_path = document.file_path
+            source = document
+        else:
+            source = get_document(file_path) if context else None
+        offsets = source.index.offsets if source is not None and offsets_of_matches is None else None
+        if records:
+            # A match is a whole record, which is its own context
+            source = None
+        for block_start in range(first_row, last_row + 1, _ROWS_PER_BLOCK):
+            block_end = min(block_start + _ROWS_PER_BLOCK, last_row + 1)
+            line_numbers = match_set.line_numbers[block_start:block_end]
+            if source is None:
+                texts = (((), line, ()) for line in match_set.read_lines(document, block_start, block_end - 1))
+            else:
+                texts = _lines_with_context(source, line_numbers, context)
+            for row, line_number, (before, line, after) in zip(range(block_start, block_end), line_numbers, texts):
+                offset = offsets_of_matches[row] if offsets is None else offsets[line_number - 1]
+                pattern_ids = match_set.pattern_sets[match_set.pattern_set_ids[row]]
+                yield file_path, line_number, offset, pattern_ids, before, line, after
+
+
+def export_matches(match_set, out_path, fmt='text', document=None, context=0, pattern_names=None,
+                   progress=None, cancelled=None):
+    """
+    Writes every match of ``match_set`` to ``out_path`` as plain text
+    (grep style, ``file:line: [patterns] text`` with ``line-`` context
+    lines and ``--`` between matches), CSV or JSON Lines, and returns the
+    number of matches written.
+
+    ``pattern_names`` names the patterns of the match set (default: the
+    patterns themselves). ``progress(done, total)`` is called after each
+    block of matches; a true ``cancelled()`` stops the export early, leaving
+    a partial file. Matches added to ``match_set`` while exporting (follow
+    mode) are not included.
+    """
+    names = list(pattern_names or match_set.patterns)
+    total = len(match_set)
+    written = 0
+    with open(out_path, 'w', encoding='utf-8', newline='', buffering=_WRITE_BUFFER) as out:
+        if fmt == 'csv':
+            writer = csv.writer(out)
+            writer.writerow(['file', 'line', 'offset', 'patterns', 'text', 'before', 'after'])
+        for file_path, line_number, offset, pattern_ids, before, line, after in \
+                iter_export_records(match_set, document, context, total):
+            matched = [names[pid] for pid in pattern_ids]
+            text = line.rstrip('\n')
+            before = [context_line.rstrip('\n') for context_line in before]
+            after = [context_line.rstrip('\n') for context_line in after]
+            if fmt == 'csv':
+                writer.writerow([
+                    file_path, line_number, offset, ';'.join(matched), text,
+                    '\n'.join(before), '\n'.join(after)
+                ])
+            elif fmt == 'jsonl':
+                record = {'file': file_path, 'line': line_number, 'offset': offset, 'patterns': matched, 'text': text}
+                if context:
+                    record['before'] = before
+                    record['after'] = after
+                out.write(json.dumps(record) + '\n')
+            else:
+                prefix = f"{file_path}:"
+                if context and written:
+                    out.write("--\n")
+                for number, context_line in enumerate(before, start=line_number - len(before)):
+                    out.write(f"{prefix}{number}- {context_line}\n")
+                out.write(f"{prefix}{line_number}: [{', '.join(matched)}] {text}\n")
+                for number, context_line in enumerate(after, start=line_number + 1):
+                    out.write(f"{prefix}{number}- {context_line}\n")
+            written += 1
+            if written % _ROWS_PER_BLOCK == 0:
+                if cancelled is not None and cancelled():
+                    break
+                if progress is not None:
+                    progress(written, total)
+    return written
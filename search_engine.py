@@ -0,0 +1,810 @@
+# Headless search engine shared by the Tk application and the log-search
+# command line tool. Nothing in here may import tkinter.
+import codecs
+import json
+import re
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+try:
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+from compressed_log import DECOMPRESSION_ERRORS, is_compressed
+from line_index import DEFAULT_ENCODING, DEFAULT_ERRORS
+from log_document import CHUNK_LINES, get_document
+from trigram_index import get_trigram_index, required_literals
+
+# Characters that make a pattern more than a plain substring
+_REGEX_METACHARACTERS = set('.^$*+?{}[]\\|()')
+# Numbered backreferences (\1..\9) stop meaning the same thing once the
+# pattern follows other patterns' groups in the combined expression
+_NUMBERED_BACKREFERENCE = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]')
+# UTF-8 of the only non-ASCII characters IGNORECASE equates with ASCII
+# letters: U+0130 and U+0131 (i), U+017F (s) and the Kelvin sign (k)
+_ASCII_CASE_FOLDS = re.compile(rb'\xc4[\xb0\xb1]|\xc5\xbf|\xe2\x84\xaa')
+# Zero-width assertions that mean the same on UTF-8 bytes as on text
+_BYTES_SAFE_AT = {sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_LINE,
+                  sre_constants.AT_END, sre_constants.AT_END_LINE}
+# Class escapes that include the newline character
+_NEWLINE_CATEGORIES = {sre_constants.CATEGORY_SPACE, sre_constants.CATEGORY_NOT_DIGIT,
+                       sre_constants.CATEGORY_NOT_WORD, sre_constants.CATEGORY_LINEBREAK}
+# Line window of a search that is not limited to a time range, see MatchSet
+WHOLE_FILE = (1, None)
+
+
+def is_literal(pattern):
+    return not any(char in _REGEX_METACHARACTERS for char in pattern)
+
+
+def required_literal(pattern):
+    """
+    Returns the longest lower-cased ASCII literal that every match of
+    ``pattern`` contains (in any case), or None when there is no such
+    literal, e.g. for ``\\d+`` or an alternation.
+    """
+    # Parsed as case-insensitive so the literal holds for either search mode
+    query = required_literals(pattern, re.IGNORECASE)
+    if query is not None and query[0] == 'and':
+        literals = [term[1] for term in query[1] if term[0] == 'lit']
+        return max(literals, key=len).decode('ascii') if literals else None
+    if query is not None and query[0] == 'lit':
+        return query[1].decode('ascii')
+    return None
+
+
+def _bytes_safe(subpattern, repeated=False):
+    """
+    True when the parsed pattern, run over UTF-8 bytes, matches at least every
+    line it matches as text, whatever non-ASCII characters the line contains.
+    ``repeated`` is set for the single item of an unbounded repeat, where a
+    wildcard consuming the bytes of a character one by one does no harm.
+    """
+    c = sre_constants
+    for op, av in subpattern:
+        if op is c.LITERAL:
+            if av >= 0x80:
+                return False
+        elif op is c.NOT_LITERAL or op is c.ANY:
+            # One character can be several bytes
+            if not repeated or (op is c.NOT_LITERAL and av >= 0x80):
+                return False
+        elif op is c.IN:
+            negated = False
+            for item_op, item_av in av:
+                if item_op is c.NEGATE:
+                    negated = True
+                elif item_op is c.LITERAL:
+                    if item_av >= 0x80:
+                        return False
+                elif item_op is c.RANGE:
+                    if item_av[1] >= 0x80:
+                        return False
+                else:
+                    # \d, \w, \s ... also match non-ASCII characters
+                    return False
+            if negated and not repeated:
+                return False
+        elif op is c.AT:
+            if av not in _BYTES_SAFE_AT:
+                return False
+        elif op in (c.MAX_REPEAT, c.MIN_REPEAT, getattr(c, 'POSSESSIVE_REPEAT', None)):
+            _, max_count, item = av
+            if not _bytes_safe(item, max_count is c.MAXREPEAT and len(item) == 1):
+                return False
+        elif op is c.SUBPATTERN:
+            if not _bytes_safe(av[-1]):
+                return False
+        elif op is c.BRANCH:
+            if not all(_bytes_safe(branch) for branch in av[1]):
+                return False
+        elif op is getattr(c, 'ATOMIC_GROUP', None):
+            if not _bytes_safe(av):
+                return False
+        elif op is c.ASSERT:
+            if not _bytes_safe(av[1]):
+                return False
+        elif op is not c.GROUPREF:
+            # Negative lookarounds, conditionals, ...
+            return False
+    return True
+
+
+def _matches_line_end(subpattern, dotall=False):
+    """
+    True when the parsed pattern can match the newline that ends a line
+    (``\\n``, ``\\s``, ``[^x]`` ...) or anchors on the end of the text
+    (``$``). Run MULTILINE over a chunk of lines, such a pattern finds the
+    next line after a newline instead of the end of the line it would be
+    matched as: ``\\s+$`` matches every line alone, but only the last line
+    of a chunk.
+    """
+    c = sre_constants
+    for op, av in subpattern:
+        if op is c.LITERAL:
+            if av == 10:
+                return True
+        elif op is c.NOT_LITERAL:
+            if av != 10:
+                return True
+        elif op is c.ANY:
+            if dotall:
+                return True
+        elif op is c.IN:
+            negated = False
+            matched = False
+            for item_op, item_av in av:
+                if item_op is c.NEGATE:
+                    negated = True
+                elif item_op is c.LITERAL:
+                    matched = matched or item_av == 10
+                elif item_op is c.RANGE:
+                    matched = matched or item_av[0] <= 10 <= item_av[1]
+                elif item_op is c.CATEGORY:
+                    matched = matched or item_av in _NEWLINE_CATEGORIES
+            if matched != negated:
+                return True
+        elif op is c.AT:
+            if av in (c.AT_END, c.AT_END_LINE, c.AT_END_STRING):
+                return True
+        elif op in (c.MAX_REPEAT, c.MIN_REPEAT, getattr(c, 'POSSESSIVE_REPEAT', None)):
+            if _matches_line_end(av[2], dotall):
+                return True
+        elif op is c.SUBPATTERN:
+            # Scoped flags, (?s:...) or (?-s:...)
+            _, add_flags, del_flags, item = av
+            if _matches_line_end(item, bool((dotall or add_flags & re.DOTALL) and not del_flags & re.DOTALL)):
+                return True
+        elif op is c.BRANCH:
+            if any(_matches_line_end(branch, dotall) for branch in av[1]):
+                return True
+        elif op is getattr(c, 'ATOMIC_GROUP', None):
+            if _matches_line_end(av, dotall):
+                return True
+        elif op in (c.ASSERT, c.ASSERT_NOT):
+            if _matches_line_end(av[1], dotall):
+                return True
+        elif op is c.GROUPREF_EXISTS:
+            if any(item is not None and _matches_line_end(item, dotall) for item in av[1:]):
+                return True
+    return False
+
+
+class PatternMatcher:
+    """
+    Evaluates a whole set of search patterns against a line in one pass.
+
+    All patterns are combined into a single alternation. Lines the combined
+    expression rejects (the vast majority in a log) are discarded after a
+    single regex scan regardless of how many patterns are enabled. Only
+    lines that do match are checked against every pattern, so ``match_ids``
+    reports exactly the patterns that a separate ``search`` per pattern would.
+    The alternatives are wrapped in non-capturing groups: capturing groups
+    around them keep ``re`` from skipping ahead on the alternatives' first
+    characters, which made 100 patterns three orders of magnitude slower.
+
+    Pattern sets made only of literals (e.g. "Error", "Warning", "Info") are
+    confirmed with substring tests instead of regex searches. For other
+    sets, a pattern is only searched in lines that contain its required
+    literal (``required``, see ``required_literal``; computed when not
+    given), which with hundreds of patterns skips nearly all the searches.
+    """
+
+    def __init__(self, patterns, case_sensitive=False, required=None):
+        self.patterns = list(patterns)
+        self.case_sensitive = case_sensitive
+        flags = 0 if case_sensitive else re.IGNORECASE
+        self.compiled = [re.compile(pattern, flags) for pattern in self.patterns]
+
+        # Substring tests are only equivalent to IGNORECASE for ASCII
+        # patterns in ASCII lines
+        self.literal = bool(self.patterns) and all(is_literal(p) for p in self.patterns) and \
+            (case_sensitive or all(p.isascii() for p in self.patterns))
+        if self.literal:
+            self._needles = self.patterns if case_sensitive else [p.lower() for p in self.patterns]
+        elif len(self.patterns) > 1:
+            if required is None:
+                required = [required_literal(pattern) for pattern in self.patterns]
+            self._confirm = list(zip(required, self.compiled))
+
+        self.combined = None
+        if self.patterns and not any(_NUMBERED_BACKREFERENCE.search(p) for p in self.patterns):
+            try:
+                self.combined = re.compile(
+                    '|'.join(f"(?:{pattern})" for pattern in self.patterns),
+                    flags
+                )
+            except re.error:
+                # E.g. duplicate group names or inline flags in the middle of
+                # the alternation, fall back to one search per pattern
+                self.combined = None
+
+        # The combined expression over raw UTF-8 bytes, see bytes_prefilter.
+        # It runs MULTILINE over many lines, so patterns that depend on
+        # where the text they are matched against ends are left to the text
+        self.bytes_combined = None
+        if self.combined is not None and \
+                all(p.isascii() and '\\A' not in p and '\\Z' not in p for p in self.patterns):
+            parsed = [sre_parse.parse(p, flags) for p in self.patterns]
+            if not any(_matches_line_end(tree, bool(tree.state.flags & re.DOTALL)) for tree in parsed):
+                try:
+                    self.bytes_combined = re.compile(self.combined.pattern.encode('ascii'), flags | re.MULTILINE)
+                except re.error:
+                    # E.g. \u escapes, which bytes patterns do not support
+                    pass
+        if self.bytes_combined is not None:
+            self._bytes_safe = all(_bytes_safe(tree) for tree in parsed)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def match_ids(self, line):
+        """
+        Returns the indices (into ``patterns``) of every pattern found in
+        ``line``, in pattern order. An empty list means no pattern matched.
+        """
+        if self.combined is not None:
+            if self.combined.search(line) is None:
+                return []
+            if len(self.patterns) == 1:
+                return [0]
+            # IGNORECASE also matches non-ASCII letters such as 'ſ' or the
+            # Kelvin sign to ASCII ones, which lower() does not fold
+            if self.literal and (self.case_sensitive or line.isascii()):
+                haystack = line if self.case_sensitive else line.lower()
+                return [idx for idx, needle in enumerate(self._needles) if needle in haystack]
+        if len(self.patterns) > 1 and not self.literal:
+            lowered = line.lower()
+            return [
+                idx for idx, (needle, pattern) in enumerate(self._confirm)
+                if (needle is None or needle in lowered) and pattern.search(line)
+            ]
+        return [idx for idx, pattern in enumerate(self.compiled) if pattern.search(line)]
+
+    def bytes_prefilter(self, data):
+        """
+        Returns a compiled bytes expression that finds at least every line of
+        the UTF-8 ``data`` that ``match_ids`` would accept, or None when
+        ``data`` has to be decoded to be searched reliably. Lines it finds
+        still have to be confirmed with ``match_ids``.
+
+        ASCII data means the same as bytes and as text. Otherwise patterns
+        whose classes (``\\w``, ``.``, ``[^x]`` ...) depend on how many bytes
+        a character takes, and case-insensitive searches over the few
+        non-ASCII letters that fold to ASCII ones, need the text.
+        """
+        if self.bytes_combined is None:
+            return None
+        if not data.isascii():
+            if not self._bytes_safe:
+                return None
+            if not self.case_sensitive and _ASCII_CASE_FOLDS.search(data):
+                return None
+        return self.bytes_combined
+
+
+def window_contains(outer, inner):
+    """True when the line window ``outer`` includes all of ``inner``."""
+    return outer[0] <= inner[0] and (outer[1] is None or (inner[1] is not None and inner[1] <= outer[1]))
+
+
+def _narrows(pattern, previous, previous_case_sensitive):
+    # True when every line ``pattern`` matches is matched by ``previous``
+    if pattern == previous:
+        return True
+    if not (is_literal(pattern) and is_literal(previous)):
+        return False
+    if previous_case_sensitive:
+        return previous in pattern
+    # Lower-casing only agrees with IGNORECASE for ASCII text
+    return pattern.isascii() and previous.isascii() and previous.lower() in pattern.lower()
+
+
+class MatchSet:
+    """
+    The lines a finished search matched, with the patterns each line matched.
+
+    Stored column-wise in arrays, 12 bytes per matching line whatever its
+    length: the text is read back from the document when it is shown.
+
+    Kept so that later queries can be answered from it instead of rescanning
+    the whole file. ``last_line`` is the last line of the document the search
+    covered; lines appended after it still have to be scanned. ``window`` is
+    the ``(first_line, last_line)`` range the search was limited to, the last
+    line None for a window open towards the end of the file.
+
+    A search in record mode (see ``record_index``) sets ``records`` to the
+    RecordIndex it used; ``line_numbers`` then hold the first line of each
+    matching record and the text of a match is the whole record.
+    """
+
+    def __init__(self, patterns, case_sensitive, window=WHOLE_FILE, records=None):
+        self.patterns = tuple(patterns)
+        self.case_sensitive = case_sensitive
+        self.window = window
+        self.records = records
+        self.line_numbers = array('q')
+        # Per line, the index into ``pattern_sets`` of the patterns it matched
+        self.pattern_set_ids = array('i')
+        self.pattern_sets = []  # Distinct tuples of pattern ids
+        self.last_line = 0
+        self._set_ids = {}
+
+    def __len__(self):
+        # pattern_set_ids is appended last, so every row counted here is
+        # complete even while a worker thread is still adding rows
+        return len(self.pattern_set_ids)
+
+    @property
+    def key(self):
+        return (self.patterns, self.case_sensitive, self.window)
+
+    def _pattern_set_id(self, pattern_ids):
+        ids = tuple(pattern_ids)
+        set_id = self._set_ids.get(ids)
+        if set_id is None:
+            set_id = self._set_ids[ids] = len(self.pattern_sets)
+            self.pattern_sets.append(ids)
+        return set_id
+
+    def add_batch(self, batch):
+        """Adds the ``(line_number, line, pattern_ids)`` entries of a match batch."""
+        pattern_set_id = self._pattern_set_id
+        for line_number, _, pattern_ids in batch:
+            self.line_numbers.append(line_number)
+            self.pattern_set_ids.append(pattern_set_id(pattern_ids))
+
+    def location(self, row):
+        """Returns ``(file_path, line_number)`` of match ``row`` (0-based), None for the file of a single document."""
+        return None, self.line_numbers[row]
+
+    def first_pattern(self, row):
+        """Returns the id of the first pattern match ``row`` matched."""
+        return self.pattern_sets[self.pattern_set_ids[row]][0]
+
+    def read_lines(self, document, first, last):
+        """Returns the text of matches ``first``..``last`` (0-based, inclusive) read from ``document``."""
+        line_numbers = self.line_numbers[first:last + 1]
+        if self.records is not None:
+            records = self.records
+            line_count = document.line_count
+            return [
+                ''.join(document.get_lines(*records.span(records.record_of(line_number), line_count)))
+                for line_number in line_numbers
+            ]
+        get_line = document.get_line
+        return [get_line(line_number) for line_number in line_numbers]
+
+    def covers(self, patterns, case_sensitive, window=WHOLE_FILE):
+        """
+        True when a search for ``patterns`` can only match lines this set
+        matched, so it is enough to re-check those lines. That is the case
+        when each new pattern is one of the old ones, or a literal extending
+        an old literal (typing "Err" -> "Error"), and patterns were only
+        dropped, never added, within the same or a narrower line window.
+        """
+        if not patterns or (self.case_sensitive and not case_sensitive) or \
+                not window_contains(self.window, window) or self.records is not None:
+            return False
+        return all(
+            any(_narrows(pattern, previous, self.case_sensitive) for previous in self.patterns)
+            for pattern in patterns
+        )
+
+
+class MultiFileMatchSet(MatchSet):
+    """
+    A MatchSet of a search over many files. Every match also records its file
+    and the byte offset of its line, so the line can be shown without
+    indexing the file: 24 bytes per match.
+    """
+
+    def __init__(self, patterns, case_sensitive):
+        super().__init__(patterns, case_sensitive)
+        self.files = []
+        self.file_ids = array('i')
+        self.offsets = array('q')
+        self._file_ids = {}
+
+    def add(self, file_path, line_number, offset, pattern_ids):
+        file_id = self._file_ids.get(file_path)
+        if file_id is None:
+            file_id = self._file_ids[file_path] = len(self.files)
+            self.files.append(file_path)
+        self.file_ids.append(file_id)
+        self.line_numbers.append(line_number)
+        self.offsets.append(offset)
+        self.pattern_set_ids.append(self._pattern_set_id(pattern_ids))
+
+    def location(self, row):
+        return self.files[self.file_ids[row]], self.line_numbers[row]
+
+    def read_lines(self, document, first, last):
+        """
+        Returns the text of matches ``first``..``last`` (0-based, inclusive).
+        ``document`` is ignored: lines of plain files are read at their byte
+        offset, lines of compressed files through their (cached) LogDocument.
+        """
+        lines = []
+        handles = {}
+        try:
+            for row in range(first, min(last, len(self) - 1) + 1):
+                file_path, line_number = self.location(row)
+                try:
+                    if is_compressed(file_path):
+                        line = get_document(file_path).get_line(line_number)
+                    else:
+                        handle = handles.get(file_path)
+                        if handle is None:
+                            handle = handles[file_path] = open(file_path, 'rb')
+                        handle.seek(self.offsets[row])
+                        line = handle.readline().decode(DEFAULT_ENCODING, DEFAULT_ERRORS)
+                except DECOMPRESSION_ERRORS as e:
+                    # Moved or deleted since it was searched
+                    line = f"<{getattr(e, 'strerror', None) or e}>"
+                # Like LineIndex, present \r\n line endings as \n
+                lines.append(line.rstrip('\r\n') + '\n')
+        finally:
+            for handle in handles.values():
+                handle.close()
+        return lines
+
+
+class SearchCache:
+    """
+    LRU of the MatchSets of recent searches in one document.
+
+    Entries belong to a LogDocument object: a file that changed on disk is
+    reloaded as a new document, which empties the cache. Sets larger than
+    ``max_lines`` matches are not kept, neither are more than ``max_lines``
+    matches in total.
+    """
+
+    def __init__(self, max_entries=16, max_lines=4 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_lines = max_lines
+        self.document = None
+        self._sets = OrderedDict()  # {(patterns, case_sensitive, window): MatchSet}
+
+    def _use_document(self, document):
+        if document is not self.document:
+            self._sets.clear()
+            self.document = document
+
+    def get(self, document, patterns, case_sensitive, window=WHOLE_FILE):
+        """Returns the set of exactly this query, or None."""
+        self._use_document(document)
+        match_set = self._sets.get((tuple(patterns), case_sensitive, window))
+        if match_set is not None:
+            self._sets.move_to_end(match_set.key)
+        return match_set
+
+    def narrowest_cover(self, document, patterns, case_sensitive, window=WHOLE_FILE):
+        """Returns the smallest cached set that ``covers`` the query, or None."""
+        self._use_document(document)
+        candidates = [s for s in self._sets.values() if s.covers(patterns, case_sensitive, window)]
+        return min(candidates, key=len, default=None)
+
+    def put(self, document, match_set):
+        self._use_document(document)
+        if len(match_set) > self.max_lines:
+            return
+        self._sets[match_set.key] = match_set
+        self._sets.move_to_end(match_set.key)
+        while len(self._sets) > self.max_entries or \
+                sum(len(s) for s in self._sets.values()) > self.max_lines:
+            self._sets.popitem(last=False)
+
+    def clear(self):
+        self._sets.clear()
+
+
+def load_patterns(json_path):
+    """
+    Loads a pattern file in the ``example_pattern.json`` format:
+    ``{name: {"pattern": ..., "highlight_color": ...}}``.
+
+    Raises:
+        ValueError: If an entry has no "pattern".
+    """
+    with open(json_path, 'r') as json_file:
+        patterns = json.load(json_file)
+    check_patterns(patterns)
+    return patterns
+
+
+def check_patterns(patterns):
+    """Raises ValueError if an entry of a loaded pattern file has no "pattern"."""
+    for name, pattern_info in patterns.items():
+        if not isinstance(pattern_info, dict) or 'pattern' not in pattern_info:
+            raise ValueError(f"Pattern entry '{name}' has no 'pattern' field")
+
+
+def clip_ranges(ranges, window):
+    """Returns the parts of the ``(first_line, last_line)`` ``ranges`` inside the line ``window``."""
+    first_line, last_line = window
+    clipped = []
+    for first, last in ranges:
+        first = max(first, first_line)
+        if last_line is not None:
+            last = min(last, last_line)
+        if first <= last:
+            clipped.append((first, last))
+    return clipped
+
+
+def candidate_ranges(document, matcher, use_index=False, cancelled=None, window=WHOLE_FILE):
+    """
+    Returns the ``(first_line, last_line)`` ranges of ``document`` a search
+    with ``matcher`` has to scan: the lines of ``window`` (see
+    ``time_index.time_window``), or only the blocks of it the trigram index
+    cannot rule out. Returns None if ``cancelled()`` became true while the
+    index was being built.
+    """
+    whole_file = clip_ranges([(1, document.line_count)], window)
+    if not use_index or not whole_file:
+        return whole_file
+    index = get_trigram_index(document, cancelled=cancelled)
+    if index is None:
+        return None
+    flags = 0 if matcher.case_sensitive else re.IGNORECASE
+    ranges = index.candidate_ranges(matcher.patterns, document.line_count, flags)
+    return whole_file if ranges is None else clip_ranges(ranges, window)
+
+
+def _is_utf8(encoding):
+    try:
+        return codecs.lookup(encoding).name == 'utf-8'
+    except LookupError:
+        return False
+
+
+def _match_bytes(matcher, prefilter, data, first_line, encoding=DEFAULT_ENCODING, errors=DEFAULT_ERRORS):
+    """
+    Returns ``[(line_number, start, line, pattern_ids), ...]`` for the lines
+    of ``data`` (whole lines, the first one being ``first_line``) that match,
+    ``start`` being the line's position in ``data``. Only lines the bytes
+    ``prefilter`` hits are decoded and confirmed with ``match_ids``.
+    """
+    batch = []
+    match_ids = matcher.match_ids
+    search = prefilter.search
+    find = data.find
+    size = len(data)
+    line_number = first_line
+    counted = 0  # Newlines before this position are included in line_number
+    pos = 0
+    while pos < size:
+        match = search(data, pos)
+        if match is None or match.start() >= size:
+            break
+        start = data.rfind(b'\n', 0, match.start()) + 1
+        end = find(b'\n', match.start()) + 1 or size
+        line_number += data.count(b'\n', counted, start)
+        counted = start
+        line = data[start:end].decode(encoding, errors)
+        # Like LineIndex, present \r\n line endings as \n
+        if line.endswith('\r\n'):
+            line = line[:-2] + '\n'
+        pattern_ids = match_ids(line)
+        if pattern_ids:
+            batch.append((line_number, start, line, pattern_ids))
+        pos = end
+    return batch
+
+
+def iter_match_batches(document, matcher, ranges=None):
+    """
+    Scans ``ranges`` (default: the whole document) chunk by chunk, yielding
+    ``(lines_scanned, [(line_number, line, pattern_ids), ...])`` per chunk.
+
+    Uncompressed UTF-8 documents are searched as raw bytes wherever the
+    matcher allows it, decoding only the lines that match. Otherwise, and
+    for compressed documents whose decoded chunks are worth caching, every
+    line is decoded and matched as text.
+    """
+    match_ids = matcher.match_ids
+    if ranges is None:
+        ranges = [(1, document.line_count)]
+    encoding = document.index.encoding
+    errors = document.index.errors
+    raw = matcher.bytes_combined is not None and not document.compressed and _is_utf8(encoding)
+    for first_line, last_line in ranges:
+        for first, last in document.iter_chunk_bounds(first_line, last_line):
+            if raw:
+                data = document.read_bytes(document.line_span(first)[0], document.line_span(last)[1])
+                prefilter = matcher.bytes_prefilter(data)
+                if prefilter is not None:
+                    batch = _match_bytes(matcher, prefilter, data, first, encoding, errors)
+                    yield last - first + 1, [(line_number, line, ids) for line_number, _, line, ids in batch]
+                    continue
+            batch = []
+            lines = document.get_lines(first, last)
+            for line_number, line in enumerate(lines, start=first):
+                pattern_ids = match_ids(line)
+                if pattern_ids:
+                    batch.append((line_number, line, pattern_ids))
+            yield len(lines), batch
+
+
+def iter_record_match_batches(document, matcher, records, ranges=None):
+    """
+    Like ``iter_match_batches``, but matches whole records (see
+    ``record_index.RecordIndex``) instead of lines, so patterns can span
+    the lines of a record. Yields ``(lines_scanned, [(first_line, record,
+    pattern_ids), ...])``, ``record`` being the text of all its lines.
+    Records are searched when they start within ``ranges``.
+
+    Uncompressed UTF-8 documents are scanned as raw bytes like in line
+    mode, records being decoded only where the prefilter hits, so a search
+    costs about the same as one by lines.
+    """
+    match_ids = matcher.match_ids
+    if ranges is None:
+        ranges = [(1, document.line_count)]
+    encoding = document.index.encoding
+    errors = document.index.errors
+    raw = matcher.bytes_combined is not None and not document.compressed and _is_utf8(encoding)
+    starts = records.starts
+    line_count = document.line_count
+    offsets = document.index.offsets
+    for first_line, last_line in ranges:
+        record = records.record_of(first_line)
+        if starts[record] < first_line:
+            record += 1
+        end_record = records.record_of(last_line) + 1
+        while record < end_record:
+            # Records of about a chunk of lines at a time, at least one
+            group_end = min(max(bisect_right(starts, starts[record] + CHUNK_LINES - 1), record + 1), end_record)
+            group_starts = starts[record:group_end]
+            last = records.span(group_end - 1, line_count)[1]
+            lines_scanned = last - group_starts[0] + 1
+            record = group_end
+            batch = []
+            if raw:
+                base = offsets[group_starts[0] - 1]
+                data = document.read_bytes(base, document.line_span(last)[1])
+                prefilter = matcher.bytes_prefilter(data)
+                if prefilter is not None:
+                    record_offsets = [offsets[start - 1] - base for start in group_starts]
+                    search = prefilter.search
+                    size = len(data)
+                    pos = 0
+                    while pos < size:
+                        match = search(data, pos)
+                        if match is None or match.start() >= size:
+                            break
+                        i = bisect_right(record_offsets, match.start()) - 1
+                        pos = record_offsets[i + 1] if i + 1 < len(record_offsets) else size
+                        # Like LineIndex, present \r\n line endings as \n
+                        text = data[record_offsets[i]:pos].decode(encoding, errors).replace('\r\n', '\n')
+                        pattern_ids = match_ids(text)
+                        if pattern_ids:
+                            batch.append((group_starts[i], text, pattern_ids))
+                    yield lines_scanned, batch
+                    continue
+            lines = document.get_lines(group_starts[0], last)
+            bounds = [start - group_starts[0] for start in group_starts] + [len(lines)]
+            for i, start in enumerate(group_starts):
+                text = ''.join(lines[bounds[i]:bounds[i + 1]])
+                pattern_ids = match_ids(text)
+                if pattern_ids:
+                    batch.append((start, text, pattern_ids))
+            yield lines_scanned, batch
+
+
+def iter_line_match_batches(document, matcher, line_numbers, batch_lines=CHUNK_LINES):
+    """
+    Like ``iter_match_batches``, but checks only the given ascending
+    ``line_numbers``, e.g. the matches of a broader earlier search.
+    """
+    match_ids = matcher.match_ids
+    get_line = document.get_line
+    for position in range(0, len(line_numbers), batch_lines):
+        numbers = line_numbers[position:position + batch_lines]
+        batch = []
+        for line_number in numbers:
+            line = get_line(line_number)
+            pattern_ids = match_ids(line)
+            if pattern_ids:
+                batch.append((line_number, line, pattern_ids))
+        yield len(numbers), batch
+
+
+def iter_match_set_batches(document, match_set, batch_lines=CHUNK_LINES):
+    """Replays a MatchSet as match batches, reading the lines from ``document``."""
+    get_line = document.get_line
+    pattern_sets = match_set.pattern_sets
+    for position in range(0, len(match_set), batch_lines):
+        numbers = match_set.line_numbers[position:position + batch_lines]
+        set_ids = match_set.pattern_set_ids[position:position + batch_lines]
+        yield len(numbers), [
+            (line_number, get_line(line_number), list(pattern_sets[set_id]))
+            for line_number, set_id in zip(numbers, set_ids)
+        ]
+
+
+def iter_stream_match_batches(blocks, matcher, offset=0):
+    """
+    Like ``iter_match_batches`` for bytes read once from front to back rather
+    than through a LogDocument, e.g. a compressed log while it is being
+    decompressed. ``blocks`` yields consecutive pieces of the data, the first
+    one starting at byte ``offset``. Yields ``(lines_scanned, [(line_number,
+    byte_offset, line, pattern_ids), ...])`` per block, counting lines from 1.
+    """
+    match_ids = matcher.match_ids
+    line_number = 0
+    carry = b''
+    for block in blocks:
+        data = carry + block
+        cut = data.rfind(b'\n') + 1
+        carry = data[cut:]
+        if not cut:
+            continue
+        complete = data[:cut]
+        prefilter = matcher.bytes_prefilter(complete)
+        if prefilter is not None:
+            batch = _match_bytes(matcher, prefilter, complete, line_number + 1)
+            lines_scanned = complete.count(b'\n')
+            yield lines_scanned, [(number, offset + start, line, ids) for number, start, line, ids in batch]
+            line_number += lines_scanned
+            offset += cut
+            continue
+        # A newline byte always decodes to a newline, the byte and text
+        # splits therefore line up
+        raw_lines = complete.split(b'\n')
+        raw_lines.pop()
+        lines = complete.decode(DEFAULT_ENCODING, DEFAULT_ERRORS).split('\n')
+        batch = []
+        for raw_line, line in zip(raw_lines, lines):
+            line_number += 1
+            # Like LineIndex, present \r\n line endings as \n
+            line = (line[:-1] if line.endswith('\r') else line) + '\n'
+            pattern_ids = match_ids(line)
+            if pattern_ids:
+                batch.append((line_number, offset, line, pattern_ids))
+            offset += len(raw_line) + 1
+        yield len(raw_lines), batch
+    if carry:
+        # Last line without a trailing newline
+        line = carry.decode(DEFAULT_ENCODING, DEFAULT_ERRORS)
+        pattern_ids = match_ids(line)
+        yield 1, [(line_number + 1, offset, line, pattern_ids)] if pattern_ids else []
+
+
+def iter_matches(document, matcher, ranges=None):
+    """Yields ``(line_number, byte_offset, pattern_ids)`` for every matching line."""
+    offsets = document.index.offsets
+    for _, batch in iter_match_batches(document, matcher, ranges):
+        for line_number, _, pattern_ids in batch:
+            yield line_number, offsets[line_number - 1], pattern_ids
+
+
+def lines_by_pattern(document, matcher, first_line=1, last_line=None):
+    """Returns, for each pattern of ``matcher``, the ascending list of lines it matches."""
+    last_line = document.line_count if last_line is None else last_line
+    lines_per_pattern = [[] for _ in matcher.patterns]
+    for _, batch in iter_match_batches(document, matcher, [(first_line, last_line)]):
+        for line_number, _, pattern_ids in batch:
+            for pid in pattern_ids:
+                lines_per_pattern[pid].append(line_number)
+    return lines_per_pattern
+
+
+def search_file(file_path, patterns, case_sensitive=False, use_index=False):
+    """
+    Convenience generator over ``iter_matches`` for a file path and a list of
+    pattern strings, e.g.::
+
+        for line_number, offset, pattern_ids in search_file('app.log', ['Error', 'Warning']):
+            ...
+    """
+    document = get_document(file_path)
+    matcher = PatternMatcher(patterns, case_sensitive)
+    if not len(matcher):
+        return
+    yield from iter_matches(document, matcher, candidate_ranges(document, matcher, use_index))
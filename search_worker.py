@@ -0,0 +1,261 @@
+import itertools
+import queue
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import nullcontext
+
+from instrumentation import metrics
+from multi_search import search_paths
+from result_export import export_matches
+from search_engine import (
+    WHOLE_FILE, MatchSet, MultiFileMatchSet, candidate_ranges, clip_ranges, iter_line_match_batches, iter_match_batches,
+    iter_match_set_batches, iter_record_match_batches
+)
+from record_index import get_record_index
+
+# Matches posted per queue message by MultiSearchJob
+_BATCH_SIZE = 500
+
+
+class SearchJob:
+    """
+    Scans a LogDocument with a PatternMatcher in a background thread.
+
+    Results are streamed back through ``self.queue`` as tuples so the Tk main
+    thread can drain them with ``root.after`` without ever blocking:
+
+        ('matches', [(line_number, line, pattern_ids), ...])
+        ('status', message)
+        ('progress', lines_scanned, total_lines)
+        ('done', match_count)
+        ('error', exception)
+
+    ``cancel()`` stops the scan at the next chunk boundary. A cancelled job
+    posts nothing further, so a superseded search never leaks stale results.
+
+    With ``use_index`` the job first loads (or builds) the document's trigram
+    index and scans only the line ranges that can contain a match.
+
+    ``previous`` is a MatchSet of an earlier search of the same document that
+    covers this query (see ``MatchSet.covers``). Only its lines and the lines
+    appended since are checked, and a set of the very same query is replayed
+    without matching at all.
+
+    ``results`` is the MatchSet the job fills as it goes: every match posted
+    in a 'matches' message is already in it, so the Tk thread can show rows
+    from it while the scan is still running. Once done it is also published
+    as ``match_set``, which a cancelled or failed job never sets.
+
+    ``window`` limits the search to a ``(first_line, last_line)`` range, e.g.
+    the lines of a time range (see ``time_index.time_window``).
+
+    ``profile`` is an optional ``instrumentation.ProfileCapture`` entered in
+    the worker thread around the whole search.
+
+    With ``record_start`` (a regex, see ``record_index``) whole records are
+    matched instead of lines and posted as ``(first_line, record,
+    pattern_ids)``. The record index is built (or extended) first; the
+    trigram index and ``previous`` are not used in record mode.
+    """
+
+    multi_file = False
+
+    def __init__(self, document, matcher, use_index=False, previous=None, window=WHOLE_FILE, profile=None,
+                 record_start=None):
+        self.document = document
+        self.matcher = matcher
+        self.use_index = use_index
+        self.previous = previous
+        self.window = window
+        self.profile = profile
+        self.record_start = record_start
+        self.results = MatchSet(matcher.patterns, matcher.case_sensitive, window)
+        self.match_set = None
+        self.queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _batches(self, last_line):
+        # Returns (lines_to_scan, batch iterator) for lines 1..last_line
+        previous = self.previous
+        if self.record_start is not None:
+            self.queue.put(('status', "indexing records"))
+            records = get_record_index(self.document, self.record_start, self._cancelled.is_set)
+            if records is None:
+                return 0, None
+            self.results.records = records
+            ranges = clip_ranges([(1, last_line)], self.window)
+            return sum(last - first + 1 for first, last in ranges), \
+                iter_record_match_batches(self.document, self.matcher, records, ranges)
+        if previous is None:
+            if self.use_index:
+                self.queue.put(('status', "loading trigram index"))
+            ranges = candidate_ranges(
+                self.document, self.matcher, self.use_index, self._cancelled.is_set, self.window
+            )
+            if ranges is None:
+                return 0, None
+            # Chunks come from the document's decoded-line cache when warm
+            return sum(last - first + 1 for first, last in ranges), \
+                iter_match_batches(self.document, self.matcher, ranges)
+
+        if previous.key == (tuple(self.matcher.patterns), self.matcher.case_sensitive, self.window):
+            batches = iter_match_set_batches(self.document, previous)
+            total = len(previous)
+        else:
+            # Only the earlier matches inside this (possibly narrower) window
+            first_line, window_last = self.window
+            line_numbers = previous.line_numbers
+            line_numbers = line_numbers[
+                bisect_left(line_numbers, first_line):
+                len(line_numbers) if window_last is None else bisect_right(line_numbers, window_last)
+            ]
+            batches = iter_line_match_batches(self.document, self.matcher, line_numbers)
+            total = len(line_numbers)
+        # Lines appended since the previous search was run
+        tail = clip_ranges([(previous.last_line + 1, last_line)], self.window)
+        if tail:
+            batches = itertools.chain(batches, iter_match_batches(self.document, self.matcher, tail))
+            total += tail[0][1] - tail[0][0] + 1
+        return total, batches
+
+    def _run(self):
+        with self.profile or nullcontext(), metrics.stage('scan'):
+            self._search()
+
+    def _search(self):
+        match_count = 0
+        scanned = 0
+        try:
+            last_line = self.document.line_count
+            match_set = self.results
+            total, batches = self._batches(last_line)
+            if batches is None:
+                return
+            for lines_scanned, batch in batches:
+                if self._cancelled.is_set():
+                    return
+                if batch:
+                    match_count += len(batch)
+                    match_set.add_batch(batch)
+                    self.queue.put(('matches', batch))
+                scanned += lines_scanned
+                self.queue.put(('progress', scanned, total))
+            if not self._cancelled.is_set():
+                match_set.last_line = last_line
+                self.match_set = match_set
+                self.queue.put(('done', match_count))
+        except Exception as e:
+            # Only report errors for searches that are still wanted
+            if not self._cancelled.is_set():
+                self.queue.put(('error', e))
+        finally:
+            metrics.add('lines_scanned', scanned)
+            metrics.add('matches', match_count)
+
+
+
+class MultiSearchJob(SearchJob):
+    """
+    Searches many files (directories and globs expanded) on a process pool,
+    from a background thread, with the same queue protocol as SearchJob.
+    ``results`` is a MultiFileMatchSet holding the file of every match.
+    Files arrive in sorted order and matches in line order within each file.
+    """
+
+    multi_file = True
+
+    def __init__(self, targets, matcher, mp_context=None):
+        super().__init__(None, matcher)
+        self.targets = targets
+        self.mp_context = mp_context
+        self.results = MultiFileMatchSet(matcher.patterns, matcher.case_sensitive)
+
+    def _search(self):
+        match_count = 0
+        batch = []
+        add = self.results.add
+        try:
+            results = search_paths(
+                self.targets, self.matcher.patterns, self.matcher.case_sensitive,
+                mp_context=self.mp_context, cancelled=self._cancelled.is_set,
+                progress=lambda done, total: self.queue.put(('progress', done, total))
+            )
+            for file_path, line_number, offset, line, pattern_ids in results:
+                add(file_path, line_number, offset, pattern_ids)
+                batch.append((line_number, line, pattern_ids))
+                match_count += 1
+                if len(batch) >= _BATCH_SIZE:
+                    self.queue.put(('matches', batch))
+                    batch = []
+            if batch:
+                self.queue.put(('matches', batch))
+            if not self._cancelled.is_set():
+                self.queue.put(('done', match_count))
+        except Exception as e:
+            if not self._cancelled.is_set():
+                self.queue.put(('error', e))
+        finally:
+            metrics.add('matches', match_count)
+
+
+class ExportJob:
+    """
+    Writes the matches of a MatchSet to a file in a background thread (see
+    ``result_export.export_matches``), posting
+
+        ('progress', matches_written, total_matches)
+        ('done', matches_written)
+        ('error', exception)
+
+    to ``self.queue``. ``cancel()`` stops it after the current block.
+    """
+
+    def __init__(self, match_set, out_path, fmt='text', document=None, context=0, pattern_names=None):
+        self.match_set = match_set
+        self.out_path = out_path
+        self.fmt = fmt
+        self.document = document
+        self.context = context
+        self.pattern_names = pattern_names
+        self.queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            with metrics.stage('export'):
+                written = export_matches(
+                    self.match_set, self.out_path, self.fmt, self.document, self.context, self.pattern_names,
+                    progress=lambda done, total: self.queue.put(('progress', done, total)),
+                    cancelled=self._cancelled.is_set
+                )
+            metrics.add('exported_matches', written)
+            if not self._cancelled.is_set():
+                self.queue.put(('done', written))
+        except Exception as e:
+            self.queue.put(('error', e))
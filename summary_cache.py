@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+# Bump whenever the stored data or the parsing it caches changes
+CACHE_VERSION = 2
+# Layout of the table, older tables are dropped and created again
+_SCHEMA_VERSION = 2
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'log-file-search', 'summaries.sqlite')
+# Bytes read per step when a file's content is hashed
+_HASH_BLOCK = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    path TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    content_hash TEXT,
+    tests TEXT NOT NULL,
+    PRIMARY KEY (path, config_hash)
+);
+CREATE INDEX IF NOT EXISTS summaries_by_file ON summaries (device, inode, size, mtime_ns, config_hash);
+CREATE INDEX IF NOT EXISTS summaries_by_content ON summaries (content_hash, config_hash);
+"""
+
+
+def config_hash(config):
+    """Hash of a parsing configuration, results parsed with another one are not reused."""
+    data = json.dumps({'version': CACHE_VERSION, 'config': config}, sort_keys=True)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def content_hash(file_path):
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class SummaryCache:
+    """
+    SQLite store of the parsed summary sections of test log files, so
+    files unchanged since an earlier run (yesterday's "current" tree is
+    today's "previous" one) are not parsed again.
+
+    Entries are keyed by the absolute path and the hash of the parsing
+    configuration, and used while the file's size, mtime, device and inode
+    are unchanged. A file found under another path with the same device,
+    inode, size and mtime was renamed or moved (``mv current previous``) and is reused
+    too. With ``use_content_hash`` files that fail both checks are hashed
+    and matched by content, which also recognises copied trees, at the
+    cost of reading every such file; content hashes are only recorded by
+    runs that use them.
+
+    Summaries are stored as ``(test_no, result)`` pairs and returned as the
+    list of dicts ``_parse_summary_section`` returns.
+    """
+
+    def __init__(self, config, cache_path=None, use_content_hash=False):
+        self.test_no_header = config['test_no_header']
+        self.test_result_header = config['test_result_header']
+        self.config_hash = config_hash(config)
+        self.use_content_hash = use_content_hash
+        self.hits = 0
+        self.misses = 0
+        self._keys = {}  # {abs_path: (size, mtime_ns, device, inode, content_hash)} of the files looked up
+        self._recognised = []  # (abs_path, summary_data) found by content, to be recorded under their path
+        cache_path = cache_path or DEFAULT_CACHE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._db = sqlite3.connect(cache_path)
+        try:
+            if self._db.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS summaries")
+                self._db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._db.executescript(_SCHEMA)
+        except sqlite3.Error:
+            self._db.close()
+            raise
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _summary(self, tests):
+        return [{self.test_no_header: test_no, self.test_result_header: result} for test_no, result in json.loads(tests)]
+
+    def get(self, file_path):
+        """Returns the cached summary data of ``file_path``, or None when it has to be parsed."""
+        abs_path = os.path.abspath(file_path)
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            self.misses += 1
+            return None
+        row = self._db.execute(
+            "SELECT size, mtime_ns, device, inode, tests FROM summaries WHERE path = ? AND config_hash = ?",
+            (abs_path, self.config_hash)
+        ).fetchone()
+        if row is not None and tuple(row[:4]) == (st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino):
+            self.hits += 1
+            return self._summary(row[4])
+
+        # Inode numbers are only unique on one device
+        row = self._db.execute(
+            "SELECT tests FROM summaries WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ? "
+            "AND config_hash = ? LIMIT 1",
+            (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, self.config_hash)
+        ).fetchone()
+        file_hash = None
+        if row is None and self.use_content_hash:
+            try:
+                file_hash = content_hash(abs_path)
+            except OSError:
+                self.misses += 1
+                return None
+            row = self._db.execute(
+                "SELECT tests FROM summaries WHERE content_hash = ? AND config_hash = ? LIMIT 1",
+                (file_hash, self.config_hash)
+            ).fetchone()
+        if row is not None:
+            self.hits += 1
+            # Recorded under this path too by the next put_many, so the next
+            # run finds it by path
+            self._keys[abs_path] = (st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino, file_hash)
+            summary_data = self._summary(row[0])
+            self._recognised.append((abs_path, summary_data))
+            return summary_data
+        self.misses += 1
+        self._keys[abs_path] = (st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino, file_hash)
+        return None
+
+    def put_many(self, items):
+        """
+        Stores the summary data parsed from the files of ``[(file_path,
+        summary_data), ...]``, in one transaction. Entries are recorded with
+        the file state seen by ``get``, so a file changed while it was parsed
+        is parsed again next time; files ``get`` could not stat are skipped.
+        """
+        items = self._recognised + list(items)
+        self._recognised = []
+        rows = []
+        for file_path, summary_data in items:
+            key = self._keys.pop(os.path.abspath(file_path), None)
+            if key is None:
+                continue
+            tests = json.dumps([[item[self.test_no_header], item[self.test_result_header]] for item in summary_data])
+            rows.append((os.path.abspath(file_path), self.config_hash) + key + (tests,))
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO summaries (path, config_hash, size, mtime_ns, device, inode, content_hash, tests) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
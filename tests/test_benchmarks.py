@@ -0,0 +1,37 @@
+import filecmp
+import os
+
+from benchmarks.generate import benchmark_patterns, generate_log, generate_summary_trees
+from log_document import get_document
+from search_engine import PatternMatcher, iter_match_batches
+from TestLogParser import _parse_summary_section
+
+CONFIG = {'summary_section_start': "Test Result Summary", 'test_no_header': "Test_ID", 'test_result_header': "Test_Result"}
+
+
+def test_generated_log_is_deterministic(tmp_path):
+    paths = [str(tmp_path / f"{name}.log") for name in ("a", "b", "c")]
+    stats = [generate_log(paths[0], 0.5), generate_log(paths[1], 0.5), generate_log(paths[2], 0.5, seed=1)]
+    assert stats[0] == stats[1]
+    assert filecmp.cmp(paths[0], paths[1], shallow=False)
+    assert not filecmp.cmp(paths[0], paths[2], shallow=False)
+    assert stats[0]['bytes'] == os.path.getsize(paths[0]) >= 0.5 * 1024 * 1024
+
+
+def test_generated_matches_are_found(tmp_path):
+    path = str(tmp_path / "app.log")
+    stats = generate_log(path, 1, match_density=0.01, pattern_count=5, distribution='uniform')
+    document = get_document(path)
+    assert document.line_count == stats['lines']
+    matcher = PatternMatcher(benchmark_patterns(5), case_sensitive=True)
+    assert sum(len(batch) for _, batch in iter_match_batches(document, matcher)) == stats['matches'] > 0
+
+
+def test_generated_summary_trees_parse(tmp_path):
+    previous_dir, current_dir = generate_summary_trees(str(tmp_path), files=20, tests_per_file=10, filler_lines=50)
+    for directory in (previous_dir, current_dir):
+        paths = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+        assert paths
+        for path in paths:
+            summary = _parse_summary_section(path, CONFIG)
+            assert summary and all(item['Test_Result'] in ('PASS', 'FAIL', 'SKIP') for item in summary)
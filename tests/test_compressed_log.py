@@ -0,0 +1,144 @@
+import bz2
+import gzip
+import lzma
+import random
+import threading
+
+import pytest
+
+import compressed_log
+from compressed_log import DECOMPRESSION_ERRORS, CompressedLineIndex, iter_decompressed
+from line_index import LineIndex
+from log_document import get_document
+from search_engine import PatternMatcher, iter_match_batches
+
+COMPRESSORS = {'.gz': gzip.compress, '.bz2': bz2.compress, '.xz': lzma.compress}
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # Line indexes are written below the test directory, not the home directory
+    directory = str(tmp_path / "compressed")
+    monkeypatch.setattr(compressed_log, 'DEFAULT_CACHE_DIR', directory)
+    return directory
+
+
+def _log_data(lines=20000):
+    rng = random.Random(7)
+    return "".join(
+        f"2024-03-01 10:00:{number % 60:02d} {rng.choice(['INFO', 'ERROR', 'DEBUG'])} "
+        f"{'x' * rng.randrange(80)} é\n"
+        for number in range(lines)
+    ).encode('utf-8')
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def _assert_same_lines(index, plain):
+    assert (index.size, index.line_count) == (plain.size, plain.line_count)
+    assert list(index.offsets) == list(plain.offsets)
+    assert index.get_lines(1, index.line_count) == plain.get_lines(1, plain.line_count)
+    # Jumping backwards and forwards, like the viewer does
+    rng = random.Random(3)
+    for _ in range(30):
+        first = rng.randrange(1, plain.line_count + 1)
+        last = min(first + rng.randrange(50), plain.line_count)
+        assert index.get_lines(first, last) == plain.get_lines(first, last)
+
+
+@pytest.mark.parametrize('suffix', sorted(COMPRESSORS))
+def test_lines_equal_the_uncompressed_file(tmp_path, suffix):
+    data = _log_data()
+    plain = LineIndex(_write(tmp_path / "app.log", data))
+    index = CompressedLineIndex(_write(tmp_path / f"app.log{suffix}", COMPRESSORS[suffix](data)))
+    _assert_same_lines(index, plain)
+    assert b"".join(iter_decompressed(index.file_path)) == data
+    index.close()
+    plain.close()
+
+
+@pytest.mark.parametrize('suffix', sorted(COMPRESSORS))
+def test_concatenated_members_are_read_as_one(tmp_path, suffix, monkeypatch):
+    # Member starts are kept as access points once they are far enough apart
+    monkeypatch.setattr(compressed_log, 'CHECKPOINT_SPAN', 64 * 1024)
+    data = _log_data()
+    parts = [data[:len(data) // 3], data[len(data) // 3:]]
+    compressed = b"".join(COMPRESSORS[suffix](part) for part in parts)
+    plain = LineIndex(_write(tmp_path / "app.log", data))
+    index = CompressedLineIndex(_write(tmp_path / f"app.log{suffix}", compressed))
+    _assert_same_lines(index, plain)
+    index.close()
+    # Reopened from the saved line index, member starts included
+    reopened = CompressedLineIndex(index.file_path)
+    members = [checkpoint[:2] for checkpoint in reopened._checkpoints]
+    assert members == [(0, 0), (len(parts[0]), len(COMPRESSORS[suffix](parts[0])))]
+    _assert_same_lines(reopened, plain)
+    reopened.close()
+    plain.close()
+
+
+def test_gzip_access_points(tmp_path, monkeypatch):
+    # Small spans give a gzip file of a few hundred KB many access points
+    monkeypatch.setattr(compressed_log, 'CHECKPOINT_SPAN', 64 * 1024)
+    monkeypatch.setattr(compressed_log, '_READ_BYTES', 4096)
+    data = _log_data()
+    plain = LineIndex(_write(tmp_path / "app.log", data))
+    index = CompressedLineIndex(_write(tmp_path / "app.log.gz", gzip.compress(data)))
+    assert len(index._checkpoints) > 10
+    _assert_same_lines(index, plain)
+    index.close()
+    plain.close()
+
+
+def test_saved_index_is_reused(tmp_path, monkeypatch):
+    path = _write(tmp_path / "app.log.gz", gzip.compress(_log_data(100)))
+    CompressedLineIndex(path).close()
+
+    def fail(self):
+        raise AssertionError("indexed again")
+
+    monkeypatch.setattr(CompressedLineIndex, '_build', fail)
+    index = CompressedLineIndex(path)
+    assert index.line_count == 100
+    index.close()
+
+
+def test_search_equals_the_uncompressed_file(tmp_path):
+    data = _log_data()
+    matcher = PatternMatcher(['error', r'x{70}'])
+    results = []
+    for path in (_write(tmp_path / "app.log", data), _write(tmp_path / "app.log.xz", lzma.compress(data))):
+        document = get_document(path)
+        results.append([match for _, batch in iter_match_batches(document, matcher) for match in batch])
+    assert results[0] and results[0] == results[1]
+
+
+def test_corrupt_file_raises(tmp_path):
+    path = _write(tmp_path / "app.log.gz", gzip.compress(_log_data(100))[:20] + b"garbage" * 100)
+    with pytest.raises(DECOMPRESSION_ERRORS):
+        CompressedLineIndex(path)
+
+
+def test_close_closes_thread_streams(tmp_path):
+    path = str(tmp_path / "test.log.gz")
+    with gzip.open(path, 'wt') as f:
+        f.writelines(f"line {number}\n" for number in range(1, 1001))
+    index = CompressedLineIndex(path, cache_dir=str(tmp_path))
+    streams = []
+
+    def read():
+        assert index.read_bytes(0, 7) == b"line 1\n"
+        streams.append(index._local.stream)
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+    stream = streams[0]
+    assert not stream._file.closed
+    index.close()
+    assert stream._file.closed
+    assert index.read_bytes(0, 7) == b''
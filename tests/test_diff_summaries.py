@@ -0,0 +1,66 @@
+import os
+
+from TestLogParser import _diff_summaries
+
+CONFIG = {'summary_section_start': "Test Result Summary", 'test_no_header': "Test_ID", 'test_result_header': "Test_Result"}
+
+
+def _summary(*tests):
+    return [{'Test_ID': test_no, 'Test_Result': result} for test_no, result in tests]
+
+
+def _naive_diff(relative_paths, prev_files, current_files, summaries):
+    # One dict per test of each file, labelled one test at a time
+    rows = []
+    for relative_path in relative_paths:
+        prev_path, curr_path = prev_files.get(relative_path), current_files.get(relative_path)
+        prev_map = {item['Test_ID']: item['Test_Result'] for item in summaries[prev_path]} if prev_path else {}
+        curr_map = {item['Test_ID']: item['Test_Result'] for item in summaries[curr_path]} if curr_path else {}
+        location = [os.path.dirname(relative_path), os.path.basename(relative_path)]
+        test_nos = sorted(set(prev_map) | set(curr_map))
+        if not test_nos:
+            kind = "New File" if not prev_path else "Removed File" if not curr_path else None
+            diff = f"{kind} (No Summary Data)" if kind else "Common File (No Summary Data in Either)"
+            rows.append(location + ["", "", "", diff])
+        for test_no in test_nos:
+            prev, curr = prev_map.get(test_no, ""), curr_map.get(test_no, "")
+            if not prev_path:
+                diff = "New File / New Test" if curr else "New File (Empty Test Result)"
+            elif not curr_path:
+                diff = "Removed File / Removed Test" if prev else "Removed File (Empty Test Result)"
+            elif prev and curr:
+                diff = "No Change" if prev == curr else f"Changed: {prev} -> {curr}"
+            else:
+                diff = "New Test" if curr else "Removed Test" if prev else "N/A (Both Empty)"
+            rows.append(location + [test_no, prev, curr, diff])
+    return rows
+
+
+def test_diff_equals_the_test_by_test_comparison():
+    prev_summaries = {
+        "common.log": _summary(("T1", "PASS"), ("T2", "PASS"), ("T3", "FAIL"), ("T4", "PASS"), ("T6", "")),
+        "a/dupes.log": _summary(("T1", "FAIL"), ("T1", "PASS"), ("T2", "SKIP")),
+        "a/removed.log": _summary(("T1", "PASS"), ("T2", "")),
+        "a/removed_empty.log": [],
+        "b/both_empty.log": [],
+        "b/one_sided.log": _summary(("X9", "PASS")),
+    }
+    curr_summaries = {
+        "common.log": _summary(("T1", "PASS"), ("T2", "FAIL"), ("T3", "PASS"), ("T5", "PASS"), ("T6", "")),
+        "a/dupes.log": _summary(("T2", "SKIP"), ("T1", "ERROR"), ("T1", "PASS")),
+        "b/both_empty.log": [],
+        "b/new.log": _summary(("T10", "PASS"), ("T9", "")),
+        "b/new_empty.log": [],
+        "b/one_sided.log": [],
+    }
+    prev_files = {relative_path: f"/prev/{relative_path}" for relative_path in prev_summaries}
+    current_files = {relative_path: f"/curr/{relative_path}" for relative_path in curr_summaries}
+    summaries = {prev_files[path]: data for path, data in prev_summaries.items()}
+    summaries.update((current_files[path], data) for path, data in curr_summaries.items())
+    relative_paths = sorted(set(prev_files) | set(current_files))
+
+    df = _diff_summaries(relative_paths, prev_files, current_files, summaries, CONFIG)
+    assert list(df.columns) == ["Path", "File", "Test_ID", "Previous Result", "Current Result", "Diff"]
+    assert all(str(dtype) == 'category' for dtype in df.dtypes)
+    assert df.astype(str).values.tolist() == _naive_diff(relative_paths, prev_files, current_files, summaries)
+    assert "Changed: PASS -> FAIL" in set(df["Diff"])
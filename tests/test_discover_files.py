@@ -0,0 +1,48 @@
+import os
+
+from TestLogParser import discover_files
+
+
+def _make_tree(root, paths):
+    for relative_path in paths:
+        path = os.path.join(root, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write("log\n")
+
+
+def _walk(root):
+    # {relative_path: abs_path} of every non-dot file, the way os.walk lists them
+    found = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if not name.startswith('.'):
+                path = os.path.join(directory, name)
+                found[os.path.relpath(path, root)] = path
+    return found
+
+
+TREE = [
+    "run.log", ".hidden.log", "notes.txt",
+    "module_A/a1.log", "module_A/deep/a2.log", "module_A/.cache/x.log",
+    "module_B/b1.log", "module_B/b1.log.bak", "tmp/scratch.log",
+]
+
+
+def test_same_files_as_os_walk(tmp_path):
+    previous, current = str(tmp_path / "previous"), str(tmp_path / "current")
+    _make_tree(previous, TREE)
+    _make_tree(current, TREE[:4])
+    assert discover_files([previous, current], max_workers=4) == [_walk(previous), _walk(current)]
+
+
+def test_include_exclude_and_prune(tmp_path):
+    root = str(tmp_path)
+    _make_tree(root, TREE)
+    found, = discover_files([root], include=["*.log"], exclude=["module_A/deep/*"], prune=["tmp", ".cache"])
+    assert sorted(found) == [os.path.join(*path.split('/')) for path in ["module_A/a1.log", "module_B/b1.log", "run.log"]]
+    assert found["run.log"] == os.path.join(root, "run.log")
+
+
+def test_missing_root(tmp_path):
+    assert discover_files([str(tmp_path / "missing")]) == [{}]
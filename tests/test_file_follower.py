@@ -0,0 +1,70 @@
+import os
+
+from file_follower import FileWatcher, LogFollower
+from log_document import get_document
+from search_engine import PatternMatcher, iter_match_batches
+
+
+def _append(path, data):
+    with open(path, 'a') as f:
+        f.write(data)
+
+
+def test_appended_lines_are_reported_once_complete(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("one\ntwo\n")
+    document = get_document(path)
+    follower = LogFollower(document)
+    assert follower.poll() is None
+    _append(path, "three\nfo")
+    assert follower.poll() == ('append', 3, 3)
+    _append(path, "ur\nfive\n")
+    assert follower.poll() == ('append', 4, 5)
+    assert document.get_lines(1, 5) == ["one\n", "two\n", "three\n", "four\n", "five\n"]
+    assert follower.poll() is None
+    follower.close()
+
+
+def test_appended_lines_are_searched_alone(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("ERROR old\nok\n")
+    document = get_document(path)
+    follower = LogFollower(document)
+    _append(path, "ok\nERROR new\n")
+    _, first, last = follower.poll()
+    batches = iter_match_batches(document, PatternMatcher(['error']), [(first, last)])
+    assert [match for _, batch in batches for match in batch] == [(4, "ERROR new\n", [0])]
+    follower.close()
+
+
+def test_truncation_and_rotation_are_reported(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("one\ntwo\n")
+    follower = LogFollower(get_document(path))
+    with open(path, 'r+') as f:
+        f.truncate(4)
+    assert follower.poll() == ('truncated', None, None)
+    follower.close()
+
+    follower = LogFollower(get_document(path))
+    with open(path + ".new", 'w') as f:
+        f.write("new\n")
+    os.replace(path + ".new", path)
+    assert follower.poll() == ('rotated', None, None)
+    follower.close()
+
+
+def test_watcher_reports_changes(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("one\n")
+    watcher = FileWatcher(path)
+    _append(path, "two\n")
+    assert watcher.pending()
+    if watcher.uses_inotify:
+        # Nothing changed since the last call
+        assert not watcher.pending()
+    watcher.close()
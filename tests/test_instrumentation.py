@@ -0,0 +1,76 @@
+import json
+import pstats
+import threading
+
+import pytest
+
+from instrumentation import Metrics, ProfileCapture, metrics
+from log_search_cli import main
+
+
+@pytest.fixture
+def shared_metrics():
+    # The CLI reports to the application-wide instance
+    yield metrics
+    metrics.enabled = False
+    metrics.reset()
+
+
+def test_disabled_metrics_record_nothing():
+    collected = Metrics()
+    with collected.stage('scan'):
+        collected.add('lines', 10)
+    assert collected.snapshot()['timings'] == {} and collected.snapshot()['counters'] == {}
+
+
+def test_stages_and_counters():
+    collected = Metrics(enabled=True)
+    for _ in range(3):
+        with collected.stage('scan'):
+            collected.add('lines', 10)
+    collected.add('matches')
+    snapshot = collected.snapshot()
+    assert snapshot['timings']['scan']['calls'] == 3
+    assert snapshot['timings']['scan']['seconds'] >= snapshot['timings']['scan']['max_seconds'] >= 0
+    assert snapshot['counters'] == {'lines': 30, 'matches': 1}
+    assert 'scan' in collected.format() and 'lines' in collected.format()
+    collected.reset()
+    assert collected.snapshot()['counters'] == {}
+
+
+def test_counters_from_many_threads():
+    collected = Metrics(enabled=True)
+
+    def count():
+        for _ in range(1000):
+            collected.add('lines')
+
+    threads = [threading.Thread(target=count) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert collected.snapshot()['counters'] == {'lines': 8000}
+
+
+def test_profile_capture(tmp_path):
+    path = str(tmp_path / "run.prof")
+    with ProfileCapture(path) as capture:
+        sorted(range(100000), key=lambda value: -value)
+    assert capture.summary.startswith("peak traced allocations:")
+    assert capture.peak_traced_mb is not None
+    assert pstats.Stats(path).total_calls > 0
+
+
+def test_cli_metrics_and_profile(tmp_path, shared_metrics, capsys):
+    log_path = str(tmp_path / "app.log")
+    with open(log_path, 'w') as f:
+        f.write("ERROR\nok\nERROR\n")
+    metrics_path = str(tmp_path / "metrics.json")
+    assert main(['-p', 'error', '--metrics', metrics_path, '--profile', str(tmp_path / "cli.prof"), log_path]) == 0
+    with open(metrics_path) as f:
+        snapshot = json.load(f)
+    assert {'search', 'scan'} <= set(snapshot['timings'])
+    assert snapshot['counters']['matches'] == 2
+    assert snapshot['counters']['lines_scanned'] == 3
+    assert "peak traced allocations" in capsys.readouterr().err
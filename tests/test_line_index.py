@@ -0,0 +1,56 @@
+import pytest
+
+from line_index import LineIndex
+
+
+def _index(tmp_path, data):
+    path = tmp_path / "app.log"
+    path.write_bytes(data)
+    return LineIndex(str(path))
+
+
+@pytest.mark.parametrize('data', [
+    b"", b"one\n", b"one\ntwo\nthree\n", b"one\ntwo", b"\n\n", b"one\r\ntwo\r\n", b"caf\xc3\xa9\nbad \xff\n",
+])
+def test_lines_match_text_mode_read(tmp_path, data):
+    index = _index(tmp_path, data)
+    expected = data.decode('utf-8', 'replace').replace('\r\n', '\n').splitlines(keepends=True)
+    assert index.line_count == len(expected)
+    assert index.get_lines(1, index.line_count) == expected
+    assert [index.get_line(number) for number in range(1, index.line_count + 1)] == expected
+    index.close()
+
+
+def test_line_spans_and_offsets(tmp_path):
+    index = _index(tmp_path, b"one\ntwo\nthree")
+    assert list(index.offsets) == [0, 4, 8]
+    assert index.line_span(2) == (4, 8)
+    assert index.line_span(3) == (8, 13)
+    assert index.get_line_bytes(3) == b"three"
+    assert [index.line_at_offset(offset) for offset in (0, 3, 4, 12)] == [1, 1, 2, 3]
+    index.close()
+
+
+def test_lines_split_on_newlines_only(tmp_path):
+    index = _index(tmp_path, b"a\x0cb\rc\n")
+    assert index.get_lines(1, 1) == ["a\x0cb\rc\n"]
+    index.close()
+
+
+def test_extend_picks_up_appended_lines(tmp_path):
+    index = _index(tmp_path, b"one\ntw")
+    with open(index.file_path, 'ab') as f:
+        f.write(b"o\nthree\n")
+    assert index.extend() == 8
+    assert index.get_lines(1, index.line_count) == ["one\n", "two\n", "three\n"]
+    assert index.extend() == 0
+    index.close()
+
+
+def test_extend_from_empty_file(tmp_path):
+    index = _index(tmp_path, b"")
+    with open(index.file_path, 'ab') as f:
+        f.write(b"first\n")
+    index.extend()
+    assert index.get_lines(1, index.line_count) == ["first\n"]
+    index.close()
@@ -0,0 +1,45 @@
+import os
+
+import log_document
+from log_document import MAX_OPEN_DOCUMENTS, get_document
+
+
+def _write_log(path, name, lines=10):
+    with open(path, 'w') as f:
+        f.writelines(f"{name} line {number}\n" for number in range(1, lines + 1))
+
+
+def test_unchanged_file_is_loaded_once(tmp_path):
+    path = str(tmp_path / "app.log")
+    _write_log(path, "app")
+    os.symlink(path, str(tmp_path / "link.log"))
+    document = get_document(path)
+    assert get_document(path) is document
+    assert get_document(str(tmp_path / "link.log")) is document
+    # Touched: the content may differ, the file is indexed again
+    os.utime(path, ns=(0, 0))
+    assert get_document(path) is not document
+
+
+def test_held_document_readable_after_eviction(tmp_path):
+    paths = [str(tmp_path / f"log{number}.log") for number in range(MAX_OPEN_DOCUMENTS + 1)]
+    for path in paths:
+        _write_log(path, os.path.basename(path))
+    held = get_document(paths[0])
+    for path in paths[1:]:
+        get_document(path)
+    assert os.path.realpath(paths[0]) not in log_document._documents
+    assert held.get_lines(1, 2) == ["log0.log line 1\n", "log0.log line 2\n"]
+
+
+def test_held_document_readable_after_reload(tmp_path):
+    path = str(tmp_path / "rotating.log")
+    _write_log(path, "old")
+    held = get_document(path)
+    # Rotated: a new file takes the name, the held document keeps the old one
+    _write_log(path + ".new", "new", lines=20)
+    os.replace(path + ".new", path)
+    reloaded = get_document(path)
+    assert reloaded is not held
+    assert reloaded.get_line(20) == "new line 20\n"
+    assert held.get_line(10) == "old line 10\n"
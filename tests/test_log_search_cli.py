@@ -0,0 +1,89 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from log_search_cli import main
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("start\nERROR disk full\nok\nWarning: slow\nerror again\n")
+    return path
+
+
+def test_text_output(log_path, capsys):
+    assert main(['-p', 'error', log_path]) == 0
+    assert capsys.readouterr().out == "2: ERROR disk full\n5: error again\n"
+
+
+def test_split_patterns_and_case_sensitive(log_path, capsys):
+    assert main(['-p', 'ERROR|Warning', '--case-sensitive', log_path]) == 0
+    assert capsys.readouterr().out == "2: ERROR disk full\n4: Warning: slow\n"
+
+
+def test_several_files_are_prefixed(log_path, tmp_path, capsys):
+    other = str(tmp_path / "other.log")
+    with open(other, 'w') as f:
+        f.write("error elsewhere\n")
+    assert main(['-p', 'error', log_path, other]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        f"{log_path}:2: ERROR disk full", f"{log_path}:5: error again", f"{other}:1: error elsewhere",
+    ]
+
+
+def test_jsonl_output_with_pattern_file(log_path, capsys):
+    assert main(['-P', os.path.join(REPO, 'example_pattern.json'), '--format', 'jsonl', log_path]) == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert records == [
+        {'file': log_path, 'line': 2, 'offset': 6, 'patterns': ['Error Pattern'], 'text': "ERROR disk full"},
+        {'file': log_path, 'line': 4, 'offset': 25, 'patterns': ['Warning Pattern'], 'text': "Warning: slow"},
+        {'file': log_path, 'line': 5, 'offset': 39, 'patterns': ['Error Pattern'], 'text': "error again"},
+    ]
+
+
+def test_compressed_log_is_searched_while_decompressing(log_path, capsys):
+    with open(log_path, 'rb') as f, gzip.open(log_path + '.gz', 'wb') as out:
+        out.write(f.read())
+    assert main(['-p', 'error', '--format', 'jsonl', log_path + '.gz']) == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(record['line'], record['offset'], record['text']) for record in records] == [
+        (2, 6, "ERROR disk full"), (5, 39, "error again"),
+    ]
+
+
+def test_no_match_exits_1(log_path, capsys):
+    assert main(['-p', 'nowhere', log_path]) == 1
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize('argv, message', [
+    (['APP_LOG'], "no patterns given"),
+    (['-p', '(unclosed', 'APP_LOG'], "invalid pattern"),
+    (['-P', 'missing.json', 'APP_LOG'], "cannot load patterns"),
+    (['-p', 'error', 'missing.log'], "missing.log"),
+])
+def test_errors_exit_2(log_path, capsys, argv, message):
+    argv = [log_path if arg == 'APP_LOG' else arg for arg in argv]
+    assert main(argv) == 2
+    assert message in capsys.readouterr().err
+
+
+def test_matches_in_other_files_still_printed_after_an_error(log_path, capsys):
+    assert main(['-p', 'error', 'missing.log', log_path]) == 2
+    assert f"{log_path}:2: ERROR disk full" in capsys.readouterr().out
+
+
+def test_script_exit_status(log_path):
+    script = os.path.join(REPO, 'log-search')
+    found = subprocess.run([sys.executable, script, '-p', 'error', log_path], capture_output=True, text=True)
+    assert (found.returncode, found.stdout) == (0, "2: ERROR disk full\n5: error again\n")
+    missing = subprocess.run([sys.executable, script, '-p', 'nowhere', log_path], capture_output=True)
+    assert missing.returncode == 1
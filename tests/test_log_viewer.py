@@ -0,0 +1,119 @@
+import pytest
+
+# Python builds without Tk cannot import the viewer
+pytest.importorskip('tkinter')
+
+from log_document import get_document  # noqa: E402
+from log_viewer import HighlightLayer, ListRows, ResultRows  # noqa: E402
+from record_index import DEFAULT_RECORD_START, get_record_index  # noqa: E402
+from search_engine import MatchSet, MultiFileMatchSet  # noqa: E402
+
+
+class FakeText:
+    def __init__(self):
+        self.tags = {}  # {tag_name: [(start, end), ...]}
+
+    def tag_config(self, tag_name, **options):
+        self.tags.setdefault(tag_name, [])
+
+    def tag_add(self, tag_name, *indices):
+        self.tags.setdefault(tag_name, []).extend(zip(indices[::2], indices[1::2]))
+
+    def tag_remove(self, tag_name, first, last):
+        self.tags.pop(tag_name, None)
+
+
+class FakeView:
+    # Renders file lines first..last as widget lines 1..
+    def __init__(self, first, last):
+        self.text = FakeText()
+        self.render_callbacks = []
+        self.first = first
+        self.last = last
+
+    def visible_range(self):
+        return self.first, self.last
+
+    def text_index(self, line_no, column=0):
+        return f"{line_no - self.first + 1}.{column}"
+
+    def render(self, first, last):
+        self.first, self.last = first, last
+        self.text.tags.clear()
+        for callback in self.render_callbacks:
+            callback(first, last)
+
+
+def _tagged_lines(view, tag_name):
+    return [int(start.split('.')[0]) + view.first - 1 for start, _ in view.text.tags.get(tag_name, [])]
+
+
+def test_only_rendered_lines_are_tagged():
+    view = FakeView(100, 199)
+    layer = HighlightLayer(view)
+    layer.configure('pattern_0', background='red')
+    layer.add_lines('pattern_0', [5, 150, 180, 5000])
+    assert _tagged_lines(view, 'pattern_0') == [150, 180]
+    assert view.text.tags['pattern_0'][0] == ("51.0", "51.0 lineend")
+
+
+def test_tags_follow_the_rendered_window():
+    view = FakeView(1, 100)
+    layer = HighlightLayer(view)
+    layer.add_lines('pattern_0', [5, 150])
+    layer.add_lines('pattern_1', [150, 151])
+    view.render(101, 200)
+    assert _tagged_lines(view, 'pattern_0') == [150]
+    assert _tagged_lines(view, 'pattern_1') == [150, 151]
+
+
+def test_lines_added_out_of_order_stay_sorted():
+    view = FakeView(1, 10)
+    layer = HighlightLayer(view)
+    layer.add_lines('pattern_0', [7, 9])
+    layer.add_lines('pattern_0', [2, 7])
+    assert list(layer.lines['pattern_0']) == [2, 7, 9]
+
+
+def test_clear_drops_whole_tags():
+    view = FakeView(1, 10)
+    layer = HighlightLayer(view)
+    layer.add_lines('pattern_0', [1])
+    layer.add_lines('pattern_1', [2])
+    layer.clear(['pattern_0'])
+    assert 'pattern_0' not in view.text.tags and 'pattern_0' not in layer.lines
+    assert _tagged_lines(view, 'pattern_1') == [2]
+    layer.clear()
+    assert layer.lines == {}
+
+
+def test_result_rows_render_one_row_per_match(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("ok\nERROR one\nERROR two")
+    document = get_document(path)
+    match_set = MatchSet(['error'], False)
+    match_set.add_batch([(2, None, [0]), (3, None, [0])])
+    rows = ResultRows(match_set, document)
+    assert rows.line_count == 2
+    assert rows.get_lines(1, 5) == ["2: ERROR one\n", "3: ERROR two\n"]
+
+    multi = MultiFileMatchSet(['error'], False)
+    multi.add(path, 3, 13, [0])
+    assert ResultRows(multi).get_lines(1, 1) == [f"{path}:3: ERROR two\n"]
+
+
+def test_result_rows_join_the_lines_of_a_record(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("2024-03-01 10:00:00 ERROR boom\n  at frame\n2024-03-01 10:00:01 ok\n")
+    document = get_document(path)
+    match_set = MatchSet(['boom'], False, records=get_record_index(document, DEFAULT_RECORD_START))
+    match_set.add_batch([(1, None, [0])])
+    assert ResultRows(match_set, document).get_lines(1, 1) == ["1: 2024-03-01 10:00:00 ERROR boom ⏎   at frame\n"]
+
+
+def test_list_rows():
+    rows = ListRows([3, 1, 2], label=lambda item: f"item {item}")
+    assert rows.line_count == 3
+    assert rows.get_lines(2, 3) == ["item 1\n", "item 2\n"]
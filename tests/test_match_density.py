@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+import match_density
+from match_density import density_by_pattern, hits_by_pattern
+from search_engine import MatchSet
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def implementation(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(match_density, 'numpy', None)
+    elif match_density.numpy is None:
+        pytest.skip("NumPy is not installed")
+    return request.param
+
+
+def _match_set(rows):
+    match_set = MatchSet(['a', 'b', 'c'], False)
+    match_set.add_batch([(line_number, None, pattern_ids) for line_number, pattern_ids in rows])
+    return match_set
+
+
+def _random_rows(count=5000, lines=100000):
+    rng = random.Random(11)
+    numbers = sorted(rng.sample(range(1, lines + 1), count))
+    return [(number, sorted(rng.sample(range(3), rng.randint(1, 3)))) for number in numbers]
+
+
+def test_hits_by_pattern(implementation):
+    rows = _random_rows()
+    expected = [sum(1 for _, ids in rows if pid in ids) for pid in range(3)]
+    assert hits_by_pattern(_match_set(rows)) == expected
+
+
+@pytest.mark.parametrize('buckets, first_line, last_line', [(100, 1, 100000), (7, 20000, 30000), (1, 1, 1), (50, 5, 4)])
+def test_density_by_pattern(implementation, buckets, first_line, last_line):
+    rows = _random_rows()
+    span = last_line - first_line + 1
+    expected = [[0] * buckets for _ in range(3)]
+    if span > 0:
+        for line_number, ids in rows:
+            if first_line <= line_number <= last_line:
+                for pid in ids:
+                    expected[pid][(line_number - first_line) * buckets // span] += 1
+    assert density_by_pattern(_match_set(rows), buckets, first_line, last_line) == expected
+
+
+def test_empty_match_set(implementation):
+    match_set = _match_set([])
+    assert hits_by_pattern(match_set) == [0, 0, 0]
+    assert density_by_pattern(match_set, 4, 1, 100) == [[0] * 4] * 3
@@ -0,0 +1,89 @@
+import bz2
+import os
+import re
+
+from log_search_cli import main
+from multi_search import expand_targets, search_paths, split_ranges
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _naive(path, patterns):
+    # [(line_number, byte_offset, pattern_ids)] of a plain file
+    matches = []
+    offset = 0
+    with open(path, 'rb') as f:
+        for line_number, raw in enumerate(f, start=1):
+            line = raw.decode('utf-8', 'replace')
+            ids = [idx for idx, pattern in enumerate(patterns) if re.search(pattern, line, re.IGNORECASE)]
+            if ids:
+                matches.append((line_number, offset, ids))
+            offset += len(raw)
+    return matches
+
+
+def test_expand_targets(tmp_path):
+    root = str(tmp_path)
+    for name in ["a.log", "sub/b.log", "sub/c.txt", ".hidden/d.log", "sub/.e.log"]:
+        _write(os.path.join(root, name), b"x\n")
+    assert expand_targets([root]) == [os.path.join(root, name) for name in ["a.log", "sub/b.log", "sub/c.txt"]]
+    assert expand_targets([os.path.join(root, "**", "*.log")]) == \
+        [os.path.join(root, name) for name in ["a.log", "sub/b.log"]]
+    assert expand_targets([os.path.join(root, "a.log"), os.path.join(root, "a.log")]) == [os.path.join(root, "a.log")]
+
+
+def test_split_ranges_end_on_line_boundaries(tmp_path):
+    path = str(tmp_path / "app.log")
+    data = b"".join(b"line %d %s\n" % (number, b"x" * (number % 37)) for number in range(2000))
+    _write(path, data)
+    ranges = split_ranges(path, chunk_bytes=1000)
+    assert len(ranges) > 10
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start and data[end - 1:end] == b"\n"
+
+
+def test_search_paths_matches_each_file(tmp_path):
+    root = str(tmp_path)
+    patterns = ['error', r'id=\d+7\b']
+    files = {}
+    for number in range(5):
+        lines = [f"{line} {'ERROR' if line % (7 + number) == 0 else 'ok'} id={line} é\n" for line in range(3000)]
+        files[os.path.join(root, f"app{number}.log")] = "".join(lines).encode('utf-8')
+    for path, data in files.items():
+        _write(path, data)
+    compressed = os.path.join(root, "old.log.bz2")
+    _write(compressed, bz2.compress(files[os.path.join(root, "app0.log")]))
+
+    results = list(search_paths([root], patterns, max_workers=2, chunk_bytes=10000))
+    expected = [
+        (path, line_number, offset, ids)
+        for path in sorted(files)
+        for line_number, offset, ids in _naive(path, patterns)
+    ]
+    by_file = [(path, line_number, offset, ids) for path, line_number, offset, _, ids in results]
+    assert [match for match in by_file if match[0] != compressed] == expected
+    assert [match[1:] for match in by_file if match[0] == compressed] == \
+        [match[1:] for match in expected if match[0] == os.path.join(root, "app0.log")]
+    line = next(line for path, _, _, line, _ in results if path != compressed)
+    assert line == "0 ERROR id=0 é\n"
+
+
+def test_search_paths_can_be_cancelled(tmp_path):
+    path = str(tmp_path / "app.log")
+    _write(path, b"ERROR\n" * 10000)
+    assert list(search_paths([path], ['error'], max_workers=1, chunk_bytes=1000, cancelled=lambda: True)) == []
+
+
+def test_cli_searches_directories_in_parallel(tmp_path, capsys):
+    _write(str(tmp_path / "a.log"), b"ok\nERROR a\n")
+    _write(str(tmp_path / "b" / "b.log"), b"ERROR b\n")
+    assert main(['-p', 'error', '-j', '2', str(tmp_path)]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        f"{tmp_path / 'a.log'}:2: ERROR a", f"{tmp_path / 'b' / 'b.log'}:1: ERROR b",
+    ]
+    assert main(['-p', 'error', '--from', '10:00', str(tmp_path)]) == 2
@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+import pattern_pack
+from pattern_pack import build_pack, load_pattern_pack
+from search_engine import required_literal
+
+ENTRIES = {
+    "Error": {"pattern": "Error", "highlight_color": "red"},
+    "Broken": {"pattern": "(unclosed", "highlight_color": "blue"},
+    "Error again": {"pattern": "Error", "highlight_color": "green"},
+    "Timeout": {"pattern": r"timeout after \d+s"},
+    "Not a string": {"pattern": 42},
+}
+
+
+def _write_patterns(path, entries=ENTRIES):
+    with open(path, 'w') as f:
+        json.dump(entries, f)
+    return str(path)
+
+
+def test_build_pack_skips_invalid_and_repeated_patterns():
+    pack = build_pack(ENTRIES)
+    assert pack.names == ["Error", "Timeout"]
+    assert pack.patterns == ["Error", r"timeout after \d+s"]
+    assert pack.colors == ["red", "black"]
+    assert pack.required == [required_literal(p) for p in pack.patterns]
+    assert [name for name, _ in pack.skipped] == ["Broken", "Not a string"]
+    assert pack.duplicates == 1
+    assert pack.as_dict()["Timeout"] == {'pattern': r"timeout after \d+s", 'highlight_color': "black"}
+
+
+def test_pack_matcher_matches_like_the_patterns():
+    matcher = build_pack(ENTRIES).matcher()
+    assert matcher.match_ids("ERROR: Timeout after 30s\n") == [0, 1]
+    assert matcher.match_ids("timeout after s\n") == []
+
+
+def test_entry_without_pattern_is_rejected():
+    with pytest.raises(ValueError):
+        build_pack({"Empty": {"highlight_color": "red"}})
+
+
+def test_pack_is_cached_next_to_the_file(tmp_path, monkeypatch):
+    json_path = _write_patterns(tmp_path / "patterns.json")
+    pack = load_pattern_pack(json_path, cache_dir=str(tmp_path / "cache"))
+    assert os.path.exists(tmp_path / ".patterns.json.pack")
+
+    def fail(entries, source_hash=None):
+        raise AssertionError("built again")
+
+    monkeypatch.setattr(pattern_pack, 'build_pack', fail)
+    cached = load_pattern_pack(json_path, cache_dir=str(tmp_path / "cache"))
+    assert (cached.names, cached.patterns, cached.required, cached.skipped) == \
+        (pack.names, pack.patterns, pack.required, pack.skipped)
+
+
+def test_changed_file_is_loaded_again(tmp_path):
+    json_path = _write_patterns(tmp_path / "patterns.json")
+    load_pattern_pack(json_path, cache_dir=str(tmp_path / "cache"))
+    _write_patterns(json_path, {"Warning": {"pattern": "Warning", "highlight_color": "yellow"}})
+    assert load_pattern_pack(json_path, cache_dir=str(tmp_path / "cache")).names == ["Warning"]
+
+
+def test_pack_goes_to_the_cache_dir_when_the_directory_is_not_writable(tmp_path):
+    json_path = _write_patterns(tmp_path / "patterns.json")
+    # The pack cannot be written where a directory of that name exists
+    os.mkdir(tmp_path / ".patterns.json.pack")
+    pack = load_pattern_pack(json_path, cache_dir=str(tmp_path / "cache"))
+    assert os.listdir(tmp_path / "cache") == [f"{pack.source_hash}.pack"]
+    assert load_pattern_pack(json_path, cache_dir=str(tmp_path / "cache")).names == pack.names
+
+
+def test_invalid_json_is_rejected(tmp_path):
+    path = tmp_path / "patterns.json"
+    path.write_text("{not json")
+    with pytest.raises(ValueError):
+        load_pattern_pack(str(path), cache_dir=str(tmp_path / "cache"))
@@ -0,0 +1,51 @@
+import re
+
+import pytest
+
+from log_document import get_document
+from record_index import DEFAULT_RECORD_START, compile_record_start, get_record_index
+
+
+def test_record_start_is_anchored_at_line_starts():
+    regex = compile_record_start(DEFAULT_RECORD_START)
+    data = b"2024-03-01 10:00:00 a\nx 2024-03-01 10:00:01\n2024-03-01T10:00:02 b\n"
+    assert [match.start() for match in regex.finditer(data)] == [0, 44]
+    with pytest.raises(re.error):
+        compile_record_start(r'\u00e9')
+
+
+def test_records_of_a_document(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("header\n2024-03-01 10:00:00 ERROR boom\n  at frame\n  at main\n2024-03-01 10:00:01 ok\n")
+    document = get_document(path)
+    records = get_record_index(document, DEFAULT_RECORD_START)
+    assert list(records.starts) == [1, 2, 5]
+    assert [records.record_of(line) for line in range(1, 6)] == [0, 1, 1, 1, 2]
+    assert records.start_of(4) == 2
+    assert records.span(1, document.line_count) == (2, 4)
+    assert records.span(2, document.line_count) == (5, 5)
+    # Kept on the document
+    assert get_record_index(document, DEFAULT_RECORD_START) is records
+    assert get_record_index(document, r'\s+at') is not records
+
+
+def test_index_grows_with_the_file(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("2024-03-01 10:00:00 a\n  more\n2024-03")
+    document = get_document(path)
+    records = get_record_index(document, DEFAULT_RECORD_START)
+    assert list(records.starts) == [1]
+    # The last line was still being written
+    with open(path, 'a') as f:
+        f.write("-01 10:00:01 b\n  more\n2024-03-01 10:00:02 c\n")
+    document.extend()
+    assert list(get_record_index(document, DEFAULT_RECORD_START).starts) == [1, 3, 5]
+
+
+def test_cancelled_build(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("2024-03-01 10:00:00 a\n")
+    assert get_record_index(get_document(path), DEFAULT_RECORD_START, cancelled=lambda: True) is None
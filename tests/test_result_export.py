@@ -0,0 +1,118 @@
+import csv
+import json
+
+import pytest
+
+from log_document import get_document
+from record_index import DEFAULT_RECORD_START, get_record_index
+from result_export import _ROWS_PER_BLOCK, export_format, export_matches
+from search_engine import MatchSet, MultiFileMatchSet, PatternMatcher, iter_match_batches
+from search_worker import ExportJob
+
+
+def _write_log(path, lines):
+    with open(path, 'w') as f:
+        f.writelines(line + '\n' for line in lines)
+
+
+def _search(path, patterns):
+    match_set = MatchSet(patterns, False)
+    for _, batch in iter_match_batches(get_document(path), PatternMatcher(patterns)):
+        match_set.add_batch(batch)
+    return match_set
+
+
+def _read_export(out_path, fmt):
+    # [(file, line, text)] of the exported matches
+    with open(out_path, encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            return [(row['file'], int(row['line']), row['text']) for row in csv.DictReader(f)]
+        if fmt == 'jsonl':
+            return [(record['file'], record['line'], record['text']) for record in map(json.loads, f)]
+        records = []
+        for line in f:
+            # file:line: [patterns] text, context lines use '-' after the number
+            location, _, text = line.rstrip('\n').partition('] ')
+            file_path, line_number, _ = location.rsplit(':', 2)
+            records.append((file_path, int(line_number), text))
+        return records
+
+
+@pytest.mark.parametrize('fmt', ['text', 'csv', 'jsonl'])
+def test_single_file_export_names_the_file(tmp_path, fmt):
+    path = str(tmp_path / "app.log")
+    _write_log(path, ["start", "ERROR one", "ok", "ERROR two"])
+    out_path = str(tmp_path / "out")
+    document = get_document(path)
+    assert export_matches(_search(path, ['error']), out_path, fmt, document) == 2
+    assert _read_export(out_path, fmt) == [(path, 2, "ERROR one"), (path, 4, "ERROR two")]
+
+
+@pytest.mark.parametrize('fmt', ['text', 'csv', 'jsonl'])
+def test_multi_file_export_names_each_file(tmp_path, fmt):
+    paths = [str(tmp_path / "a.log"), str(tmp_path / "b.log")]
+    _write_log(paths[0], ["ERROR a"])
+    _write_log(paths[1], ["ok", "ERROR b"])
+    match_set = MultiFileMatchSet(['error'], False)
+    match_set.add(paths[0], 1, 0, [0])
+    match_set.add(paths[1], 2, 3, [0])
+    out_path = str(tmp_path / "out")
+    assert export_matches(match_set, out_path, fmt) == 2
+    assert _read_export(out_path, fmt) == [(paths[0], 1, "ERROR a"), (paths[1], 2, "ERROR b")]
+
+
+def test_context_lines_are_exported(tmp_path):
+    path = str(tmp_path / "app.log")
+    _write_log(path, ["one", "two", "ERROR", "four", "five"])
+    out_path = str(tmp_path / "out.jsonl")
+    export_matches(_search(path, ['error']), out_path, 'jsonl', get_document(path), context=1)
+    with open(out_path) as f:
+        assert [json.loads(line) for line in f] == [{
+            'file': path, 'line': 3, 'offset': 8, 'patterns': ['error'], 'text': "ERROR",
+            'before': ["two"], 'after': ["four"],
+        }]
+
+
+def test_record_matches_are_exported_whole(tmp_path):
+    path = str(tmp_path / "app.log")
+    _write_log(path, ["2024-03-01 10:00:00 ERROR boom", "  at frame", "2024-03-01 10:00:01 ok"])
+    document = get_document(path)
+    match_set = MatchSet(['frame'], False, records=get_record_index(document, DEFAULT_RECORD_START))
+    match_set.add_batch([(1, None, [0])])
+    out_path = str(tmp_path / "out.jsonl")
+    # Without context, whatever is asked for
+    export_matches(match_set, out_path, 'jsonl', document, context=2)
+    with open(out_path) as f:
+        assert [json.loads(line) for line in f] == [{
+            'file': path, 'line': 1, 'offset': 0, 'patterns': ['frame'],
+            'text': "2024-03-01 10:00:00 ERROR boom\n  at frame", 'before': [], 'after': [],
+        }]
+
+
+def test_progress_and_cancel(tmp_path):
+    path = str(tmp_path / "app.log")
+    _write_log(path, ["ERROR"] * (3 * _ROWS_PER_BLOCK))
+    match_set = _search(path, ['error'])
+    document = get_document(path)
+    progress = []
+    written = export_matches(match_set, str(tmp_path / "all.txt"), 'text', document,
+                             progress=lambda done, total: progress.append((done, total)))
+    assert written == 3 * _ROWS_PER_BLOCK
+    assert progress == [(n * _ROWS_PER_BLOCK, 3 * _ROWS_PER_BLOCK) for n in (1, 2, 3)]
+    assert export_matches(match_set, str(tmp_path / "part.txt"), 'text', document, cancelled=lambda: True) == \
+        _ROWS_PER_BLOCK
+
+
+def test_export_job(tmp_path):
+    path = str(tmp_path / "app.log")
+    _write_log(path, ["ok", "ERROR"])
+    out_path = str(tmp_path / "out.csv")
+    job = ExportJob(_search(path, ['error']), out_path, export_format(out_path), get_document(path)).start()
+    job.join()
+    assert job.queue.get_nowait() == ('done', 1)
+    assert _read_export(out_path, 'csv') == [(path, 2, "ERROR")]
+
+
+def test_export_format():
+    assert [export_format(name) for name in ("a.CSV", "a.jsonl", "a.ndjson", "a.txt", "a.log", "a")] == \
+        ['csv', 'jsonl', 'jsonl', 'text', 'text', 'text']
@@ -0,0 +1,283 @@
+import gzip
+import re
+
+import pytest
+
+import compressed_log
+from log_document import get_document
+from record_index import DEFAULT_RECORD_START, get_record_index
+from search_engine import (
+    WHOLE_FILE, MatchSet, MultiFileMatchSet, PatternMatcher, SearchCache, iter_match_batches,
+    iter_record_match_batches, iter_stream_match_batches
+)
+
+
+def test_literal_set_matches_like_ignorecase_regex():
+    patterns = ['status', 'kelvin', 'mission']
+    matcher = PatternMatcher(patterns)
+    assert matcher.literal
+    # 'ſ' (long s) and 'K' (Kelvin sign) match s and k under IGNORECASE
+    for line in ['ſtatus ok', 'Kelvin 300', 'miſſion', 'STATUS', 'nothing here']:
+        expected = [idx for idx, pattern in enumerate(patterns) if re.search(pattern, line, re.IGNORECASE)]
+        assert matcher.match_ids(line) == expected, line
+
+
+MATCHER_LINES = [
+    "2024-03-01 10:00:01 ERROR Timeout after 30s",
+    "2024-03-01 10:00:02 warning: disk at 91%",
+    "Info: user=alice id=42 id=42",
+    "error error",
+    "ſtatus KELVIN ok",
+    "",
+    "nothing to see",
+]
+
+
+@pytest.mark.parametrize('patterns', [
+    ['error'],
+    ['Error', 'Warning', 'Info'],
+    ['ERROR', 'timeout', 'x'],
+    [r'user=\w+', r'\d+%', r'ERROR|WARN'],
+    [r'(\w+) \1', 'error'],
+    [r'(?P<id>id=\d+) (?P=id)', r'(?P<id>\d+%)'],
+    [r'(?i)info', 'status'],
+    [r'^\d{4}-', r'ok$', r'[A-Z]{5}'],
+    ['[0-9]+s', 'a.ice', 'dis?k', 'nothing|see'],
+])
+def test_match_ids_equal_separate_searches(patterns):
+    for case_sensitive in (False, True):
+        flags = 0 if case_sensitive else re.IGNORECASE
+        matcher = PatternMatcher(patterns, case_sensitive)
+        for line in MATCHER_LINES:
+            line += '\n'
+            expected = [idx for idx, pattern in enumerate(patterns) if re.search(pattern, line, flags)]
+            assert matcher.match_ids(line) == expected, (patterns, case_sensitive, line)
+
+
+def test_prefilter_required_literals_match_any_case():
+    # The needles are lower-cased, lines are too before they are looked up
+    patterns = [r'Timeout after \d+s', r'disk at \d+%', r'user=(\w+)']
+    matcher = PatternMatcher(patterns, case_sensitive=False)
+    assert matcher.match_ids("TIMEOUT AFTER 5S\n") == [0]
+    assert matcher.match_ids("Disk At 99% User=bob\n") == [1, 2]
+
+
+def _naive_matches(path, patterns, case_sensitive=False):
+    # Every line matched on its own as text, the way the viewer shows it
+    flags = 0 if case_sensitive else re.IGNORECASE
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf-8', 'replace')
+    lines = [line[:-2] + '\n' if line.endswith('\r\n') else line for line in text.splitlines(keepends=True)]
+    matches = []
+    for line_number, line in enumerate(lines, start=1):
+        ids = [idx for idx, pattern in enumerate(patterns) if re.search(pattern, line, flags)]
+        if ids:
+            matches.append((line_number, ids))
+    return matches
+
+
+def _engine_matches(path, patterns, case_sensitive=False):
+    matcher = PatternMatcher(patterns, case_sensitive)
+    return [
+        (line_number, ids)
+        for _, batch in iter_match_batches(get_document(path), matcher)
+        for line_number, _, ids in batch
+    ]
+
+
+LOG_LINES = [
+    "2024-03-01 10:00:00 INFO service started",
+    "2024-03-01 10:00:01 ERROR Timeout after 30s ",
+    "x",
+    "2024-03-01 10:00:02 WARNING disk at 91%",
+    "",
+    "2024-03-01 10:00:03 error: user=alice retry=3",
+    "  at com.example.Main.run(Main.java:42)",
+    "2024-03-01 10:00:04 INFO status ok",
+]
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+@pytest.mark.parametrize('extra', ['', ' ſtatus é'])
+@pytest.mark.parametrize('patterns', [
+    [r'\s+$'], [r'[^x]$'], [r'\n'], ['error'], ['Error', 'Timeout', 'status'],
+    [r'user=\w+', r'\d+%'], [r'^\s+at '], [r'ERROR|WARN(ING)?', r'[a-z]+=\d'],
+])
+def test_search_matches_each_line_alone(tmp_path, patterns, extra, newline):
+    # The raw bytes path runs for ASCII data, a non-ASCII line makes the
+    # chunk fall back to text for some patterns: both agree with re.search
+    path = str(tmp_path / "app.log")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(newline.join(LOG_LINES) + extra + newline)
+    for case_sensitive in (False, True):
+        expected = _naive_matches(path, patterns, case_sensitive)
+        assert _engine_matches(path, patterns, case_sensitive) == expected, (patterns, case_sensitive)
+
+
+def _naive_record_matches(path, patterns, case_sensitive=False):
+    # Records split at each line matching the start pattern, each matched on its own
+    flags = 0 if case_sensitive else re.IGNORECASE
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf-8', 'replace')
+    lines = [line[:-2] + '\n' if line.endswith('\r\n') else line for line in text.splitlines(keepends=True)]
+    records = []
+    for line_number, line in enumerate(lines, start=1):
+        if not records or re.match(DEFAULT_RECORD_START, line):
+            records.append((line_number, line))
+        else:
+            records[-1] = (records[-1][0], records[-1][1] + line)
+    matches = []
+    for first_line, record in records:
+        ids = [idx for idx, pattern in enumerate(patterns) if re.search(pattern, record, flags)]
+        if ids:
+            matches.append((first_line, record, ids))
+    return matches
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+@pytest.mark.parametrize('extra', ['', ' ſtatus é'])
+@pytest.mark.parametrize('patterns', [
+    ['error'], [r'Timeout.*\n.*x'], [r'com\.example', 'ERROR'], [r'(?s)retry.*Main'],
+    [r'\s+$', r'^\s+at '], [r'user=\w+', r'\d+%', 'preamble'],
+])
+def test_record_search_matches_each_record_alone(tmp_path, patterns, extra, newline):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(newline.join(["preamble"] + LOG_LINES) + extra + newline)
+    document = get_document(path)
+    records = get_record_index(document, DEFAULT_RECORD_START)
+    assert list(records.starts) == [1, 2, 3, 5, 7, 9]
+    for case_sensitive in (False, True):
+        matcher = PatternMatcher(patterns, case_sensitive)
+        found = [match for _, batch in iter_record_match_batches(document, matcher, records) for match in batch]
+        assert found == _naive_record_matches(path, patterns, case_sensitive), (patterns, case_sensitive)
+
+
+def test_record_search_within_ranges(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("\n".join(LOG_LINES) + "\n")
+    document = get_document(path)
+    records = get_record_index(document, DEFAULT_RECORD_START)
+    matcher = PatternMatcher(['2024'])
+    # Only records starting within the range are searched, whole
+    batches = iter_record_match_batches(document, matcher, records, [(3, 6)])
+    assert [(first_line, record) for _, batch in batches for first_line, record, _ in batch] == [
+        (4, LOG_LINES[3] + "\n\n"), (6, LOG_LINES[5] + "\n" + LOG_LINES[6] + "\n")
+    ]
+
+
+def test_line_end_patterns_are_not_searched_as_bytes():
+    for pattern in [r'\s+$', r'[^x]$', r'\n', r'(?s)a.b', r'a(?=\n)', r'[\t-\r]']:
+        assert PatternMatcher([pattern]).bytes_combined is None, pattern
+    for pattern in ['error', r'user=\w+', r'a.b', r'[^\n]+']:
+        assert PatternMatcher([pattern]).bytes_combined is not None, pattern
+
+
+@pytest.mark.parametrize('previous, case_sensitive, patterns, new_case_sensitive, window, covers', [
+    (['Err'], False, ['Error'], False, WHOLE_FILE, True),
+    (['Err'], False, ['ERROR'], False, WHOLE_FILE, True),
+    (['Err'], True, ['Error'], True, WHOLE_FILE, True),
+    (['Err'], True, ['ERROR'], True, WHOLE_FILE, False),
+    (['Err'], True, ['Error'], False, WHOLE_FILE, False),
+    (['Err'], False, ['Error'], True, WHOLE_FILE, True),
+    (['Error', 'Warn'], False, ['Warning'], False, WHOLE_FILE, True),
+    (['Error'], False, ['Error', 'Warn'], False, WHOLE_FILE, False),
+    (['Err'], False, ['Error'], False, (10, 20), True),
+    (['E.r'], False, ['E.rr'], False, WHOLE_FILE, False),
+    (['E.r'], False, ['E.r'], False, WHOLE_FILE, True),
+    (['ſt'], False, ['ſtatus'], False, WHOLE_FILE, False),
+])
+def test_match_set_covers(previous, case_sensitive, patterns, new_case_sensitive, window, covers):
+    assert MatchSet(previous, case_sensitive).covers(patterns, new_case_sensitive, window) is covers
+
+
+def test_match_set_in_a_window_covers_only_narrower_windows():
+    match_set = MatchSet(['Err'], False, window=(10, 20))
+    assert match_set.covers(['Error'], False, (12, 20))
+    assert not match_set.covers(['Error'], False, (5, 20))
+    assert not match_set.covers(['Error'], False, WHOLE_FILE)
+
+
+def test_search_cache(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("ERROR one\nERROR two\nok\n")
+    document = get_document(path)
+    cache = SearchCache(max_entries=2)
+    sets = []
+    for patterns in (['E'], ['Er'], ['Err']):
+        match_set = MatchSet(patterns, False)
+        # Longer literals match fewer lines
+        match_set.add_batch([(1, "ERROR one\n", [0])] * (4 - len(patterns[0])))
+        cache.put(document, match_set)
+        sets.append(match_set)
+    # The oldest entry made room for the third one
+    assert cache.get(document, ['E'], False) is None
+    assert cache.get(document, ['Er'], False) is sets[1]
+    assert cache.narrowest_cover(document, ['Error'], False) is sets[2]
+    assert cache.narrowest_cover(document, ['Warning'], False) is None
+    # Another document (a reloaded file) starts from an empty cache
+    other = str(tmp_path / "other.log")
+    with open(other, 'w') as f:
+        f.write("x\n")
+    assert cache.get(get_document(other), ['Er'], False) is None
+    assert cache.get(document, ['Er'], False) is None
+
+
+@pytest.mark.parametrize('extra', ['', ' ſtatus é'])
+@pytest.mark.parametrize('patterns', [['error'], [r'\s+$'], [r'user=\w+', r'\d+%'], ['Error', 'status']])
+def test_stream_search_matches_each_line_alone(tmp_path, patterns, extra):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('\r\n'.join(LOG_LINES) + extra + '\n' + LOG_LINES[1])
+    with open(path, 'rb') as f:
+        data = f.read()
+    # Blocks cut in the middle of lines and characters
+    blocks = [data[start:start + 7] for start in range(0, len(data), 7)]
+    found = [
+        (line_number, offset, ids)
+        for _, batch in iter_stream_match_batches(blocks, PatternMatcher(patterns))
+        for line_number, offset, _, ids in batch
+    ]
+    offsets = get_document(path).index.offsets
+    assert found == [(line_number, offsets[line_number - 1], ids) for line_number, ids in _naive_matches(path, patterns)]
+
+
+def test_match_set_stores_each_pattern_set_once(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("a\nab\nb\nab\n")
+    document = get_document(path)
+    match_set = MatchSet(['a', 'b'], False)
+    for _, batch in iter_match_batches(document, PatternMatcher(['a', 'b'])):
+        match_set.add_batch(batch)
+    assert len(match_set) == 4
+    assert list(match_set.line_numbers) == [1, 2, 3, 4]
+    assert match_set.pattern_sets == [(0,), (0, 1), (1,)]
+    assert list(match_set.pattern_set_ids) == [0, 1, 2, 1]
+    assert [match_set.first_pattern(row) for row in range(4)] == [0, 0, 1, 0]
+    assert match_set.location(2) == (None, 3)
+    assert match_set.read_lines(document, 1, 2) == ["ab\n", "b\n"]
+
+
+def test_multi_file_match_set_reads_lines_at_their_offset(tmp_path, monkeypatch):
+    monkeypatch.setattr(compressed_log, 'DEFAULT_CACHE_DIR', str(tmp_path / "compressed"))
+    plain = str(tmp_path / "a.log")
+    with open(plain, 'wb') as f:
+        f.write(b"ok\r\nERROR a\r\nlast ERROR")
+    compressed = str(tmp_path / "b.log.gz")
+    with gzip.open(compressed, 'wb') as f:
+        f.write(b"ERROR b\n")
+    gone = str(tmp_path / "gone.log")
+    match_set = MultiFileMatchSet(['error'], False)
+    match_set.add(plain, 2, 4, [0])
+    match_set.add(plain, 3, 13, [0])
+    match_set.add(compressed, 1, 0, [0])
+    match_set.add(gone, 1, 0, [0])
+    assert match_set.files == [plain, compressed, gone]
+    assert match_set.location(1) == (plain, 3)
+    lines = match_set.read_lines(None, 0, 3)
+    assert lines[:3] == ["ERROR a\n", "last ERROR\n", "ERROR b\n"]
+    # Moved or deleted since the search
+    assert lines[3].startswith("<")
@@ -0,0 +1,129 @@
+from log_document import get_document
+from record_index import DEFAULT_RECORD_START
+from search_engine import PatternMatcher
+from search_worker import MultiSearchJob, SearchJob
+
+
+def _write_log(path, lines):
+    with open(path, 'w') as f:
+        f.writelines(line + '\n' for line in lines)
+
+
+def _drain(job, timeout=10):
+    # Every message of a job until its 'done' or 'error'
+    messages = []
+    while True:
+        message = job.queue.get(timeout=timeout)
+        messages.append(message)
+        if message[0] in ('done', 'error'):
+            return messages
+
+
+def test_job_streams_matches_and_finishes(tmp_path):
+    path = str(tmp_path / "app.log")
+    _write_log(path, [f"line {number} {'ERROR' if number % 3 == 0 else 'ok'}" for number in range(1, 10001)])
+    job = SearchJob(get_document(path), PatternMatcher(['error'])).start()
+    messages = _drain(job)
+    job.join()
+    matches = [match for kind, *payload in messages if kind == 'matches' for match in payload[0]]
+    assert [line_number for line_number, _, _ in matches] == list(range(3, 10001, 3))
+    assert matches[0] == (3, "line 3 ERROR\n", [0])
+    assert messages[-1] == ('done', 3333)
+    progress = [payload for kind, *payload in messages if kind == 'progress']
+    assert progress[-1] == [10000, 10000]
+    assert list(job.match_set.line_numbers) == list(range(3, 10001, 3))
+    assert job.match_set.last_line == 10000
+
+
+def test_cancelled_job_posts_nothing_more(tmp_path):
+    path = str(tmp_path / "app.log")
+    _write_log(path, ["ERROR"] * 50000)
+    job = SearchJob(get_document(path), PatternMatcher(['error']))
+    job.cancel()
+    job.start()
+    job.join()
+    assert job.queue.empty()
+    assert job.match_set is None
+
+
+def test_failed_job_reports_the_error(tmp_path):
+    class BrokenMatcher(PatternMatcher):
+        def match_ids(self, line):
+            raise RuntimeError("boom")
+
+    path = str(tmp_path / "app.log")
+    _write_log(path, ["à"])
+    # '.' over non-ASCII data is matched as text, line by line
+    job = SearchJob(get_document(path), BrokenMatcher(['.'])).start()
+    kind, error = _drain(job)[-1]
+    job.join()
+    assert kind == 'error' and str(error) == "boom"
+    assert job.match_set is None
+
+
+def test_multi_file_job_records_the_file_of_each_match(tmp_path):
+    paths = [str(tmp_path / "a.log"), str(tmp_path / "b.log")]
+    _write_log(paths[0], ["ok", "ERROR a"])
+    _write_log(paths[1], ["ERROR b"])
+    job = MultiSearchJob([str(tmp_path)], PatternMatcher(['error'])).start()
+    messages = _drain(job)
+    job.join()
+    assert messages[-1] == ('done', 2)
+    assert [job.results.location(row) for row in range(len(job.results))] == [(paths[0], 2), (paths[1], 1)]
+    assert job.results.read_lines(None, 0, 1) == ["ERROR a\n", "ERROR b\n"]
+
+
+def _search(document, patterns, **options):
+    job = SearchJob(document, PatternMatcher(patterns), **options).start()
+    messages = _drain(job)
+    job.join()
+    assert messages[-1][0] == 'done'
+    return job.match_set, [match for kind, *payload in messages if kind == 'matches' for match in payload[0]]
+
+
+def test_refined_search_equals_a_full_search(tmp_path):
+    path = str(tmp_path / "app.log")
+    _write_log(path, [f"{number} {['Error', 'Err', 'Warning', 'ok'][number % 4]}" for number in range(1, 2001)])
+    document = get_document(path)
+    broad, _ = _search(document, ['Err', 'Warn'])
+    refined, refined_matches = _search(document, ['Error'], previous=broad)
+    _, full_matches = _search(document, ['Error'])
+    assert refined_matches == full_matches
+    assert list(refined.line_numbers) == list(range(4, 2001, 4))
+    # The very same query is replayed from the set
+    _, replayed = _search(document, ['Error'], previous=refined)
+    assert replayed == full_matches
+
+
+def test_refined_search_includes_appended_lines(tmp_path):
+    path = str(tmp_path / "app.log")
+    _write_log(path, ["Error old", "ok"])
+    document = get_document(path)
+    broad, _ = _search(document, ['Err'])
+    with open(path, 'a') as f:
+        f.write("Error new\n")
+    document.extend()
+    refined, matches = _search(document, ['Error'], previous=broad)
+    assert [line_number for line_number, _, _ in matches] == [1, 3]
+    assert refined.last_line == 3
+
+
+def test_job_matches_records(tmp_path):
+    path = str(tmp_path / "app.log")
+    lines = []
+    for number in range(1, 1001):
+        lines.append(f"2024-03-01 10:00:00 request {number}")
+        if number % 10 == 0:
+            lines += ["Traceback:", "  ValueError: bad input"]
+    _write_log(path, lines)
+    document = get_document(path)
+    job = SearchJob(document, PatternMatcher([r'request \d+0\nTraceback']), record_start=DEFAULT_RECORD_START).start()
+    messages = _drain(job)
+    job.join()
+    matches = [match for kind, *payload in messages if kind == 'matches' for match in payload[0]]
+    assert len(matches) == 100 and messages[-1] == ('done', 100)
+    first_line, record, pattern_ids = matches[0]
+    assert (first_line, pattern_ids) == (10, [0])
+    assert record == "2024-03-01 10:00:00 request 10\nTraceback:\n  ValueError: bad input\n"
+    assert job.match_set.records is not None
+    assert list(job.match_set.line_numbers)[:2] == [10, 22]
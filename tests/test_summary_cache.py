@@ -0,0 +1,62 @@
+import os
+
+import TestLogParser
+from summary_cache import SummaryCache
+
+CONFIG = {'summary_section_start': "Test Result Summary", 'test_no_header': "Test_ID", 'test_result_header': "Test_Result"}
+SUMMARY = "log\nTest Result Summary\nTest_ID Test_Result\n-----\nT1 PASS\nT2 * FAIL\n"
+
+
+def test_failed_parse_is_not_cached(tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    good = str(tmp_path / "good.log")
+    with open(good, 'w') as f:
+        f.write(SUMMARY)
+    # Opening a directory fails like an unreadable file does
+    unreadable = str(tmp_path / "unreadable.log")
+    os.mkdir(unreadable)
+
+    with SummaryCache(CONFIG, cache_path) as cache:
+        summaries = TestLogParser._parse_with_cache([good, unreadable], CONFIG, 'serial', None, cache)
+    assert summaries[unreadable] == []
+    assert len(summaries[good]) == 2
+
+    with SummaryCache(CONFIG, cache_path) as cache:
+        assert cache.get(unreadable) is None
+        assert cache.get(good) == summaries[good]
+
+
+def test_moved_file_is_reused(tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    os.mkdir(tmp_path / "current")
+    path = str(tmp_path / "current" / "suite.log")
+    with open(path, 'w') as f:
+        f.write(SUMMARY)
+    with SummaryCache(CONFIG, cache_path) as cache:
+        TestLogParser._parse_with_cache([path], CONFIG, 'serial', None, cache)
+
+    os.rename(tmp_path / "current", tmp_path / "previous")
+    with SummaryCache(CONFIG, cache_path) as cache:
+        assert cache.get(str(tmp_path / "previous" / "suite.log")) is not None
+        assert cache.hits == 1
+
+
+def test_changed_file_or_config_is_parsed_again(tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    path = str(tmp_path / "suite.log")
+    with open(path, 'w') as f:
+        f.write(SUMMARY)
+    with SummaryCache(CONFIG, cache_path) as cache:
+        TestLogParser._parse_with_cache([path], CONFIG, 'serial', None, cache)
+    with SummaryCache(CONFIG, cache_path) as cache:
+        assert cache.get(path) == [{'Test_ID': "T1", 'Test_Result': "PASS"}, {'Test_ID': "T2", 'Test_Result': "FAIL"}]
+
+    other_config = dict(CONFIG, test_result_header="Outcome")
+    with SummaryCache(other_config, cache_path) as cache:
+        assert cache.get(path) is None
+
+    with open(path, 'a') as f:
+        f.write("T3 PASS\n")
+    with SummaryCache(CONFIG, cache_path) as cache:
+        assert cache.get(path) is None
+        assert (cache.hits, cache.misses) == (0, 1)
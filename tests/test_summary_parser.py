@@ -0,0 +1,46 @@
+import pytest
+
+from TestLogParser import _parse_files, _parse_summary_section
+
+CONFIG = {'summary_section_start': "Test Result Summary", 'test_no_header': "Test_ID", 'test_result_header': "Test_Result"}
+SUMMARY = ["Test Result Summary", "Test_ID Test_Result", "-----", "T1 PASS", "T2 * FAIL", "", "after"]
+EXPECTED = [{'Test_ID': "T1", 'Test_Result': "PASS"}, {'Test_ID': "T2", 'Test_Result': "FAIL"}]
+
+
+def _write(path, lines, newline):
+    with open(path, 'wb') as f:
+        f.write(newline.join(lines).encode('utf-8') + newline.encode('utf-8'))
+
+
+def test_line_endings(tmp_path):
+    for name, newline in [('lf', '\n'), ('crlf', '\r\n'), ('cr', '\r')]:
+        path = str(tmp_path / f"{name}.log")
+        _write(path, ["filler line"] * 1000 + SUMMARY, newline)
+        assert _parse_summary_section(path, CONFIG) == EXPECTED, name
+
+
+def test_last_section_is_used(tmp_path):
+    path = str(tmp_path / "two.log")
+    _write(path, [line.replace("T1", "T0") for line in SUMMARY] + ["filler"] * 10 + SUMMARY, '\n')
+    assert _parse_summary_section(path, CONFIG) == EXPECTED
+
+
+def test_unreadable_file(tmp_path):
+    assert _parse_summary_section(str(tmp_path / "missing.log"), CONFIG) is None
+
+
+@pytest.mark.parametrize('executor', ['serial', 'thread', 'process'])
+def test_parse_files_keeps_the_order_of_the_files(tmp_path, executor):
+    paths = []
+    for number in range(20):
+        path = str(tmp_path / f"{number:02}.log")
+        _write(path, [line.replace("T1", f"T1_{number}") for line in SUMMARY], '\n')
+        paths.append(path)
+    paths.append(str(tmp_path / "missing.log"))
+    expected = [[{'Test_ID': f"T1_{number}", 'Test_Result': "PASS"}, EXPECTED[1]] for number in range(20)] + [None]
+    assert _parse_files(paths, CONFIG, executor, max_workers=3) == expected
+
+
+def test_unknown_executor(tmp_path):
+    with pytest.raises(ValueError):
+        _parse_files([str(tmp_path / "a.log"), str(tmp_path / "b.log")], CONFIG, 'fibers', None)
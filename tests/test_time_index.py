@@ -0,0 +1,136 @@
+import calendar
+import random
+
+import pytest
+
+from log_document import get_document
+from log_search_cli import main
+from time_index import TimeIndex, detect_format, time_window
+
+BASE = calendar.timegm((2024, 3, 1, 10, 0, 0))
+
+
+def _stamp(seconds):
+    return f"2024-03-01 {seconds // 3600 % 24 + 10:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _write_log(path):
+    # Timestamped lines two seconds apart, some out of order, with untimed
+    # lines before the first one and continuation lines after some entries
+    rng = random.Random(5)
+    lines = ["banner without a time", ""]
+    times = []
+    for number in range(3000):
+        seconds = 2 * number - (3 if rng.random() < 0.05 else 0)
+        lines.append(f"{_stamp(max(seconds, 0))}.{rng.randrange(1000):03d} INFO event {number}")
+        if rng.random() < 0.2:
+            lines.extend(["Traceback (most recent call last):", "  at frame"])
+    with open(path, 'w') as f:
+        f.writelines(line + '\n' for line in lines)
+    return lines
+
+
+def _naive_window(index, lines, start, end):
+    # Lines whose time (the latest time seen so far) falls in the window
+    selected = []
+    latest = None
+    for number, line in enumerate(lines, start=1):
+        seconds = index.line_time(line.encode('ascii'))
+        if seconds is not None and (latest is None or seconds > latest):
+            latest = seconds
+        if (start is None or (latest is not None and latest >= start)) and \
+                (end is None or latest is None or latest <= end):
+            selected.append(number)
+    return selected
+
+
+@pytest.mark.parametrize('line, expected', [
+    (b"2024-03-01T10:00:00.123Z INFO x", 'iso'),
+    (b"2024-03-01 10:00:00,123 INFO x", 'iso'),
+    (b"Mar  1 10:00:00 host sshd[1]: x", 'syslog'),
+    (b"1709287200123 INFO x", 'epoch_ms'),
+    (b"1709287200.5 INFO x", 'epoch'),
+    (b"no time here", None),
+])
+def test_detect_format(line, expected):
+    assert detect_format([line] * 10) == expected
+
+
+def test_line_range_equals_a_scan_of_every_line(tmp_path):
+    path = str(tmp_path / "app.log")
+    lines = _write_log(path)
+    document = get_document(path)
+    # A small spacing gives many entries and short scans between them
+    index = TimeIndex('iso', 2024, spacing=512)
+    index.update(document)
+    assert len(index) > 100
+    rng = random.Random(9)
+    windows = [(None, None), (BASE - 100, None), (None, BASE - 1), (BASE + 7000, None), (None, BASE + 10000)]
+    for _ in range(50):
+        start = BASE + rng.randrange(-10, 6100)
+        windows.append((start, start + rng.randrange(0, 300)))
+    for start, end in windows:
+        first_line, last_line = index.line_range(document, start, end)
+        assert list(range(first_line, last_line + 1)) == _naive_window(index, lines, start, end), (start, end)
+
+
+def test_index_grows_with_the_file(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.writelines(f"{_stamp(number)} line {number}\n" for number in range(100))
+    document = get_document(path)
+    index = TimeIndex('iso', 2024, spacing=256)
+    index.update(document)
+    entries = len(index)
+    with open(path, 'a') as f:
+        f.writelines(f"{_stamp(number)} line {number}\n" for number in range(100, 200))
+    document.extend()
+    index.update(document)
+    assert len(index) > entries
+    assert index.last_time > BASE + 99
+    assert index.line_range(document, BASE + 150, BASE + 160) == (151, 161)
+
+
+def test_parse_time():
+    index = TimeIndex('syslog', 2024)
+    index.times.append(BASE + 5)
+    assert index.parse_time("Mar  1 10:00:05") == BASE + 5
+    assert index.parse_time("2024-03-01 10:00") == BASE
+    assert index.parse_time("2024-03-01T10:00:05.5") == BASE + 5.5
+    assert index.parse_time("2024-03-01") == BASE - 10 * 3600
+    assert index.parse_time("10:30") == BASE + 1800
+    assert index.parse_time(str(BASE + 1)) == BASE + 1
+    with pytest.raises(ValueError):
+        index.parse_time("yesterday")
+
+
+def test_time_window(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.writelines(f"{_stamp(number)} line {number}\n" for number in range(600))
+    document = get_document(path)
+    assert time_window(document, "10:01", "10:02") == (61, 121)
+    # Open towards the end, lines appended later still fall in the window
+    assert time_window(document, "10:09:00") == (541, None)
+    assert time_window(document, "", "10:00:09") == (1, 10)
+    with pytest.raises(ValueError):
+        time_window(document, "soon")
+
+
+def test_untimed_log_has_no_window(tmp_path):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.write("no times\n" * 300)
+    with pytest.raises(ValueError):
+        time_window(get_document(path), "10:00")
+
+
+def test_cli_time_range(tmp_path, capsys):
+    path = str(tmp_path / "app.log")
+    with open(path, 'w') as f:
+        f.writelines(f"{_stamp(number)} {'ERROR' if number % 10 == 0 else 'ok'} {number}\n" for number in range(600))
+    assert main(['-p', 'error', '--from', '2024-03-01 10:01', '--to', '2024-03-01 10:01:30', path]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        f"{number + 1}: {_stamp(number)} ERROR {number}" for number in (60, 70, 80, 90)
+    ]
+    assert main(['-p', 'error', '--from', 'soon', path]) == 2
@@ -0,0 +1,93 @@
+import re
+
+import pytest
+
+import trigram_index
+from log_document import get_document
+from search_engine import PatternMatcher, candidate_ranges, iter_match_batches
+from trigram_index import BLOCK_LINES, TrigramIndex, get_trigram_index, required_literals
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # Indexes are written below the test directory, not the home directory
+    directory = str(tmp_path / "trigram")
+    monkeypatch.setattr(trigram_index, 'DEFAULT_CACHE_DIR', directory)
+    return directory
+
+
+def _write_log(path, lines):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(line + '\n' for line in lines)
+
+
+def _lines(count):
+    # Rare words in a few blocks, common ones everywhere
+    lines = [f"2024-03-01 10:{number % 60:02d}:00 INFO request {number} served" for number in range(count)]
+    lines[5] = "2024-03-01 10:05:00 ERROR Timeout talking to db"
+    lines[BLOCK_LINES + 7] = "2024-03-01 10:07:00 WARNING ſtatus degraded"
+    lines[-2] = "2024-03-01 10:01:00 ERROR disk full"
+    return lines
+
+
+def _lines_in(ranges):
+    return {number for first, last in ranges for number in range(first, last + 1)}
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ('Error', ('lit', b'error')),
+    (r'\d+', None),
+    ('ab', None),
+    ('disk (full|gone)', ('and', [('lit', b'disk '), ('or', [('lit', b'full'), ('lit', b'gone')])])),
+    ('(?i)status', ('lit', b'tatu')),
+])
+def test_required_literals(pattern, expected):
+    assert required_literals(pattern) == expected
+
+
+def test_candidate_blocks_cover_every_match(tmp_path):
+    path = str(tmp_path / "app.log")
+    lines = [f"line {number} {'needle' if number in (3, 25, 26) else 'hay'}" for number in range(1, 51)]
+    _write_log(path, lines)
+    index = TrigramIndex(block_lines=10)
+    index.update(get_document(path))
+    assert index.candidate_ranges(['needle'], 50) == [(1, 10), (21, 30)]
+    assert index.candidate_ranges(['needle|line 4'], 50) == [(1, 10), (21, 50)]
+    assert index.candidate_ranges(['absent'], 50) == []
+    assert index.candidate_ranges([r'\w+'], 50) is None
+
+
+@pytest.mark.parametrize('patterns, case_sensitive', [
+    (['error'], False), (['ERROR'], True), (['error'], True), (['status'], False), (['STATUS'], False),
+    ([r'timeout|disk full'], False), ([r'request \d+ served'], False), (['nowhere'], False),
+])
+def test_indexed_search_finds_every_match(tmp_path, patterns, case_sensitive):
+    path = str(tmp_path / "app.log")
+    lines = _lines(4 * BLOCK_LINES)
+    _write_log(path, lines)
+    document = get_document(path)
+    matcher = PatternMatcher(patterns, case_sensitive)
+    ranges = candidate_ranges(document, matcher, use_index=True)
+    found = [line_number for _, batch in iter_match_batches(document, matcher, ranges) for line_number, _, _ in batch]
+    flags = 0 if case_sensitive else re.IGNORECASE
+    expected = [number for number, line in enumerate(lines, start=1)
+                if any(re.search(pattern, line, flags) for pattern in patterns)]
+    assert found == expected
+    assert _lines_in(ranges) >= set(expected)
+
+
+def test_index_is_saved_and_extended(tmp_path, cache_dir):
+    path = str(tmp_path / "app.log")
+    lines = _lines(2 * BLOCK_LINES)
+    _write_log(path, lines)
+    index = get_trigram_index(get_document(path))
+    saved = TrigramIndex.load(trigram_index.index_path_for(path, cache_dir))
+    assert saved.blocks == index.blocks == 2
+    assert saved.postings == index.postings
+
+    with open(path, 'a') as f:
+        f.write("2024-03-01 11:00:00 CRITICAL appended\n" * BLOCK_LINES)
+    document = get_document(path)
+    grown = get_trigram_index(document)
+    assert grown.blocks == 3
+    assert grown.candidate_ranges(['critical'], document.line_count) == [(2 * BLOCK_LINES + 1, 3 * BLOCK_LINES)]
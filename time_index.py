@@ -0,0 +1,304 @@
+import calendar
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+from instrumentation import metrics
+
+# Bytes of log between two entries of the index. A time window is located
+# by a binary search over the entries plus a scan of at most this much data
+# at either end.
+DEFAULT_SPACING = 64 * 1024
+# Lines at the start of a file used to detect its timestamp format
+_SAMPLE_LINES = 200
+# Share of the sampled lines that must carry a timestamp of the format
+_MIN_SAMPLE_SHARE = 0.2
+# Timestamps are only looked for at the start of a line
+_PREFIX_BYTES = 64
+# Lines tried after each probe point (continuation lines, stack traces ...)
+_PROBE_LINES = 64
+
+_MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), start=1
+)}
+
+
+def _fraction(digits):
+    return int(digits) / 10 ** len(digits) if digits else 0.0
+
+
+def _iso_seconds(match, year):
+    fields = [int(value) for value in match.groups()[:6]]
+    return calendar.timegm(fields) + _fraction(match.group(7))
+
+
+def _syslog_seconds(match, year):
+    month, day, hour, minute, second = match.groups()
+    return calendar.timegm((year, _MONTHS[month.decode('ascii') if isinstance(month, bytes) else month],
+                            int(day), int(hour), int(minute), int(second)))
+
+
+def _epoch_ms_seconds(match, year):
+    return int(match.group(1)) / 1000
+
+
+def _epoch_seconds(match, year):
+    return int(match.group(1)) + _fraction(match.group(2))
+
+
+# (name, pattern, converter) in order of preference. Times are seconds since
+# the epoch of the wall clock as written in the log: UTC offsets are not
+# applied, so a window typed by hand means what it reads in the file.
+# Syslog timestamps carry no year, they are all placed in the year the log
+# was last modified.
+TIMESTAMP_FORMATS = [
+    ('iso', r'(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:[.,](\d{1,9}))?', _iso_seconds),
+    ('syslog', r'\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) +(\d{1,2}) (\d\d):(\d\d):(\d\d)',
+     _syslog_seconds),
+    ('epoch_ms', r'(?<!\d)(1\d{12})(?!\d)', _epoch_ms_seconds),
+    ('epoch', r'(?<!\d)(1\d{9})(?:\.(\d{1,9}))?(?![\d.])', _epoch_seconds),
+]
+_BYTES_FORMATS = {name: (re.compile(pattern.encode('ascii')), convert)
+                  for name, pattern, convert in TIMESTAMP_FORMATS}
+_TEXT_FORMATS = {name: (re.compile(pattern), convert) for name, pattern, convert in TIMESTAMP_FORMATS}
+_TIME_OF_DAY = re.compile(r'(\d{1,2}):(\d\d)(?::(\d\d)(?:[.,](\d{1,9}))?)?')
+_ISO_DATE = re.compile(r'(\d{4})-(\d\d)-(\d\d)')
+
+_index_lock = threading.Lock()
+
+
+def detect_format(lines):
+    """
+    Returns the name of the timestamp format most of the ``lines`` (bytes)
+    start with, or None when the log does not look timestamped.
+    """
+    lines = [line for line in lines if line.strip()]
+    best = None
+    best_count = 0
+    for name, _, _ in TIMESTAMP_FORMATS:
+        pattern = _BYTES_FORMATS[name][0]
+        count = sum(1 for line in lines if pattern.search(line, 0, _PREFIX_BYTES))
+        if count > best_count:
+            best, best_count = name, count
+    if not lines or best_count < _MIN_SAMPLE_SHARE * len(lines):
+        return None
+    return best
+
+
+def _utc(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+def format_time(seconds):
+    """Formats a time of the index the way ``parse_time`` reads it back."""
+    return _utc(seconds).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class TimeIndex:
+    """
+    A sparse timestamp -> line index of a LogDocument.
+
+    One entry is taken every ``spacing`` bytes: the first line at or after
+    that point carrying a timestamp. Entry times are made non-decreasing (a
+    line slightly out of order counts as the latest time seen before it), and
+    so are the times of the lines between entries when a window is located,
+    which also gives lines without a timestamp (continuation lines, stack
+    traces) the time of the record they belong to.
+
+    Only a few bytes per ``spacing`` are read to build it, so it is cheap
+    even for very large files, and a log that grew is indexed incrementally.
+    """
+
+    def __init__(self, format_name, year, spacing=DEFAULT_SPACING):
+        self.format = format_name
+        self.year = year
+        self.spacing = spacing
+        self.times = array('d')
+        self.lines = array('q')
+        self.next_probe = 0  # Byte offset of the next entry to take
+        self._pattern, self._convert = _BYTES_FORMATS[format_name]
+
+    def __len__(self):
+        return len(self.times)
+
+    def line_time(self, data):
+        """Returns the time of a raw line, or None if it carries no timestamp."""
+        match = self._pattern.search(data, 0, _PREFIX_BYTES)
+        if match is None:
+            return None
+        try:
+            return self._convert(match, self.year)
+        except (ValueError, OverflowError):
+            # E.g. month 13, not a timestamp after all
+            return None
+
+    def update(self, document, cancelled=None):
+        """
+        Adds entries for the part of ``document`` not indexed yet. Returns
+        False if ``cancelled()`` became true.
+        """
+        line_count = document.complete_line_count
+        while self.next_probe < document.size:
+            if cancelled and cancelled():
+                return False
+            line_number = document.line_at_offset(self.next_probe)
+            last_probed = min(line_number + _PROBE_LINES - 1, line_count)
+            if self.lines and line_number <= self.lines[-1]:
+                # A line longer than the spacing, the entry is already taken
+                line_number = self.lines[-1] + 1
+            for number in range(line_number, last_probed + 1):
+                start, end = document.line_span(number)
+                seconds = self.line_time(document.read_bytes(start, min(end, start + _PREFIX_BYTES)))
+                if seconds is not None:
+                    if self.times:
+                        seconds = max(seconds, self.times[-1])
+                    self.times.append(seconds)
+                    self.lines.append(number)
+                    break
+            if last_probed >= line_count:
+                # Lines still being written are probed again once complete
+                if line_number > line_count:
+                    break
+                self.next_probe = document.line_span(line_count)[1]
+                break
+            self.next_probe += self.spacing
+        return True
+
+    @property
+    def first_time(self):
+        return self.times[0] if self.times else None
+
+    @property
+    def last_time(self):
+        return self.times[-1] if self.times else None
+
+    def _scan(self, document, first, last, floor):
+        # Yields (line_number, time) for lines first..last, times carried over
+        # to untimed lines and made non-decreasing from ``floor``
+        if first > last:
+            return
+        data = document.read_bytes(document.line_span(first)[0], document.line_span(last)[1])
+        seconds = floor
+        for line_number, line in enumerate(data.split(b'\n'), start=first):
+            if line_number > last:
+                break
+            line_seconds = self.line_time(line)
+            if line_seconds is not None and (seconds is None or line_seconds > seconds):
+                seconds = line_seconds
+            yield line_number, seconds
+
+    def line_range(self, document, start=None, end=None):
+        """
+        Returns ``(first_line, last_line)`` of the lines stamped ``start``
+        to ``end`` (seconds, both inclusive, None for open ends). The range
+        is empty (``first_line > last_line``) when no line falls in the window.
+        """
+        line_count = document.line_count
+        first_line = 1
+        if start is not None:
+            i = bisect_left(self.times, start)
+            scan_from = self.lines[i - 1] if i else 1
+            scan_to = self.lines[i] if i < len(self.lines) else line_count
+            floor = self.times[i - 1] if i else None
+            first_line = scan_to if i < len(self.lines) else line_count + 1
+            for line_number, seconds in self._scan(document, scan_from, scan_to, floor):
+                if seconds is not None and seconds >= start:
+                    first_line = line_number
+                    break
+        last_line = line_count
+        if end is not None:
+            j = bisect_right(self.times, end)
+            if not j:
+                return first_line, self.lines[0] - 1 if self.lines else 0
+            scan_from = self.lines[j - 1]
+            scan_to = self.lines[j] if j < len(self.lines) else line_count
+            for line_number, seconds in self._scan(document, scan_from, scan_to, self.times[j - 1]):
+                if seconds > end:
+                    last_line = line_number - 1
+                    break
+        return first_line, last_line
+
+    def parse_time(self, text):
+        """
+        Reads a time typed by the user: a timestamp in the log's own format,
+        ISO-8601 (``2024-03-01 10:00``, seconds optional), a bare time of day
+        (``10:00:05``, on the day the log starts) or epoch seconds. Raises
+        ValueError for anything else.
+        """
+        text = text.strip()
+        for name in (self.format, 'iso', 'syslog', 'epoch_ms', 'epoch'):
+            pattern, convert = _TEXT_FORMATS[name]
+            match = pattern.fullmatch(text)
+            if match:
+                return convert(match, self.year)
+        date = _ISO_DATE.match(text)
+        if date:
+            rest = text[date.end():].lstrip('T ')
+        else:
+            rest = text
+        time_of_day = _TIME_OF_DAY.fullmatch(rest) if rest else None
+        if date and not rest:
+            return calendar.timegm((int(date.group(1)), int(date.group(2)), int(date.group(3)), 0, 0, 0))
+        if time_of_day:
+            if date:
+                day = (int(date.group(1)), int(date.group(2)), int(date.group(3)))
+            elif self.times:
+                day = _utc(self.times[0]).timetuple()[:3]
+            else:
+                raise ValueError(f"no date to go with '{text}'")
+            hour, minute, second, fraction = time_of_day.groups()
+            return calendar.timegm(day + (int(hour), int(minute), int(second or 0))) + _fraction(fraction)
+        raise ValueError(f"unrecognised time '{text}'")
+
+
+def get_time_index(document, cancelled=None):
+    """
+    Returns the TimeIndex of ``document``, detecting its timestamp format and
+    building the index on first use and extending it when the file grew.
+    Returns None for logs without recognisable timestamps, or if
+    ``cancelled()`` became true during the build.
+    """
+    with _index_lock:
+        index = document.time_index
+        if index is None:
+            sample_end = min(document.line_count, _SAMPLE_LINES)
+            sample = []
+            for line_number in range(1, sample_end + 1):
+                start, end = document.line_span(line_number)
+                sample.append(document.read_bytes(start, min(end, start + _PREFIX_BYTES)))
+            format_name = detect_format(sample)
+            if format_name is None:
+                # Too few lines yet to tell, try again when the file grew
+                if sample_end < _SAMPLE_LINES:
+                    return None
+                document.time_index = False
+                return None
+            year = _utc(document.fingerprint[2] / 1e9).year
+            index = document.time_index = TimeIndex(format_name, year)
+        elif index is False:
+            return None
+        with metrics.stage('time_index_build'):
+            if not index.update(document, cancelled):
+                return None
+        return index
+
+
+def time_window(document, start_text='', end_text=''):
+    """
+    Returns ``(first_line, last_line)`` of the lines of ``document`` stamped
+    ``start_text`` to ``end_text`` (times as typed, see ``TimeIndex.parse_time``,
+    empty for an open end). ``last_line`` is None when the window has no end,
+    so lines appended later still fall into it.
+
+    Raises:
+        ValueError: If a time cannot be read or the log has no timestamps.
+    """
+    index = get_time_index(document)
+    if index is None:
+        raise ValueError("no timestamps recognised in the log")
+    start = index.parse_time(start_text) if start_text.strip() else None
+    end = index.parse_time(end_text) if end_text.strip() else None
+    first_line, last_line = index.line_range(document, start, end)
+    return first_line, last_line if end is not None else None
@@ -0,0 +1,318 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from array import array
+
+try:
+    import re._parser as sre_parse
+    import re._constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from instrumentation import metrics
+from log_document import CHUNK_LINES
+
+# Bump whenever the on-disk layout or the trigram extraction changes
+INDEX_VERSION = 1
+# Lines per posting-list entry. Postings record blocks rather than single
+# lines to keep the index a small fraction of the log; a block is a whole
+# number of LogDocument chunks so candidates map straight onto cached chunks.
+BLOCK_LINES = 4 * CHUNK_LINES
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'log-file-search', 'trigram')
+# Bytes hashed at the start and at the end of the indexed part of a file to
+# recognise a log that was only appended to since the index was written
+_FINGERPRINT_BYTES = 64 * 1024
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, 'POSSESSIVE_REPEAT'):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+
+def _trigram_codes(data):
+    """Returns the distinct trigrams of lower-cased ``data`` as 24-bit integers."""
+    if len(data) < 3:
+        return []
+    if numpy is not None:
+        values = numpy.frombuffer(data, dtype=numpy.uint8).astype(numpy.uint32)
+        return numpy.unique((values[:-2] << 16) | (values[1:-1] << 8) | values[2:]).tolist()
+    return sorted({(a << 16) | (b << 8) | c for a, b, c in set(zip(data, data[1:], data[2:]))})
+
+
+def _literal_codes(literal):
+    return [int.from_bytes(literal[i:i + 3], 'big') for i in range(len(literal) - 2)]
+
+
+def required_literals(pattern, flags=0):
+    """
+    Reduces a regex to a query over literal substrings every match must contain.
+
+    Returns None when the pattern constrains nothing an index can use (e.g.
+    ``\\d+``), otherwise a tree of ``('lit', bytes)``, ``('and', [...])`` and
+    ``('or', [...])`` nodes. Literals are lower-cased ASCII, matching how the
+    index stores trigrams, so the same query serves case-insensitive searches.
+    """
+    parsed = sre_parse.parse(pattern, flags)
+    # Unicode case folding lets 'i', 'k' and 's' match the non-ASCII dotted
+    # and dotless I, KELVIN SIGN and LONG S, which lower-cased index bytes
+    # would not contain
+    unsafe = frozenset(b'iksIKS') if parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE else frozenset()
+    return _required(parsed, unsafe)
+
+
+def _required(subpattern, unsafe):
+    terms = []
+    run = bytearray()
+
+    def flush():
+        if len(run) >= 3:
+            terms.append(('lit', bytes(run)))
+        run.clear()
+
+    for op, av in subpattern:
+        if op is sre_constants.LITERAL and av < 128 and av not in unsafe:
+            run.append(ord(chr(av).lower()))
+            continue
+        if op is sre_constants.AT:
+            # Anchors consume nothing, literals on either side stay adjacent
+            continue
+        flush()
+        query = None
+        if op is sre_constants.SUBPATTERN:
+            query = _required(av[-1], unsafe)
+        elif op is getattr(sre_constants, 'ATOMIC_GROUP', None):
+            query = _required(av, unsafe)
+        elif op is sre_constants.BRANCH:
+            branches = [_required(branch, unsafe) for branch in av[1]]
+            if all(branch is not None for branch in branches):
+                query = ('or', branches)
+        elif op in _REPEATS and av[0] >= 1:
+            query = _required(av[2], unsafe)
+        if query is not None:
+            terms.append(query)
+    flush()
+
+    if not terms:
+        return None
+    return terms[0] if len(terms) == 1 else ('and', terms)
+
+
+def index_path_for(file_path, cache_dir=None):
+    """Index files are named after the log's real path inside ``cache_dir``."""
+    key = hashlib.sha1(os.path.realpath(file_path).encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"{key}.tgi")
+
+
+class TrigramIndex:
+    """
+    Maps every trigram of a log file to the blocks of ``BLOCK_LINES`` lines it
+    occurs in.
+
+    Searching intersects the posting lists of the literals a regex requires
+    and only the candidate blocks are scanned with the real regex. Trigrams
+    are taken from ASCII lower-cased bytes, so a candidate set is always a
+    superset of the blocks that can match, whatever the case sensitivity.
+    """
+
+    def __init__(self, block_lines=BLOCK_LINES):
+        self.block_lines = block_lines
+        self.postings = {}  # {trigram_code: array('I') of ascending block numbers}
+        self.blocks = 0
+        self.meta = {}
+
+    def update(self, document, cancelled=None):
+        """
+        Indexes the blocks of ``document`` not yet covered. The last block of
+        a previous build may have been partial, so it is indexed again.
+        Returns False if ``cancelled()`` became true before the build finished.
+        """
+        first_block = max(self.blocks - 1, 0)
+        total_blocks = -(-document.line_count // self.block_lines)
+        for block in range(first_block, total_blocks):
+            if cancelled and cancelled():
+                return False
+            first = block * self.block_lines + 1
+            last = min(first + self.block_lines - 1, document.line_count)
+            data = document.read_bytes(document.line_span(first)[0], document.line_span(last)[1]).lower()
+            for code in _trigram_codes(data):
+                blocks = self.postings.get(code)
+                if blocks is None:
+                    self.postings[code] = array('I', (block,))
+                elif blocks[-1] != block:
+                    blocks.append(block)
+        self.blocks = total_blocks
+        self.meta = _fingerprint(document)
+        return True
+
+    def candidate_blocks(self, query):
+        """Returns the set of blocks that may satisfy ``query``, None meaning all."""
+        if query is None:
+            return None
+        kind, value = query
+        if kind == 'lit':
+            result = None
+            for code in _literal_codes(value):
+                blocks = self.postings.get(code)
+                if blocks is None:
+                    return set()
+                result = set(blocks) if result is None else result.intersection(blocks)
+                if not result:
+                    break
+            return result
+        if kind == 'and':
+            result = None
+            for term in value:
+                blocks = self.candidate_blocks(term)
+                if blocks is not None:
+                    result = blocks if result is None else result & blocks
+            return result
+        result = set()
+        for branch in value:
+            blocks = self.candidate_blocks(branch)
+            if blocks is None:
+                return None
+            result |= blocks
+        return result
+
+    def candidate_ranges(self, patterns, line_count, flags=0):
+        """
+        Returns the ``(first_line, last_line)`` ranges a search for any of
+        ``patterns`` has to scan, or None when the whole file must be scanned.
+        """
+        candidates = set()
+        for pattern in patterns:
+            blocks = self.candidate_blocks(required_literals(pattern, flags))
+            if blocks is None:
+                return None
+            candidates |= blocks
+
+        ranges = []
+        for block in sorted(candidates):
+            first = block * self.block_lines + 1
+            last = min(first + self.block_lines - 1, line_count)
+            if ranges and ranges[-1][1] + 1 == first:
+                ranges[-1] = (ranges[-1][0], last)
+            else:
+                ranges.append((first, last))
+        return ranges
+
+    def save(self, index_path):
+        codes = array('I', sorted(self.postings))
+        counts = array('I', (len(self.postings[code]) for code in codes))
+        header = dict(self.meta, version=INDEX_VERSION, block_lines=self.block_lines,
+                      blocks=self.blocks, byteorder=sys.byteorder, trigrams=len(codes))
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        # Written to a temporary file first so readers never see half an index
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            codes.tofile(f)
+            counts.tofile(f)
+            for code in codes:
+                self.postings[code].tofile(f)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, index_path):
+        """Returns the index stored at ``index_path``, or None if it is missing or outdated."""
+        try:
+            with open(index_path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header.get('version') != INDEX_VERSION:
+                    return None
+                codes = array('I')
+                counts = array('I')
+                codes.fromfile(f, header['trigrams'])
+                counts.fromfile(f, header['trigrams'])
+                postings = array('I')
+                postings.frombytes(f.read())
+        except (OSError, ValueError, EOFError, KeyError):
+            return None
+        if header['byteorder'] != sys.byteorder:
+            for values in (codes, counts, postings):
+                values.byteswap()
+
+        index = cls(header['block_lines'])
+        index.blocks = header['blocks']
+        index.meta = {key: header[key] for key in ('inode', 'size', 'mtime_ns', 'head_hash', 'tail_hash')}
+        position = 0
+        for code, count in zip(codes, counts):
+            index.postings[code] = postings[position:position + count]
+            position += count
+        return index
+
+
+def _fingerprint(document):
+    inode, _, mtime_ns = document.fingerprint
+    # The indexed size, for a compressed log that of the uncompressed content
+    size = document.size
+    head = document.read_bytes(0, min(size, _FINGERPRINT_BYTES))
+    tail = document.read_bytes(max(size - _FINGERPRINT_BYTES, 0), size)
+    return {
+        'inode': inode,
+        'size': size,
+        'mtime_ns': mtime_ns,
+        'head_hash': hashlib.sha1(head).hexdigest(),
+        'tail_hash': hashlib.sha1(tail).hexdigest(),
+    }
+
+
+def _only_grew(meta, document):
+    """True when ``document`` is the indexed file with bytes appended to it."""
+    if document.fingerprint[0] != meta['inode']:
+        return False
+    indexed_size = meta['size']
+    head = document.read_bytes(0, min(indexed_size, _FINGERPRINT_BYTES))
+    tail = document.read_bytes(max(indexed_size - _FINGERPRINT_BYTES, 0), indexed_size)
+    return hashlib.sha1(head).hexdigest() == meta['head_hash'] and \
+        hashlib.sha1(tail).hexdigest() == meta['tail_hash']
+
+
+_index_lock = threading.Lock()
+
+
+def get_trigram_index(document, cache_dir=None, cancelled=None):
+    """
+    Returns an up-to-date TrigramIndex for ``document``.
+
+    The index is kept on the document, loaded from ``cache_dir`` when a
+    matching one was saved earlier, extended when the file only grew since,
+    and built from scratch otherwise. Returns None if ``cancelled()`` became
+    true during a build.
+    """
+    with _index_lock:
+        if document.trigram_index is not None:
+            return document.trigram_index
+
+        index_path = index_path_for(document.file_path, cache_dir)
+        index = TrigramIndex.load(index_path)
+        if index is not None and index.block_lines == BLOCK_LINES and \
+                index.meta['size'] == document.size and \
+                (index.meta['inode'], index.meta['mtime_ns']) == (document.fingerprint[0], document.fingerprint[2]):
+            up_to_date = True
+        elif index is not None and index.block_lines == BLOCK_LINES and \
+                index.meta['size'] < document.size and _only_grew(index.meta, document):
+            # Appended to since the last build, only the new blocks are indexed
+            up_to_date = False
+        else:
+            index = TrigramIndex()
+            up_to_date = False
+
+        if not up_to_date:
+            with metrics.stage('trigram_index_build'):
+                if not index.update(document, cancelled):
+                    return None
+            try:
+                index.save(index_path)
+            except OSError:
+                # A read-only cache dir only costs the next session a rebuild
+                pass
+        document.trigram_index = index
+        return index